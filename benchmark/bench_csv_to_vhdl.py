@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+    Benchmark for csv_to_vhdl.py
+
+    This file is part of CSV2VHDL-Converter .
+
+    CSV2VHDL-Converter  is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    CSV2VHDL-Converter  is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with CSV2VHDL-Converter .  If not, see <http://www.gnu.org/licenses/>.
+
+Generates deterministic oscilloscope like csv files (SPI CLK/MOSI with noise and ringing, several runs with skew)
+and measures readCsv(), read_csv_and_get_edges(), get_and_prepare_csv_data() and write_stimuli_file().
+Results are written as json to compare versions:
+
+    python bench_csv_to_vhdl.py --rows 1000000 --output bench_new.json --compare bench_old.json
+'''
+
+import argparse
+import contextlib
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import csv_to_vhdl
+
+try:
+    import resource
+except ImportError:  # not available on Windows -> no peak RSS
+    resource = None
+
+
+def spi_level(sample_time_s, spi_freq_mhz, word_bits=8, idle_periods=4, seed=0):
+    ''' Logic levels (clk, mosi) of a SPI transfer at sample_time_s: words of word_bits bits separated by idle_periods '''
+    period_s = 1 / (spi_freq_mhz * 1e6)
+    frame_periods = word_bits + idle_periods
+    frame_num, frame_time_s = divmod(sample_time_s, frame_periods * period_s)
+    bit_num, bit_time_s = divmod(frame_time_s, period_s)
+    if bit_num >= word_bits:
+        return 0, 0
+    word = random.Random(seed * 1000003 + int(frame_num)).getrandbits(word_bits)
+    return (1 if bit_time_s >= period_s / 2 else 0), (word >> (word_bits - 1 - int(bit_num))) & 1
+
+
+def generate_csv(filename, rows, signal='CLK', spi_freq_mhz=20, sample_rate_gsps=1.25, logic_family=3.3,
+                 noise_v=0.05, ringing_v=0.6, skew_ns=0, seed=0, channel=1):
+    ''' Write a deterministic R&S RTB2004 like csv file of one SPI signal ('CLK' or 'MOSI')
+
+        Uses numpy if installed (much faster for 1e7+ rows), the generated data differs from the pure python version.
+    '''
+    if csv_to_vhdl.np is not None:
+        return generate_csv_numpy(filename, rows, signal, spi_freq_mhz, sample_rate_gsps, logic_family, noise_v, ringing_v, skew_ns, seed, channel)
+
+    rng = random.Random(seed)
+    sample_time_s = 1 / (sample_rate_gsps * 1e9)
+    time_offset_s = -rows * sample_time_s / 10  # scope trigger: 10 % pretrigger
+    ringing_period_s = 4 * sample_time_s
+    ringing_tau_s = 3 * ringing_period_s
+    last_level = None
+    last_edge_time_s = -math.inf
+    line_list = []
+
+    with open(filename, 'w', newline='\n') as csvfile:
+        csvfile.write(f"in s,C{channel} in V\n")
+        for row_num in range(rows):
+            sample_time = time_offset_s + row_num * sample_time_s
+            clk, mosi = spi_level(sample_time - time_offset_s - skew_ns * 1e-9, spi_freq_mhz, seed=seed)
+            level = clk if signal == 'CLK' else mosi
+            if level != last_level:
+                if last_level is not None:
+                    last_edge_time_s = sample_time
+                last_level = level
+            time_since_edge_s = sample_time - last_edge_time_s
+            voltage = level * logic_family + rng.gauss(0, noise_v)
+            if time_since_edge_s < 5 * ringing_tau_s:
+                voltage += ringing_v * math.exp(-time_since_edge_s / ringing_tau_s) * math.cos(2 * math.pi * time_since_edge_s / ringing_period_s) * (1 if level else -1)
+            line_list.append(f"{sample_time:.7E},{voltage:.5E}\n")
+            if len(line_list) >= 65536:
+                csvfile.write(''.join(line_list))
+                line_list.clear()
+        csvfile.write(''.join(line_list))
+
+
+def generate_csv_numpy(filename, rows, signal='CLK', spi_freq_mhz=20, sample_rate_gsps=1.25, logic_family=3.3,
+                       noise_v=0.05, ringing_v=0.6, skew_ns=0, seed=0, channel=1, chunk_rows=1 << 20):
+    ''' numpy version of generate_csv() '''
+    np = csv_to_vhdl.np
+    rng = np.random.default_rng(seed)
+    word_bits = 8
+    idle_periods = 4
+    sample_time_s = 1 / (sample_rate_gsps * 1e9)
+    time_offset_s = -rows * sample_time_s / 10  # scope trigger: 10 % pretrigger
+    period_s = 1 / (spi_freq_mhz * 1e6)
+    frame_s = (word_bits + idle_periods) * period_s
+    words = np.random.default_rng(seed + 1).integers(0, 1 << word_bits, int(rows * sample_time_s / frame_s) + 2)
+    ringing_period_s = 4 * sample_time_s
+    ringing_tau_s = 3 * ringing_period_s
+    last_level = None
+    last_edge_row = -(1 << 62)
+
+    with open(filename, 'w', newline='\n') as csvfile:
+        csvfile.write(f"in s,C{channel} in V\n")
+        for chunk_start in range(0, rows, chunk_rows):
+            row_num = np.arange(chunk_start, min(chunk_start + chunk_rows, rows))
+            sample_time = time_offset_s + row_num * sample_time_s
+            spi_time = np.maximum(row_num * sample_time_s - skew_ns * 1e-9, 0)
+            frame_num, frame_time = np.divmod(spi_time, frame_s)
+            bit_num, bit_time = np.divmod(frame_time, period_s)
+            in_word = bit_num < word_bits
+            if signal == 'CLK':
+                level = (in_word & (bit_time >= period_s / 2)).astype(np.int8)
+            else:
+                bit_shift = np.clip(word_bits - 1 - bit_num, 0, word_bits - 1).astype(np.int64)
+                level = (in_word & ((words[frame_num.astype(np.int64)] >> bit_shift) & 1).astype(bool)).astype(np.int8)
+
+            # rows since last edge for the ringing
+            edge = np.empty(len(level), dtype=bool)
+            edge[0] = last_level is not None and level[0] != last_level
+            edge[1:] = level[1:] != level[:-1]
+            last_edge_row_arr = np.where(edge, row_num, last_edge_row)
+            np.maximum.accumulate(last_edge_row_arr, out=last_edge_row_arr)
+            time_since_edge_s = (row_num - last_edge_row_arr) * sample_time_s
+            last_level = level[-1]
+            last_edge_row = last_edge_row_arr[-1]
+
+            voltage = level * logic_family + rng.normal(0, noise_v, len(level))
+            voltage += np.where(time_since_edge_s < 5 * ringing_tau_s,
+                                ringing_v * np.exp(-time_since_edge_s / ringing_tau_s) * np.cos(2 * np.pi * time_since_edge_s / ringing_period_s) * np.where(level, 1, -1),
+                                0)
+            csvfile.write(''.join(f"{time_fl:.7E},{voltage_fl:.5E}\n" for time_fl, voltage_fl in zip(sample_time.tolist(), voltage.tolist())))
+
+
+def generate_capture_set(directory, rows, num_runs=2, spi_freq_mhz=20, skew_ns=37, seed=0):
+    ''' Generate CLK and MOSI csv files for num_runs runs, returns input_dict_list for csv_to_vhdl '''
+    input_dict_list = []
+    for run_num in range(1, num_runs + 1):
+        for channel, signal in [(1, 'CLK'), (4, 'MOSI')]:
+            generator = 'python' if csv_to_vhdl.np is None else 'numpy'
+            filepath = os.path.join(directory, f"BENCH_{generator}_{spi_freq_mhz}MHZ_SEED{seed}_{rows}_CH{channel}_{signal}_{run_num:02d}.CSV")
+            if not os.path.isfile(filepath):
+                generate_csv(filepath, rows, signal, spi_freq_mhz, skew_ns=(run_num - 1) * skew_ns, seed=seed, channel=channel)
+            input_dict_list.append({'filepath': filepath, 'vhdl_signal_name': f"spi_{signal.lower()}_stimu{run_num:02d}_sl_s", 'signal': signal, 'RUN_NUM': run_num,
+                                    'logic_family': 3.3, 'POSITIVE_GOING_VOLTAGE': 2.0, 'NEGATIVE_GOING_VOLTAGE': 0.8, 'MIN_FREQ_MHZ': spi_freq_mhz, 'ignore_time_ns': 0})
+    return input_dict_list
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss / 1024 if sys.platform != 'darwin' else peak_rss / 1024 / 1024  # kB on linux, bytes on macOS
+
+
+def bench_stage(stage, input_dict_list, param_dict):
+    ''' Run one stage (in a separate process for a separate peak RSS), returns dict of results '''
+    rows = 0
+    edges = 0
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if stage == 'readCsv':
+            start = time.perf_counter()
+            for dict_elem in input_dict_list:
+                rows += sum(1 for row in csv_to_vhdl.readCsv(dict_elem['filepath'], param_dict['CSV_Delimiter'], param_dict['maxDataRows'])) - 2  # header, time_offset
+            runtime_s = time.perf_counter() - start
+        elif stage == 'read_csv_and_get_edges':
+            start = time.perf_counter()
+            for file_num, dict_elem in enumerate(input_dict_list):
+                edges += len(csv_to_vhdl.read_csv_and_get_edges(dict_elem['filepath'], file_num, input_dict_list, param_dict)) - 1
+            runtime_s = time.perf_counter() - start
+        elif stage == 'get_and_prepare_csv_data':
+            start = time.perf_counter()
+            all_ch_level_matrix = csv_to_vhdl.get_and_prepare_csv_data(input_dict_list, param_dict)
+            runtime_s = time.perf_counter() - start
+            edges = sum(len(level_matrix) - 1 for level_matrix in all_ch_level_matrix)
+        elif stage == 'write_stimuli_file':
+            all_ch_level_matrix = csv_to_vhdl.get_and_prepare_csv_data(input_dict_list, param_dict)
+            edges = sum(len(level_matrix) - 1 for level_matrix in all_ch_level_matrix)
+            start = time.perf_counter()
+            csv_to_vhdl.write_stimuli_file(os.path.dirname(input_dict_list[0]['filepath']), all_ch_level_matrix,
+                                           [dict_elem['vhdl_signal_name'] for dict_elem in input_dict_list],
+                                           [dict_elem['RUN_NUM'] for dict_elem in input_dict_list],
+                                           [dict_elem['signal'] for dict_elem in input_dict_list],
+                                           [dict_elem['MIN_FREQ_MHZ'] for dict_elem in input_dict_list], param_dict)
+            runtime_s = time.perf_counter() - start
+        else:
+            raise ValueError(f"unknown stage {stage}")
+
+    if stage in ('read_csv_and_get_edges', 'get_and_prepare_csv_data'):
+        rows = sum(csv_to_vhdl.csv_num_rows(dict_elem['filepath']) - 1 for dict_elem in input_dict_list)
+    return {'runtime_s': runtime_s,
+            'rows_per_s': rows / runtime_s if rows else None,
+            'edges_per_s': edges / runtime_s if edges else None,
+            'rows': rows,
+            'edges': edges,
+            'peak_rss_mb': peak_rss_mb()}
+
+
+def compare_results(old_results, new_results, tolerance=0.1):
+    ''' Print runtime change per stage, returns list of stages which are slower than tolerance '''
+    regression_list = []
+    for stage, new_result in new_results['results'].items():
+        old_result = old_results['results'].get(stage)
+        if old_result is None:
+            continue
+        change = new_result['runtime_s'] / old_result['runtime_s'] - 1
+        print(f"{stage:<28} {old_result['runtime_s']:10.3f} s -> {new_result['runtime_s']:10.3f} s ({change:+.1%})")
+        if change > tolerance:
+            regression_list.append(stage)
+    return regression_list
+
+
+def parse_param(param_str):
+    key, value = param_str.split('=', 1)
+    try:
+        value = json.loads(value)
+    except json.JSONDecodeError:
+        pass  # plain string
+    return key, value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark csv_to_vhdl.py with generated oscilloscope data")
+    parser.add_argument('--rows', type=int, default=100000, help="rows per csv file (1e5 .. 1e8)")
+    parser.add_argument('--runs', type=int, default=2, help="num of runs (each with a CLK and a MOSI file)")
+    parser.add_argument('--spi-freq-mhz', type=float, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"), help="generated csv files are reused from here")
+    parser.add_argument('--stage', action='append', choices=['readCsv', 'read_csv_and_get_edges', 'get_and_prepare_csv_data', 'write_stimuli_file'],
+                        help="stage(s) to measure, default: all")
+    parser.add_argument('--param', action='append', default=[], type=parse_param, help="param_dict entry, e.g. --param EDGE_ENGINE=numpy")
+    parser.add_argument('--output', help="json file for the results")
+    parser.add_argument('--compare', help="json file of a previous benchmark -> exit code 1 if a stage got slower than --tolerance")
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    input_dict_list = generate_capture_set(args.data_dir, args.rows, args.runs, args.spi_freq_mhz, seed=args.seed)
+    param_dict = {
+        'maxDataRows': None,
+        'RESOLUTION': "ns",
+        'VHD_DO_FILENAME': "bench_decoded_file.vhd",
+        'MAX_WAIT_TIME_NS': 10000,
+        'MAX_SIM_TIME_US': 1e9,  # no break
+        'MAX_FREQ_MHZ': 200,
+        'DO_SYNC': True,
+        'CSV_Delimiter': ','
+    }
+    param_dict.update(dict(args.param))
+
+    results = {'date': datetime.datetime.now().isoformat(timespec='seconds'),
+               'python': platform.python_version(),
+               'platform': platform.platform(),
+               'numpy': None if csv_to_vhdl.np is None else csv_to_vhdl.np.__version__,
+               'generator': 'python' if csv_to_vhdl.np is None else 'numpy',
+               'rows': args.rows,
+               'runs': args.runs,
+               'param_dict': param_dict,
+               'results': {}}
+    for stage in args.stage or ['readCsv', 'read_csv_and_get_edges', 'get_and_prepare_csv_data', 'write_stimuli_file']:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            result = executor.submit(bench_stage, stage, input_dict_list, param_dict).result()
+        results['results'][stage] = result
+        rows_per_s = f"{result['rows_per_s']:12.0f} rows/s" if result['rows_per_s'] else f"{'':>19}"
+        edges_per_s = f"{result['edges_per_s']:12.0f} edges/s" if result['edges_per_s'] else f"{'':>20}"
+        print(f"{stage:<28} {result['runtime_s']:10.3f} s {rows_per_s} {edges_per_s} {result['peak_rss_mb'] or 0:10.1f} MB")
+
+    if args.output:
+        with open(args.output, 'w') as jsonfile:
+            json.dump(results, jsonfile, indent=2)
+    if args.compare:
+        with open(args.compare) as jsonfile:
+            regression_list = compare_results(json.load(jsonfile), results, args.tolerance)
+        if regression_list:
+            print(f"REGRESSION in {regression_list}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
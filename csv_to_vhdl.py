@@ -34,33 +34,298 @@ This python-script reads csv-data (e.g. taken from a oscilloscope measurement) a
 @author: Simon Buhrow
 '''
 
+import ast
+import bisect
+import bz2
+import contextlib
 import csv
 import datetime
+import gzip
+import hashlib
+import heapq
+import inspect
+import io
+import itertools
+import json
+import lzma
+import mmap
 import os
 import math
+import re
+import struct
+import sys
+import threading
 import time
-
-TEST_MODE = False  # boolean: True, False
+import zlib
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, get_edges() is used as pure python fallback
+    np = None
+
+TEST_MODE = False  # boolean: True, False -> True: default trace level "debug" (see Tracer)
+
+TRACE_LEVELS = {'off': 0, 'info': 1, 'debug': 2, 'event': 3}  # 'event': traces per row/transition of the hot loops
+
+
+class Tracer:
+    ''' Debug tracing with levels, lazy formatting and sampling of the per event traces
+
+        tracer.trace('debug', "time_delta_ps: %s", time_delta_ps) formats the message only if the level is enabled.
+        The hot loops of iter_csv_edges_of_columns() and write_stimuli_file() get sample_every() once before the loop and trace
+        only every Nth row/transition, so disabled tracing costs one test of a local variable per event.
+        Configured by a spec "level" or "level:N" (every Nth event), e.g. "debug" or "event:1000":
+        process wide with the environment variable CSV_TO_VHDL_TRACE or tracer.configure(),
+        per thread with tracing() (param_dict['TRACE'] of a conversion), which is passed on to the workers of submit_with_metrics().
+    '''
+
+    def __init__(self, spec='off', stream=None):
+        self.stream = stream  # None: sys.stdout
+        self.local = threading.local()  # config of tracing() in the current thread
+        self.default_config = self.parse_spec('off')
+        self.configure(spec)
+
+    @staticmethod
+    def parse_spec(spec):
+        ''' (spec, level, sample_every_n) of a trace spec '''
+        level, _, sample_every_n = spec.partition(':')
+        if level not in TRACE_LEVELS or not (sample_every_n or '1').isdigit() or int(sample_every_n or 1) < 1:
+            raise ValueError(f"illegal trace spec '{spec}', expected one of {list(TRACE_LEVELS)} with optional ':N' (N >= 1)")
+        return spec, TRACE_LEVELS[level], int(sample_every_n or 1)
+
+    def configure(self, spec):
+        ''' Set the process wide trace spec (threads within tracing() keep theirs), returns the previous spec '''
+        previous_spec = self.default_config[0]
+        self.default_config = self.parse_spec(spec)
+        return previous_spec
+
+    def get_config(self):
+        ''' (spec, level, sample_every_n) of the current thread '''
+        return getattr(self.local, 'config', None) or self.default_config
+
+    @property
+    def spec(self):
+        return self.get_config()[0]
+
+    def enabled(self, level):
+        return self.get_config()[1] >= TRACE_LEVELS[level]
+
+    def sample_every(self):
+        ''' N of the sampled event traces (every Nth row/transition), 0: event traces disabled '''
+        spec, level, sample_every_n = self.get_config()
+        return sample_every_n if level >= TRACE_LEVELS['event'] else 0
+
+    def trace(self, level, msg, *args):
+        ''' Print msg % args if level is enabled '''
+        if self.get_config()[1] >= TRACE_LEVELS[level]:
+            print(msg % args if args else msg, file=self.stream)
+
+
+tracer = Tracer(os.environ.get('CSV_TO_VHDL_TRACE', 'debug' if TEST_MODE else 'off'))
+
+
+@contextlib.contextmanager
+def tracing(spec):
+    ''' Trace with spec (see Tracer) in the current thread in the with block, None: keep the current setting '''
+    if spec is None:
+        yield tracer
+        return
+    config = tracer.parse_spec(spec)
+    previous_config = getattr(tracer.local, 'config', None)
+    tracer.local.config = config
+    try:
+        yield tracer
+    finally:
+        tracer.local.config = previous_config
 
 
 def debug_print(str_to_print):
-    if TEST_MODE is True:
-        print(str_to_print)
+    tracer.trace('debug', '%s', str_to_print)
+
+
+class PipelineMetrics:
+    ''' Performance metrics of a conversion: runtimes per stage and file (time.perf_counter), counters and peak memory
+
+        Functions of this module record into the metrics of the current thread (see collect_metrics()),
+        workers of get_and_prepare_csv_data() record into their own metrics which are merged afterwards.
+    '''
+    COUNTER_NAMES = ('rows_parsed', 'edges_found', 'sync_events', 'lines_written')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.start_time = time.perf_counter()
+        self.stage_dict = {}  # stage -> {'runtime_s': ..., 'calls': ...}
+        self.file_dict = {}  # file -> {'runtime_s': ..., 'rows': ..., 'edges': ...}
+        self.counter_dict = {counter_name: 0 for counter_name in self.COUNTER_NAMES}
+        self.peak_rss_mb = None
+
+    def add_stage(self, stage, runtime_s):
+        with self.lock:
+            stage_metrics = self.stage_dict.setdefault(stage, {'runtime_s': 0.0, 'calls': 0})
+            stage_metrics['runtime_s'] += runtime_s
+            stage_metrics['calls'] += 1
+
+    def add_file(self, filename, runtime_s=0.0, rows=0, edges=0):
+        with self.lock:
+            file_metrics = self.file_dict.setdefault(filename, {'runtime_s': 0.0, 'rows': 0, 'edges': 0})
+            file_metrics['runtime_s'] += runtime_s
+            file_metrics['rows'] += rows
+            file_metrics['edges'] += edges
+            self.counter_dict['rows_parsed'] += rows
+            self.counter_dict['edges_found'] += edges
+
+    def count(self, counter_name, value=1):
+        with self.lock:
+            self.counter_dict[counter_name] = self.counter_dict.get(counter_name, 0) + value
+
+    def update_peak_memory(self):
+        try:
+            import resource
+        except ImportError:  # not available on Windows
+            return
+        peak_rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+        peak_rss_mb = peak_rss / 1024 if os.uname().sysname != 'Darwin' else peak_rss / 1024 / 1024  # kB on linux, bytes on macOS
+        with self.lock:
+            self.peak_rss_mb = max(self.peak_rss_mb or 0, peak_rss_mb)
+
+    def merge(self, metrics_dict):
+        ''' Add the metrics of a worker (see to_dict()) '''
+        with self.lock:
+            for stage, stage_metrics in metrics_dict['stages'].items():
+                own_stage_metrics = self.stage_dict.setdefault(stage, {'runtime_s': 0.0, 'calls': 0})
+                own_stage_metrics['runtime_s'] += stage_metrics['runtime_s']
+                own_stage_metrics['calls'] += stage_metrics['calls']
+            for filename, file_metrics in metrics_dict['files'].items():
+                own_file_metrics = self.file_dict.setdefault(filename, {'runtime_s': 0.0, 'rows': 0, 'edges': 0})
+                for key, value in file_metrics.items():
+                    own_file_metrics[key] += value
+            for counter_name, value in metrics_dict['counters'].items():
+                self.counter_dict[counter_name] = self.counter_dict.get(counter_name, 0) + value
+            if metrics_dict['peak_rss_mb'] is not None:
+                self.peak_rss_mb = max(self.peak_rss_mb or 0, metrics_dict['peak_rss_mb'])
+
+    def to_dict(self):
+        with self.lock:
+            return {'runtime_s': time.perf_counter() - self.start_time,
+                    'stages': {stage: dict(stage_metrics) for stage, stage_metrics in self.stage_dict.items()},
+                    'files': {filename: dict(file_metrics) for filename, file_metrics in self.file_dict.items()},
+                    'counters': dict(self.counter_dict),
+                    'peak_rss_mb': self.peak_rss_mb}
+
+    def to_line_protocol(self):
+        ''' Metrics in (InfluxDB) line protocol '''
+        metrics_dict = self.to_dict()
+        timestamp_ns = time.time_ns()
+        line_list = [f"csv_to_vhdl runtime_s={metrics_dict['runtime_s']}," + ','.join(f"{key}={value}i" for key, value in metrics_dict['counters'].items())
+                     + ('' if metrics_dict['peak_rss_mb'] is None else f",peak_rss_mb={metrics_dict['peak_rss_mb']}") + f" {timestamp_ns}"]
+        for stage, stage_metrics in metrics_dict['stages'].items():
+            line_list.append(f"csv_to_vhdl_stage,stage={stage} runtime_s={stage_metrics['runtime_s']},calls={stage_metrics['calls']}i {timestamp_ns}")
+        for filename, file_metrics in metrics_dict['files'].items():
+            file_tag = filename.replace(' ', '\\ ').replace(',', '\\,').replace('=', '\\=')
+            line_list.append(f"csv_to_vhdl_file,file={file_tag} runtime_s={file_metrics['runtime_s']},rows={file_metrics['rows']}i,edges={file_metrics['edges']}i {timestamp_ns}")
+        return '\n'.join(line_list) + '\n'
+
+    def write(self, filename):
+        ''' Write metrics to filename: json for '.json', else line protocol '''
+        with open(filename, 'w') as metricsfile:
+            if os.path.splitext(filename)[1] == '.json':
+                json.dump(self.to_dict(), metricsfile, indent=2)
+            else:
+                metricsfile.write(self.to_line_protocol())
+
+    def summary(self):
+        metrics_dict = self.to_dict()
+        line_list = [f"runtime: {metrics_dict['runtime_s']:0.3f} s, " + ', '.join(f"{key}: {value}" for key, value in metrics_dict['counters'].items())
+                     + ('' if not metrics_dict['counters'].get('envelope_blocks') else f", envelope blocks skipped: {metrics_dict['counters']['envelope_blocks_skipped'] / metrics_dict['counters']['envelope_blocks']:0.1%}")
+                     + ('' if metrics_dict['peak_rss_mb'] is None else f", peak memory: {metrics_dict['peak_rss_mb']:0.1f} MB")]
+        line_list += [f"\tstage {stage}: {stage_metrics['runtime_s']:0.3f} s" for stage, stage_metrics in metrics_dict['stages'].items()]
+        line_list += [f"\tfile {filename}: {file_metrics['runtime_s']:0.3f} s, {file_metrics['rows']} rows, {file_metrics['edges']} edges" for filename, file_metrics in metrics_dict['files'].items()]
+        return '\n'.join(line_list)
+
+
+_metrics_local = threading.local()
+
+
+def get_metrics():
+    ''' PipelineMetrics of the current thread, None if not collecting '''
+    return getattr(_metrics_local, 'metrics', None)
+
+
+@contextlib.contextmanager
+def collect_metrics(metrics):
+    ''' Record the metrics of the current thread into metrics '''
+    previous_metrics = get_metrics()
+    _metrics_local.metrics = metrics
+    try:
+        yield metrics
+    finally:
+        _metrics_local.metrics = previous_metrics
+
+
+def run_with_metrics(func, *args, trace_spec=None):
+    ''' Run func in a worker (thread or process) with its own metrics and the trace spec of the submitting thread, returns (result, metrics dict) '''
+    metrics = PipelineMetrics()
+    with collect_metrics(metrics), tracing(trace_spec):
+        result = func(*args)
+    metrics.update_peak_memory()
+    return result, metrics.to_dict()
+
+
+class MetricsFuture:
+    ''' Future of run_with_metrics(): result() returns the result of func and merges the worker metrics into metrics '''
+
+    def __init__(self, future, metrics):
+        self.future = future
+        self.metrics = metrics
+
+    def result(self):
+        result, metrics_dict = self.future.result()
+        if self.metrics is not None:
+            self.metrics.merge(metrics_dict)
+            self.metrics = None  # merge only once
+        return result
+
+
+def submit_with_metrics(executor, func, *args):
+    ''' executor.submit() which collects the metrics of the worker into the metrics of the current thread '''
+    return MetricsFuture(executor.submit(run_with_metrics, func, *args, trace_spec=tracer.spec), get_metrics())
 
 
 def time_wrapper(func):  # accepts all arguments
+    ''' Record the runtime of func as stage into the current PipelineMetrics, print it if no metrics are collected
 
-    def _wrapper(*args, **kwargs):  # accepts all arguments
-        start = time.time()
-        _return = func(*args, **kwargs)  # execute the actual function
-
-        end = time.time()  # function executed, time is calculated with ms precision
-
-        # calculate execution time is seconds (if t > 0), else in ms
-        _exce_time = f"{(end - start):0.2f} s" if int(end - start) > 0 else f"{(end - start)*1e3:0.2f} ms"
-        print(f"\t\t\t\t\t\t\t\t\tRuntime '{func.__name__}': {_exce_time}")
-        return _return
+        For generator functions the runtime is from the first row until the generator is exhausted (incl. processing of the rows).
+    '''
 
+    def _record(start):
+        runtime_s = time.perf_counter() - start
+        metrics = get_metrics()
+        if metrics is not None:
+            metrics.add_stage(func.__name__, runtime_s)
+        else:
+            # calculate execution time is seconds (if t > 0), else in ms
+            _exce_time = f"{runtime_s:0.2f} s" if int(runtime_s) > 0 else f"{runtime_s*1e3:0.2f} ms"
+            print(f"\t\t\t\t\t\t\t\t\tRuntime '{func.__name__}': {_exce_time}")
+
+    if inspect.isgeneratorfunction(func):
+        def _wrapper(*args, **kwargs):  # accepts all arguments
+            start = time.perf_counter()
+            try:
+                yield from func(*args, **kwargs)  # execute the actual function
+            finally:
+                _record(start)
+    else:
+        def _wrapper(*args, **kwargs):  # accepts all arguments
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)  # execute the actual function
+            finally:
+                _record(start)
+
+    _wrapper.__name__ = func.__name__
+    _wrapper.__qualname__ = func.__qualname__  # picklable for process pools
+    _wrapper.__doc__ = func.__doc__
     return _wrapper
 
 
@@ -70,27 +335,164 @@ def get_header_info(header_str, device="RTB2004"):
         pass  # TODO
 
 
+COMPRESSION_MAGIC = {b'\x1f\x8b': 'gzip', b'BZh': 'bz2', b'\xfd7zXZ\x00': 'xz'}  # compressed input files are detected by their magic bytes
+GZIP_MEMBER_MAGIC = b'\x1f\x8b\x08'
+
+
+def get_compression(filename):
+    ''' Compression of an input file: "gzip", "bz2", "xz" or None '''
+    with open(filename, 'rb') as infile:
+        magic = infile.read(6)
+    for compression_magic, compression in COMPRESSION_MAGIC.items():
+        if magic.startswith(compression_magic):
+            return compression
+    return None
+
+
+def decompress_gzip_range(mapped_file, byte_start, byte_stop):
+    ''' Decompress the gzip members in mapped_file[byte_start:byte_stop], None if the range is no sequence of complete members '''
+    data_list = []
+    data = mapped_file[byte_start:byte_stop]
+    try:
+        while data:
+            decompressor = zlib.decompressobj(31)  # 31: gzip header and trailer
+            data_list.append(decompressor.decompress(data))
+            if not decompressor.eof:
+                return None
+            data = decompressor.unused_data
+    except zlib.error:
+        return None
+    return data_list
+
+
+def iter_decompressed_chunks(filename, compression, decompress_workers=1, chunk_bytes=1024 * 1024):
+    ''' Yield the decompressed data of a compressed file in chunks
+
+        Multi member gzip files (e.g. bgzip) are split at member borders and decompressed by decompress_workers threads in parallel,
+        ranges which turn out not to be complete members are decompressed serially.
+    '''
+    open_func = {'gzip': gzip.open, 'bz2': bz2.open, 'xz': lzma.open}[compression]
+    byte_start = 0
+    if compression == 'gzip' and decompress_workers > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with open(filename, 'rb') as infile:
+            with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+                # candidates of member borders every ~chunk_bytes (the magic can also be part of the compressed data)
+                border_list = [0]
+                while True:
+                    border = mapped_file.find(GZIP_MEMBER_MAGIC, border_list[-1] + chunk_bytes)
+                    if border < 0:
+                        break
+                    border_list.append(border)
+                border_list.append(len(mapped_file))
+
+                # zlib releases the GIL: threads decompress in parallel, results are used in order
+                with ThreadPoolExecutor(max_workers=decompress_workers) as executor:
+                    future_list = []
+                    range_list = list(zip(border_list[:-1], border_list[1:]))
+                    submitted_range_cnt = 0
+                    for range_start, range_stop in range_list:
+                        while len(future_list) < 2 * decompress_workers and submitted_range_cnt < len(range_list):
+                            future_list.append(executor.submit(decompress_gzip_range, mapped_file, *range_list[submitted_range_cnt]))
+                            submitted_range_cnt += 1
+                        data_list = future_list.pop(0).result()
+                        if data_list is None:  # no complete members: the start is a member border (end of the previous range) -> serial from here
+                            for future in future_list:
+                                future.cancel()
+                            break
+                        yield from data_list
+                        byte_start = range_stop
+        if byte_start >= os.path.getsize(filename):
+            return
+
+    with open(filename, 'rb') as infile:
+        infile.seek(byte_start)
+        with open_func(infile, 'rb') as decompressed_file:
+            for data in iter(lambda: decompressed_file.read(chunk_bytes), b''):
+                yield data
+
+
+class DecompressedFile(io.RawIOBase):
+    ''' Read only file of the decompressed data of a compressed file, decompressed in a background thread (see iter_decompressed_chunks()) '''
+
+    def __init__(self, filename, compression, decompress_workers=1, chunk_bytes=1024 * 1024):
+        super().__init__()
+        self.chunk_stream = BufferedEdgeStream(iter_decompressed_chunks(filename, compression, decompress_workers, chunk_bytes), 4)
+        self.chunk_iter = iter(self.chunk_stream)
+        self.chunk = memoryview(b'')
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self.chunk:
+            self.chunk = memoryview(next(self.chunk_iter, b''))
+        num_bytes = min(len(buffer), len(self.chunk))
+        buffer[:num_bytes] = self.chunk[:num_bytes]
+        self.chunk = self.chunk[num_bytes:]
+        return num_bytes
+
+    def close(self):
+        if not self.closed:
+            self.chunk_stream.close()
+        super().close()
+
+
+def open_input(filename, mode='r', decompress_workers=1):
+    ''' open() for input files, compressed files (see get_compression()) are decompressed transparently while reading '''
+    compression = get_compression(filename)
+    if compression is None:
+        return open(filename, mode)
+    decompressed_file = io.BufferedReader(DecompressedFile(filename, compression, decompress_workers), buffer_size=1024 * 1024)
+    return decompressed_file if 'b' in mode else io.TextIOWrapper(decompressed_file)
+
+
 def csv_num_rows(filename):
-    with open(filename, 'r') as csvfile:
+    with open_input(filename, 'r') as csvfile:
         return sum(1 for line in csvfile)
 
 
 @time_wrapper
-def readCsv(filename, delimiter_arg=',', max_row=None):
+def readCsv(filename, delimiter_arg=',', max_row=None, start_time_ns=None, stop_time_ns=None, decompress_workers=1):
     print(f"Read data from {filename} ")
 
-    with open(filename, 'r') as csvfile:
+    compression = get_compression(filename)
+    with open_input(filename, 'r', decompress_workers) as csvfile:
         filereader = csv.reader(csvfile, delimiter=delimiter_arg, quotechar='|')
         header = next(filereader)
         yield header
 
         # read first line for offset separately to fasten for loop (saving one 'if' sequence)
         row = next(filereader)  # = time_logiclevel_tuple
-        debug_print(row)
+        tracer.trace('debug', "first row: %s", row)
         time_offset = float(row[0])  # depending on null line of osci there might be negative time values which have to be converted via the time_offset
         yield time_offset
 
-        yield list(map(float, row))  # return list with column values converted to float
+        if start_time_ns is None and stop_time_ns is None:
+            yield list(map(float, row))  # return list with column values converted to float
+        elif compression is not None:
+            # compressed file: no seek, skip the rows before the time window
+            filereader = itertools.chain([row], filereader)
+            if start_time_ns is not None:
+                filereader = itertools.dropwhile(lambda row: float(row[0]) + abs(time_offset) < start_time_ns / 1e9, filereader)
+            row = next(filereader, None)
+            if row is None or (stop_time_ns is not None and float(row[0]) + abs(time_offset) > stop_time_ns / 1e9):
+                raise ValueError(f"no data in time window {start_time_ns} ns .. {stop_time_ns} ns")
+            yield list(map(float, row))
+            if stop_time_ns is not None:
+                filereader = itertools.takewhile(lambda row: float(row[0]) + abs(time_offset) <= stop_time_ns / 1e9, filereader)
+        else:
+            # seek to the time window (see get_csv_time_window()), the first row of the window replaces the first row of the file
+            with open(filename, 'rb') as binfile:
+                data_start = len(binfile.readline())
+                with mmap.mmap(binfile.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+                    row, block_start, block_stop = get_csv_time_window(mapped_file, data_start, len(mapped_file), delimiter_arg, time_offset, start_time_ns, stop_time_ns)
+            yield row
+            csvfile.seek(block_start)
+            filereader = csv.reader(csvfile, delimiter=delimiter_arg, quotechar='|')
+            if stop_time_ns is not None:
+                filereader = itertools.takewhile(lambda row: float(row[0]) + abs(time_offset) <= stop_time_ns / 1e9, filereader)
 
         # read all further rows     -> put `if max_row is not None` outside of for-loop to fasten loop
         if max_row is not None:
@@ -104,6 +506,472 @@ def readCsv(filename, delimiter_arg=',', max_row=None):
                 yield(list(map(float, row)))  # return list with column values converted to float
 
 
+def parse_csv_block(data, delimiter_arg=',', num_columns=2, block_offset=0):
+    ''' Parse a block of complete csv lines (bytes) into one flat float buffer per column
+
+        Returns a list of columns, numpy arrays if numpy is installed else array('d').
+        Blocks with rows of another number of columns or empty lines are parsed row by row (see parse_csv_rows()).
+        block_offset: byte offset of the block in the file (error messages only)
+    '''
+    delimiter = delimiter_arg.encode()
+    data = data.strip()
+    if not data:
+        return [array('d') for column in range(num_columns)]
+    if b'\n\n' in data or b'\n\r\n' in data:  # empty lines
+        return parse_csv_rows(data, delimiter_arg, num_columns, block_offset)
+    # every line needs num_columns - 1 delimiters, else the flat list of values would pair the values of different rows
+    num_lines = data.count(b'\n') + 1
+    if np is not None:
+        byte_arr = np.frombuffer(data, dtype=np.uint8)
+        separators = byte_arr[(byte_arr == delimiter[0]) | (byte_arr == ord('\n'))]  # valid: (num_columns - 1) delimiters, newline, ...
+        if separators.size != num_lines * num_columns - 1 or np.any(separators[num_columns - 1::num_columns] != ord('\n')):
+            return parse_csv_rows(data, delimiter_arg, num_columns, block_offset)
+    elif any(line.count(delimiter) != num_columns - 1 for line in data.split(b'\n')):
+        return parse_csv_rows(data, delimiter_arg, num_columns, block_offset)
+    flat_data = data.replace(b'\n', delimiter)  # one flat list of values, '\r' is ignored as whitespace
+    if np is not None:
+        values = np.fromstring(flat_data, dtype=np.float64, sep=delimiter_arg)
+        values = values.reshape(-1, num_columns)
+        return [values[:, column] for column in range(num_columns)]
+    values = array('d', map(float, flat_data.split(delimiter)))
+    return [values[column::num_columns] for column in range(num_columns)]
+
+
+def parse_csv_rows(data, delimiter_arg=',', num_columns=2, block_offset=0):
+    ''' Parse a block of csv lines (bytes) row by row with the csv reader, same result as readCsv()
+
+        Further columns of a row are ignored, empty lines are skipped.
+        Raises ValueError for rows with less than num_columns columns.
+    '''
+    columns = [array('d') for column in range(num_columns)]
+    for line_num, row in enumerate(csv.reader(data.decode().splitlines(), delimiter=delimiter_arg, quotechar='|')):
+        if not row:
+            continue
+        if len(row) < num_columns:
+            raise ValueError(f"csv block at byte offset {block_offset}, line {line_num}: {len(row)} columns instead of {num_columns}")
+        for column in range(num_columns):
+            columns[column].append(float(row[column]))
+    if np is not None:
+        return [np.frombuffer(column, dtype=np.float64) for column in columns]
+    return columns
+
+
+@time_wrapper
+def readCsvBlocks(filename, delimiter_arg=',', max_row=None, block_bytes=16 * 1024 * 1024, start_time_ns=None, stop_time_ns=None, decompress_workers=1):
+    ''' Read csv-data blockwise (high throughput alternative to readCsv())
+
+        Yields header, time_offset and the first row like readCsv(),
+        followed by blocks of rows. Every block is a list of columns (see parse_csv_block()).
+        max_row: same as readCsv(), number of rows following the first row
+        start_time_ns, stop_time_ns: only read the rows of this time window (see get_csv_time_window()), not for compressed files
+    '''
+    print(f"Read data from {filename} ")
+
+    compression = get_compression(filename)
+    with open_input(filename, 'rb', decompress_workers) as csvfile:
+        header_line = csvfile.readline()
+        header = next(csv.reader([header_line.decode()], delimiter=delimiter_arg, quotechar='|'))
+        yield header
+
+        row_line = csvfile.readline()
+        row = list(map(float, row_line.split(delimiter_arg.encode())))
+        time_offset = row[0]  # depending on null line of osci there might be negative time values which have to be converted via the time_offset
+        yield time_offset
+
+        num_columns = len(row)
+        if compression is not None:
+            if start_time_ns is not None or stop_time_ns is not None:
+                raise ValueError(f"{filename}: time windows of compressed files are read by readCsv()")
+            yield row
+            yield from limit_csv_blocks(iter_csv_stream_blocks(csvfile, delimiter_arg, num_columns, block_bytes, len(header_line) + len(row_line)), max_row)
+            return
+
+        block_start = csvfile.tell()
+        file_size = os.fstat(csvfile.fileno()).st_size
+        if start_time_ns is None and stop_time_ns is None:
+            yield row
+            if block_start >= file_size:
+                return
+
+        with mmap.mmap(csvfile.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+            if start_time_ns is not None or stop_time_ns is not None:
+                row, block_start, file_size = get_csv_time_window(mapped_file, len(header_line), file_size, delimiter_arg, time_offset, start_time_ns, stop_time_ns)
+                yield row
+            yield from limit_csv_blocks(iter_csv_blocks(mapped_file, block_start, file_size, delimiter_arg, num_columns, block_bytes), max_row)
+
+
+def limit_csv_blocks(block_generator, max_row=None):
+    ''' Yield the blocks of block_generator up to max_row rows in total (None: all) '''
+    rows_left = max_row
+    for columns in block_generator:
+        if rows_left is not None:
+            if len(columns[0]) >= rows_left:
+                columns = [column[:rows_left] for column in columns]
+            rows_left -= len(columns[0])
+        if len(columns[0]):
+            yield columns
+        if rows_left == 0:
+            break
+
+
+def iter_csv_stream_blocks(csvfile, delimiter_arg=',', num_columns=2, block_bytes=16 * 1024 * 1024, block_offset=0):
+    ''' Parse the complete csv lines of a (not seekable) binary file object blockwise, yields list of columns per block
+
+        block_offset: byte offset of the current position of csvfile in the (decompressed) data, for error messages
+    '''
+    line_rest = b''
+    while True:
+        data = csvfile.read(block_bytes)
+        if not data:
+            if line_rest.strip():
+                yield parse_csv_block(line_rest, delimiter_arg, num_columns, block_offset)
+            return
+        data = line_rest + data
+        block_end = data.rfind(b'\n') + 1
+        line_rest = data[block_end:]
+        if block_end:
+            yield parse_csv_block(data[:block_end], delimiter_arg, num_columns, block_offset)
+            block_offset += block_end
+
+
+def iter_csv_blocks(mapped_file, block_start, block_stop, delimiter_arg=',', num_columns=2, block_bytes=16 * 1024 * 1024):
+    ''' Parse the complete csv lines of mapped_file[block_start:block_stop] blockwise, yields list of columns per block '''
+    while block_start < block_stop:
+        block_end = min(block_start + block_bytes, block_stop)
+        if block_end < block_stop:
+            # cut block after the last complete line
+            last_newline = mapped_file.rfind(b'\n', block_start, block_end)
+            if last_newline < 0:
+                last_newline = mapped_file.find(b'\n', block_end, block_stop)
+                if last_newline < 0:
+                    last_newline = block_stop - 1
+            block_end = last_newline + 1
+        yield parse_csv_block(mapped_file[block_start:block_end], delimiter_arg, num_columns, block_start)
+        block_start = block_end
+
+
+def get_csv_chunks(filename, delimiter_arg=',', num_chunks=2):
+    ''' Split the data rows of a csv file into byte ranges of complete lines
+
+        Returns header, first row and a list of (byte_start, byte_stop) tuples.
+        The first row (used for time_offset and the initial level) is not part of the chunks.
+    '''
+    with open(filename, 'rb') as csvfile:
+        header_line = csvfile.readline()
+        header = next(csv.reader([header_line.decode()], delimiter=delimiter_arg, quotechar='|'))
+        row = list(map(float, csvfile.readline().split(delimiter_arg.encode())))
+        data_start = csvfile.tell()
+        file_size = os.fstat(csvfile.fileno()).st_size
+        if data_start >= file_size:
+            return header, row, []
+
+        chunk_bytes = max(1, (file_size - data_start) // num_chunks)
+        chunk_list = []
+        chunk_start = data_start
+        with mmap.mmap(csvfile.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+            while chunk_start < file_size:
+                chunk_stop = mapped_file.find(b'\n', chunk_start + chunk_bytes)
+                chunk_stop = file_size if (chunk_stop < 0 or len(chunk_list) == num_chunks - 1) else chunk_stop + 1
+                chunk_list.append((chunk_start, chunk_stop))
+                chunk_start = chunk_stop
+    return header, row, chunk_list
+
+
+def get_time_window_ns(input_dict, param_dict):
+    ''' Time window (start_time_ns, stop_time_ns) to read of an input, None = start/end of the file
+
+        input_dict['start_time_ns'], input_dict['stop_time_ns'] overrule param_dict['START_TIME_NS'], param_dict['STOP_TIME_NS'].
+        The times are on the time axis of the level matrix before ignore_time_ns is subtracted: time + abs(time_offset).
+    '''
+    return input_dict.get('start_time_ns', param_dict.get('START_TIME_NS')), input_dict.get('stop_time_ns', param_dict.get('STOP_TIME_NS'))
+
+
+def bisect_time(get_time, lo, hi, is_after):
+    ''' Binary search: first index of [lo, hi) with is_after(get_time(index)) (monotonic), hi if there is none '''
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if is_after(get_time(mid)):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+def get_csv_time_window(mapped_file, data_start, data_stop, delimiter_arg, time_offset, start_time_ns=None, stop_time_ns=None):
+    ''' Find the rows of a time window in a csv file by binary search over the byte offsets (time column has to increase monotonically)
+
+        Returns the first row of the window (list of floats), the byte offset of the following row and the byte offset after the window.
+        data_start: byte offset of the first data row
+    '''
+    delimiter = delimiter_arg.encode()
+
+    def get_time(byte_offset):  # time of the line containing byte_offset
+        line_start = mapped_file.rfind(b'\n', 0, byte_offset) + 1
+        return float(mapped_file[line_start:mapped_file.find(delimiter, line_start)])
+
+    # bytes of a line share its time: the first byte of the window is a line start
+    window_start = data_start
+    if start_time_ns is not None:
+        window_start = bisect_time(get_time, data_start, data_stop, lambda time_fl: time_fl + abs(time_offset) >= start_time_ns / 1e9)
+    window_stop = data_stop
+    if stop_time_ns is not None:
+        window_stop = bisect_time(get_time, window_start, data_stop, lambda time_fl: time_fl + abs(time_offset) > stop_time_ns / 1e9)
+    first_line_end = mapped_file.find(b'\n', window_start, window_stop)
+    first_line_end = window_stop if first_line_end < 0 else first_line_end + 1
+    first_line = mapped_file[window_start:first_line_end].strip()
+    if not first_line:
+        raise ValueError(f"no data in time window {start_time_ns} ns .. {stop_time_ns} ns")
+    return list(map(float, first_line.split(delimiter))), first_line_end, window_stop
+
+
+CSV_INDEX_VERSION = 1
+
+
+def get_csv_index_path(csv_filepath):
+    return f"{csv_filepath}.idx"
+
+
+def get_csv_index_level_key(input_dict):
+    ''' Key of the hysteresis levels of an input in the csv index: the levels depend on column, thresholds and ignore_time_ns '''
+    return f"{input_dict.get('column', 1)},{input_dict['logic_family']},{input_dict['POSITIVE_GOING_VOLTAGE']},{input_dict['NEGATIVE_GOING_VOLTAGE']},{input_dict['ignore_time_ns']}"
+
+
+def build_csv_index(csv_filepath, input_dict_list, delimiter_arg=',', index_bytes=4 * 1024 * 1024, block_bytes=16 * 1024 * 1024):
+    ''' Build the sparse index of a csv file: every ~index_bytes the byte offset of a row, its time and the hysteresis level before it
+
+        The levels are calculated for every input of input_dict_list (see get_csv_index_level_key()).
+        Returns the index as dict, see get_csv_index().
+    '''
+    get_edges_func = get_edges_vectorized if np is not None else get_edges_block
+    with open(csv_filepath, 'rb') as csvfile:
+        header_line = csvfile.readline()
+        row1 = list(map(float, csvfile.readline().split(delimiter_arg.encode())))
+        data_start = csvfile.tell()
+        file_stat = os.fstat(csvfile.fileno())
+        level_key_dict = {get_csv_index_level_key(input_dict): input_dict for input_dict in input_dict_list}
+        csv_index = {'version': CSV_INDEX_VERSION, 'size': file_stat.st_size, 'mtime_ns': file_stat.st_mtime_ns, 'delimiter': delimiter_arg,
+                     'offsets': [], 'times': [], 'levels': {level_key: [] for level_key in level_key_dict},
+                     'level_inputs': {level_key: dict({key: input_dict[key] for key in ('logic_family', 'POSITIVE_GOING_VOLTAGE', 'NEGATIVE_GOING_VOLTAGE', 'ignore_time_ns')}, column=input_dict.get('column', 1))
+                                      for level_key, input_dict in level_key_dict.items()}}
+        if data_start >= file_stat.st_size:
+            return csv_index
+
+        with mmap.mmap(csvfile.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+            # rows of the index: first row after ~index_bytes
+            offset = data_start
+            while offset < file_stat.st_size:
+                csv_index['offsets'].append(offset)
+                csv_index['times'].append(float(mapped_file[offset:mapped_file.find(delimiter_arg.encode(), offset)]))
+                offset = mapped_file.find(b'\n', offset + index_bytes)
+                if offset < 0:
+                    break
+                offset += 1
+
+            # hysteresis level before every row of the index, same as in iter_csv_edges_of_columns()
+            last_level_dict = {level_key: 0  if row1[input_dict.get('column', 1)] < 0.5 * input_dict['logic_family'] else 1 for level_key, input_dict in level_key_dict.items()}
+            offset_list = csv_index['offsets'] + [file_stat.st_size]
+            for entry_start, entry_stop in zip(offset_list[:-1], offset_list[1:]):
+                for level_key in level_key_dict:
+                    csv_index['levels'][level_key].append(last_level_dict[level_key])
+                for block in iter_csv_blocks(mapped_file, entry_start, entry_stop, delimiter_arg, len(row1), block_bytes):
+                    for level_key, input_dict in level_key_dict.items():
+                        detected_edges, last_level_dict[level_key] = get_edges_func(row1[0],
+                                                                                    block[0],
+                                                                                    block[input_dict.get('column', 1)],
+                                                                                    last_level_dict[level_key],
+                                                                                    input_dict['POSITIVE_GOING_VOLTAGE'],
+                                                                                    input_dict['NEGATIVE_GOING_VOLTAGE'],
+                                                                                    input_dict['ignore_time_ns'])
+    return csv_index
+
+
+def get_csv_index(csv_filepath, input_dict_list, param_dict):
+    ''' Sparse index of a csv file from its sidecar '<csv_filepath>.idx', (re)built if missing or stale
+
+        The index is a dict with 'offsets' (byte offsets of rows), 'times' (their time column) and
+        'levels' (get_csv_index_level_key() -> hysteresis level before every row of 'offsets', the level before the first one is the initial level).
+        It is rebuilt if size or mtime of the csv file changed or levels of an input of input_dict_list are missing.
+        param_dict['CSV_INDEX_BYTES']: distance of the rows of a new index in bytes
+    '''
+    index_path = get_csv_index_path(csv_filepath)
+    file_stat = os.stat(csv_filepath)
+    level_key_list = [get_csv_index_level_key(input_dict) for input_dict in input_dict_list]
+    try:
+        with open(index_path) as indexfile:
+            csv_index = json.load(indexfile)
+        if (csv_index['version'] == CSV_INDEX_VERSION and csv_index['size'] == file_stat.st_size and csv_index['mtime_ns'] == file_stat.st_mtime_ns
+                and csv_index['delimiter'] == param_dict['CSV_Delimiter'] and all(level_key in csv_index['levels'] for level_key in level_key_list)):
+            return csv_index
+        if csv_index['size'] == file_stat.st_size and csv_index['mtime_ns'] == file_stat.st_mtime_ns:
+            # only levels missing: keep the inputs of the existing index
+            input_dict_list = list(input_dict_list) + [level_input for level_key, level_input in csv_index['level_inputs'].items() if level_key not in level_key_list]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    print(f"Build index of {csv_filepath}")
+    csv_index = build_csv_index(csv_filepath, input_dict_list, param_dict['CSV_Delimiter'], param_dict.get('CSV_INDEX_BYTES', 4 * 1024 * 1024), param_dict.get('CSV_BLOCK_BYTES', 16 * 1024 * 1024))
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as indexfile:
+        json.dump(csv_index, indexfile)
+    os.replace(tmp_path, index_path)
+    return csv_index
+
+
+def get_csv_level_at_time(csv_filepath, csv_index, input_dict, time_offset, start_time_ns, delimiter_arg=','):
+    ''' Hysteresis level after the first row of a time window (see get_csv_time_window()) using the csv index
+
+        Only the rows from the preceding row of the index to the window start are parsed.
+        Returns None if the window starts with the first row of the file (level given by the first row).
+    '''
+    is_after = lambda time_fl: time_fl + abs(time_offset) >= start_time_ns / 1e9  # same as get_csv_time_window()
+    if is_after(time_offset) or not csv_index['offsets']:
+        return None
+    # last row of the index before the window
+    entry_num = max(bisect_time(lambda entry_num: csv_index['times'][entry_num], 0, len(csv_index['offsets']), is_after) - 1, 0)
+    entry_start = csv_index['offsets'][entry_num]
+    with open(csv_filepath, 'rb') as csvfile:
+        with mmap.mmap(csvfile.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+            window_row, window_row_end, window_stop = get_csv_time_window(mapped_file, entry_start, len(mapped_file), delimiter_arg, time_offset, start_time_ns)
+            block = parse_csv_block(mapped_file[entry_start:window_row_end], delimiter_arg, len(window_row), entry_start)
+    detected_edges, last_level = get_edges_block(time_offset,
+                                                 block[0],
+                                                 block[input_dict.get('column', 1)],
+                                                 csv_index['levels'][get_csv_index_level_key(input_dict)][entry_num],
+                                                 input_dict['POSITIVE_GOING_VOLTAGE'],
+                                                 input_dict['NEGATIVE_GOING_VOLTAGE'],
+                                                 input_dict['ignore_time_ns'])
+    return last_level
+
+
+BINARY_EXTENSIONS = ('.npy', '.bin', '.raw')  # input files read by readBinary(), all other extensions are read as csv
+BINARY_DTYPES = {'float32': '<f4', 'float64': '<f8', 'int16': '<i2', 'int8': '|i1'}
+BINARY_TYPECODES = {'<f4': 'f', '<f8': 'd', '<i2': 'h', '|i1': 'b'}  # array typecodes for the pure python fallback
+
+
+def is_binary_input(filename):
+    return os.path.splitext(filename)[1].lower() in BINARY_EXTENSIONS
+
+
+def get_binary_info(filename):
+    ''' Layout of a binary sample file (.npy or raw samples) and its sidecar header '<filename>.json'
+
+        Sidecar keys (all optional for a .npy file with [time, voltage, ...] rows):
+            'dtype': "float32", "float64", "int16" or "int8" (raw files only, default "float32")
+            'columns': 1 (voltage only) or > 1 ([time, voltage, voltage...] rows) (raw files only, default 1)
+            'sample_rate_hz': needed for 1 column files, time of sample i is time_offset_s + i / sample_rate_hz
+            'time_offset_s': time of the first sample (default 0.0)
+            'scale', 'offset': voltage = sample * scale + offset (default 1.0, 0.0)
+        Returns a dict with the sidecar values and 'dtype', 'columns', 'data_offset' (bytes) and 'num_rows'.
+    '''
+    binary_info = {'dtype': 'float32', 'columns': 1, 'sample_rate_hz': None, 'time_offset_s': 0.0, 'scale': 1.0, 'offset': 0.0}
+    sidecar_path = f"{filename}.json"
+    if os.path.isfile(sidecar_path):
+        with open(sidecar_path) as sidecarfile:
+            binary_info.update(json.load(sidecarfile))
+    binary_info['dtype'] = BINARY_DTYPES.get(binary_info['dtype'], binary_info['dtype'])
+
+    with open(filename, 'rb') as binfile:
+        if os.path.splitext(filename)[1].lower() == '.npy':
+            if binfile.read(6) != b'\x93NUMPY':
+                raise ValueError(f"{filename} is no .npy file")
+            major_version = binfile.read(2)[0]
+            header_len_struct = struct.Struct('<H' if major_version == 1 else '<I')
+            header_len, = header_len_struct.unpack(binfile.read(header_len_struct.size))
+            npy_header = ast.literal_eval(binfile.read(header_len).decode('latin1'))
+            if npy_header['fortran_order'] or len(npy_header['shape']) not in (1, 2):
+                raise ValueError(f"{filename}: only C ordered arrays with 1 (voltage) or more (time, voltage, ...) columns are supported")
+            binary_info['dtype'] = npy_header['descr']
+            binary_info['columns'] = 1 if len(npy_header['shape']) == 1 else npy_header['shape'][1]
+            binary_info['data_offset'] = binfile.tell()
+        else:
+            binary_info['data_offset'] = binary_info.get('data_offset', 0)
+        file_size = os.fstat(binfile.fileno()).st_size
+
+    if binary_info['dtype'] not in BINARY_TYPECODES:
+        raise ValueError(f"{filename}: dtype {binary_info['dtype']} is not supported, legal values: {list(BINARY_DTYPES)}")
+    if binary_info['columns'] < 1:
+        raise ValueError(f"{filename}: at least 1 (voltage) column is needed")
+    if binary_info['columns'] == 1 and not binary_info['sample_rate_hz']:
+        raise ValueError(f"{filename}: 'sample_rate_hz' is needed in {sidecar_path} for voltage only files")
+    row_bytes = array(BINARY_TYPECODES[binary_info['dtype']]).itemsize * binary_info['columns']
+    binary_info['num_rows'] = (file_size - binary_info['data_offset']) // row_bytes
+    return binary_info
+
+
+@time_wrapper
+def readBinary(filename, max_row=None, block_rows=1024 * 1024, start_time_ns=None, stop_time_ns=None):
+    ''' Read a binary sample file (see get_binary_info()) memory mapped, without converting it to text
+
+        Same interface as readCsvBlocks(): yields header (dict of get_binary_info()), time_offset and the first row,
+        followed by blocks of rows. Every block is a list of columns [time, voltage, ...],
+        numpy arrays (views of the mapped file as far as possible) if numpy is installed else array('d').
+        start_time_ns, stop_time_ns: only read the rows of this time window (binary search, see get_time_window_ns())
+    '''
+    print(f"Read data from {filename} ")
+
+    binary_info = get_binary_info(filename)
+    yield binary_info
+    num_rows = binary_info['num_rows']
+    if num_rows == 0:
+        return
+    num_columns = binary_info['columns']
+    sample_period = None if num_columns > 1 else 1 / binary_info['sample_rate_hz']
+    scale, offset = binary_info['scale'], binary_info['offset']
+
+    if np is not None:
+        samples = np.memmap(filename, dtype=binary_info['dtype'], mode='r', offset=binary_info['data_offset'], shape=(num_rows, num_columns))
+
+        def get_block(row_start, row_stop):
+            block = samples[row_start:row_stop]
+            voltage_arr_list = [block[:, column] for column in range(min(1, num_columns - 1), num_columns)]
+            if scale != 1.0 or offset != 0.0:
+                voltage_arr_list = [voltage_arr.astype(np.float64) * scale + offset for voltage_arr in voltage_arr_list]
+            if sample_period is None:
+                time_arr = block[:, 0]
+            else:
+                time_arr = binary_info['time_offset_s'] + np.arange(row_start, row_stop) * sample_period
+            return [time_arr] + voltage_arr_list
+    else:
+        binfile = open(filename, 'rb')
+        mapped_file = mmap.mmap(binfile.fileno(), 0, access=mmap.ACCESS_READ)
+        typecode = BINARY_TYPECODES[binary_info['dtype']]
+        row_bytes = array(typecode).itemsize * num_columns
+
+        def get_block(row_start, row_stop):
+            values = array(typecode, mapped_file[binary_info['data_offset'] + row_start * row_bytes:binary_info['data_offset'] + row_stop * row_bytes])
+            if sys.byteorder != 'little' and values.itemsize > 1:
+                values.byteswap()
+            voltage_arr_list = [array('d', values[column::num_columns]) for column in range(min(1, num_columns - 1), num_columns)]
+            if scale != 1.0 or offset != 0.0:
+                voltage_arr_list = [array('d', (voltage * scale + offset for voltage in voltage_arr)) for voltage_arr in voltage_arr_list]
+            if sample_period is None:
+                time_arr = array('d', values[0::num_columns])
+            else:
+                time_arr = array('d', (binary_info['time_offset_s'] + row_num * sample_period for row_num in range(row_start, row_stop)))
+            return [time_arr] + voltage_arr_list
+
+    try:
+        time_offset = float(get_block(0, 1)[0][0])
+        yield time_offset
+        row_first, row_stop = 0, num_rows
+        if start_time_ns is not None:
+            row_first = bisect_time(lambda row_num: float(get_block(row_num, row_num + 1)[0][0]), 0, num_rows, lambda time_fl: time_fl + abs(time_offset) >= start_time_ns / 1e9)
+        if stop_time_ns is not None:
+            row_stop = bisect_time(lambda row_num: float(get_block(row_num, row_num + 1)[0][0]), row_first, num_rows, lambda time_fl: time_fl + abs(time_offset) > stop_time_ns / 1e9)
+        if row_first >= row_stop:
+            raise ValueError(f"no data in time window {start_time_ns} ns .. {stop_time_ns} ns")
+        if max_row is not None:
+            row_stop = min(row_stop, row_first + max_row + 1)
+
+        yield [float(column[0]) for column in get_block(row_first, row_first + 1)]
+        for row_start in range(row_first + 1, row_stop, block_rows):
+            yield get_block(row_start, min(row_start + block_rows, row_stop))
+    finally:
+        if np is None:
+            mapped_file.close()
+            binfile.close()
+
+
 def get_edges(time_offset, time_logiclevel_tuple, last_level, logic_family=3.3, positive_going_voltage=2.0, negative_going_voltage=0.8, ignore_time_ns=0):
     ''' Find digital level transitions in input data '''
 
@@ -126,260 +994,1907 @@ def get_edges(time_offset, time_logiclevel_tuple, last_level, logic_family=3.3,
     return None
 
 
+def get_edges_block(time_offset, time_arr, voltage_arr, last_level, positive_going_voltage=2.0, negative_going_voltage=0.8, ignore_time_ns=0, max_edges=None):
+    ''' Find digital level transitions in a whole block of input data (pure python)
+
+        Same interface as get_edges_vectorized(), uses get_edges() for every sample.
+    '''
+    level_matrix = []
+    if max_edges is not None and max_edges <= 0:
+        return level_matrix, last_level
+    samples = zip(time_arr, voltage_arr)
+    if last_level == -1:  # unknown level: the first sample above/below a threshold sets the level
+        for time_fl, voltage_fl in samples:
+            timestamp = time_fl + abs(time_offset) - (ignore_time_ns / 1e9)
+            if timestamp > 0 and (voltage_fl < negative_going_voltage or voltage_fl > positive_going_voltage):
+                last_level = 0 if voltage_fl < negative_going_voltage else 1
+                level_matrix.append([timestamp, last_level])
+                break
+        if len(level_matrix) == max_edges:
+            return level_matrix, last_level
+    for time_logiclevel_tuple in samples:
+        detected_edge = get_edges(time_offset, time_logiclevel_tuple, last_level, positive_going_voltage=positive_going_voltage, negative_going_voltage=negative_going_voltage, ignore_time_ns=ignore_time_ns)
+        if detected_edge is not None:
+            last_level = detected_edge[1]
+            level_matrix.append(detected_edge)
+            if len(level_matrix) == max_edges:
+                break
+    return level_matrix, last_level
+
+
+def get_edges_vectorized(time_offset, time_arr, voltage_arr, last_level, positive_going_voltage=2.0, negative_going_voltage=0.8, ignore_time_ns=0, max_edges=None):
+    ''' Find digital level transitions in a whole block of input data (numpy)
+
+        Gives the same transitions as calling get_edges() for every sample of the block.
+        Returns (list of [timestamp, level], last_level after the block).
+        last_level: -1 if unknown, then the first sample above/below a threshold is returned as transition
+        max_edges: stop after this number of transitions (None = no limit)
+    '''
+    time_arr = np.asarray(time_arr, dtype=np.float64)
+    voltage_arr = np.asarray(voltage_arr, dtype=np.float64)
+
+    # same operation order as get_edges() => bit identical timestamps
+    timestamps = time_arr + abs(time_offset) - (ignore_time_ns / 1e9)
+
+    # hysterese: every sample above/below a threshold sets the level, samples in between keep it
+    # samples with timestamp <= 0 (ignore_time_ns) never change the level
+    level_set = np.full(len(timestamps) + 1, -1, dtype=np.int8)
+    level_set[0] = last_level
+    level_set[1:][voltage_arr > positive_going_voltage] = 1
+    level_set[1:][voltage_arr < negative_going_voltage] = 0
+    level_set[1:][timestamps <= 0] = -1
+
+    # forward fill the levels: index of last sample which set the level
+    set_idx = np.where(level_set >= 0, np.arange(len(level_set)), 0)
+    np.maximum.accumulate(set_idx, out=set_idx)
+    levels = level_set[set_idx]
+
+    edge_idx = np.flatnonzero(levels[1:] != levels[:-1])
+    if max_edges is not None:
+        edge_idx = edge_idx[:max_edges]
+    if len(edge_idx) == 0:
+        return [], last_level
+
+    level_matrix = [[timestamp, level] for timestamp, level in zip(timestamps[edge_idx].tolist(), levels[edge_idx + 1].tolist())]
+    return level_matrix, level_matrix[-1][1]
+
+
+def get_edges_envelope(get_edges_func, envelope_block, time_offset, time_arr, voltage_arr, last_level, positive_going_voltage=2.0, negative_going_voltage=0.8, ignore_time_ns=0, max_edges=None):
+    ''' Find digital level transitions in a block of input data, get_edges_func() only runs on the samples which can cross a threshold
+
+        Min/max envelope pre-pass: per sub block of envelope_block samples the min and max voltage are calculated (numpy if installed).
+        A sub block whose max is not above positive_going_voltage (last_level 0) or whose min is not below negative_going_voltage
+        (last_level 1) can not contain a transition and is skipped. A candidate sub block and the following sub blocks which reach
+        both thresholds are passed to get_edges_func() (get_edges_block() or get_edges_vectorized()) in one span.
+        Gives the same transitions as get_edges_func() for the whole block, same interface.
+        The metrics count the sub blocks ('envelope_blocks') and the skipped ones ('envelope_blocks_skipped').
+    '''
+    num_samples = len(voltage_arr)
+    if num_samples == 0:
+        return get_edges_func(time_offset, time_arr, voltage_arr, last_level, positive_going_voltage, negative_going_voltage, ignore_time_ns, max_edges)
+    # NaN in the envelope (NaN samples) never skips a sub block: not (NaN <= threshold)
+    if np is not None:
+        voltage_arr = np.asarray(voltage_arr, dtype=np.float64)
+        block_starts = np.arange(0, num_samples, envelope_block)
+        can_rise_list = (~(np.maximum.reduceat(voltage_arr, block_starts) <= positive_going_voltage)).tolist()
+        can_fall_list = (~(np.minimum.reduceat(voltage_arr, block_starts) >= negative_going_voltage)).tolist()
+    else:
+        block_starts = range(0, num_samples, envelope_block)
+        can_rise_list = [not max(voltage_arr[block_start:block_start + envelope_block]) <= positive_going_voltage for block_start in block_starts]
+        can_fall_list = [not min(voltage_arr[block_start:block_start + envelope_block]) >= negative_going_voltage for block_start in block_starts]
+    num_blocks = len(can_rise_list)
+
+    level_matrix = []
+    num_skipped = 0
+    block_idx = 0
+    while block_idx < num_blocks:
+        if not (can_rise_list[block_idx] if last_level == 0 else can_fall_list[block_idx] if last_level == 1 else can_rise_list[block_idx] or can_fall_list[block_idx]):
+            num_skipped += 1
+            block_idx += 1
+            continue
+        span_stop = block_idx + 1
+        while span_stop < num_blocks and can_rise_list[span_stop] and can_fall_list[span_stop]:
+            span_stop += 1
+        sample_start, sample_stop = block_idx * envelope_block, min(span_stop * envelope_block, num_samples)
+        detected_edges, last_level = get_edges_func(time_offset, time_arr[sample_start:sample_stop], voltage_arr[sample_start:sample_stop], last_level,
+                                                    positive_going_voltage, negative_going_voltage, ignore_time_ns, None if max_edges is None else max_edges - len(level_matrix))
+        level_matrix += detected_edges
+        if max_edges is not None and len(level_matrix) >= max_edges:
+            break
+        block_idx = span_stop
+
+    metrics = get_metrics()
+    if metrics is not None:
+        metrics.count('envelope_blocks', num_blocks)
+        metrics.count('envelope_blocks_skipped', num_skipped)
+    return level_matrix, last_level
+
+
+def get_block_edges_func(edge_engine='python', envelope_block=None):
+    ''' Block edge detection of param_dict['EDGE_ENGINE'] (get_edges_vectorized() needs numpy), with the min/max envelope
+        pre-pass of get_edges_envelope() for param_dict['EDGE_ENVELOPE_BLOCK'] samples per sub block (None: without)
+    '''
+    get_edges_func = get_edges_vectorized if (edge_engine == 'numpy' and np is not None) else get_edges_block
+    if envelope_block is None:
+        return get_edges_func
+
+    def get_edges_func_envelope(*args):
+        return get_edges_envelope(get_edges_func, envelope_block, *args)
+    return get_edges_func_envelope
+
+
+class EdgeArray:
+    ''' Compact level matrix of one signal: contiguous float64 timestamps and packed level bits
+
+        Behaves like the list based level matrix [[timestamp, level], ...] (len, index, iteration, append/extend, == with lists)
+        but needs ~8 bytes per transition instead of ~100 bytes for a list of [float, int].
+    '''
+    __slots__ = ('timestamps', 'level_bits', 'num_rows')
+
+    def __init__(self, level_matrix=()):
+        self.timestamps = array('d')
+        self.level_bits = bytearray()
+        self.num_rows = 0
+        self.extend(level_matrix)
+
+    @classmethod
+    def from_arrays(cls, timestamps, levels):
+        ''' Create from a sequence of timestamps and a sequence of levels (0/1) '''
+        edge_array = cls()
+        edge_array.timestamps = array('d', timestamps)
+        edge_array.num_rows = len(edge_array.timestamps)
+        level_bits = bytearray((edge_array.num_rows + 7) // 8)
+        for idx, level in enumerate(levels):
+            if level:
+                level_bits[idx >> 3] |= 1 << (idx & 7)
+        edge_array.level_bits = level_bits
+        return edge_array
+
+    def append(self, data_tuple):
+        timestamp, level = data_tuple
+        if self.num_rows & 7 == 0:
+            self.level_bits.append(0)
+        if level:
+            self.level_bits[-1] |= 1 << (self.num_rows & 7)
+        self.timestamps.append(timestamp)
+        self.num_rows += 1
+
+    def extend(self, level_matrix):
+        if isinstance(level_matrix, EdgeArray) and self.num_rows & 7 == 0:
+            self.timestamps.extend(level_matrix.timestamps)
+            self.level_bits.extend(level_matrix.level_bits)
+            self.num_rows += level_matrix.num_rows
+        else:
+            for data_tuple in level_matrix:
+                self.append(data_tuple)
+
+    def level(self, idx):
+        return (self.level_bits[idx >> 3] >> (idx & 7)) & 1
+
+    def levels(self):
+        ''' All levels, one byte (0/1) per row '''
+        return bytes(self.level(idx) for idx in range(self.num_rows))
+
+    def truncate(self, num_rows):
+        ''' Keep only the first num_rows rows '''
+        if num_rows < self.num_rows:
+            del self.timestamps[num_rows:]
+            del self.level_bits[(num_rows + 7) // 8:]
+            if num_rows & 7:
+                self.level_bits[-1] &= (1 << (num_rows & 7)) - 1
+            self.num_rows = num_rows
+
+    def nbytes(self):
+        return self.timestamps.itemsize * len(self.timestamps) + len(self.level_bits)
+
+    def to_list(self):
+        return list(self)
+
+    def __len__(self):
+        return self.num_rows
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return EdgeArray.from_arrays(self.timestamps[idx], [self.level(i) for i in range(*idx.indices(self.num_rows))])
+        if idx < 0:
+            idx += self.num_rows
+        if not 0 <= idx < self.num_rows:
+            raise IndexError('EdgeArray index out of range')
+        return [self.timestamps[idx], self.level(idx)]
+
+    def __iter__(self):
+        level_bits = self.level_bits
+        for idx, timestamp in enumerate(self.timestamps):
+            yield [timestamp, (level_bits[idx >> 3] >> (idx & 7)) & 1]
+
+    def __eq__(self, other):
+        if isinstance(other, EdgeArray):
+            return self.timestamps == other.timestamps and self.level_bits == other.level_bits
+        if isinstance(other, list):
+            return self.num_rows == len(other) and all(list(data_tuple) == other_tuple for data_tuple, other_tuple in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"EdgeArray({self.to_list()!r})"
+
+
+class StimuliLineWriter:
+    ''' Format the events of write_stimuli_file() and write them in batches of batch_lines lines
+
+        The line template of every signal is selected once, depending on file extension and param_dict["RESOLUTION"].
+    '''
+
+    def __init__(self, dofile, file_extension, vhdl_signal_names, param_dict, batch_lines=65536):
+        self.dofile = dofile
+        self.batch_lines = batch_lines
+        self.line_list = []
+        self.num_events = 0
+
+        if file_extension == '.do':
+            if param_dict["RESOLUTION"] == "ns":
+                self.wait_time_func = lambda wait_time_ps: round(wait_time_ps / 1000, 0)  # convert diff to ns and round to ns
+            elif param_dict["RESOLUTION"] == "ps":
+                self.wait_time_func = lambda wait_time_ps: wait_time_ps / 1000  # convert diff to ns and round to ps
+            else:
+                raise ValueError('RESOLUTION has an illegal value.')
+            line_template = "run {}\nforce -freeze %s {}\n"
+            # -deposit
+            # (optional) Sets the object to the specified <value>. The <value> remains until the object is
+            # forced again,
+        elif file_extension == '.vhd':
+            num_max_digits = int(math.log10(param_dict['MAX_WAIT_TIME_NS'])) + 1  # +1 to round up, ceil does not work for MAX_WAIT_TIME_NS=10,100,1000,...
+            if param_dict["RESOLUTION"] == "ns":
+                self.wait_time_func = lambda wait_time_ps: round(wait_time_ps / 1000, 0)  # convert diff to ns and round to ns
+                line_template = f"\twait for {{: >{num_max_digits}}} ns;\t\t%s\t\t<=\t'{{}}';\n"  # +2-> because of ".0" in output format
+            elif param_dict["RESOLUTION"] == "ps":
+                self.wait_time_func = lambda wait_time_ps: wait_time_ps  # convert diff to ns and round to ps
+                line_template = f"\twait for {{: >{num_max_digits+3}}} ps;\t\t%s\t\t<=\t'{{}}';\n"  # +4-> ".000"
+            else:
+                raise ValueError('RESOLUTION has an illegal value.')
+        else:
+            self.wait_time_func = None
+            line_template = None
+
+        # line template per signal with the signal name already filled in
+        self.line_format_per_sig_list = [None if line_template is None else (line_template % vhdl_signal_name.replace('{', '{{').replace('}', '}}')).format
+                                         for vhdl_signal_name in vhdl_signal_names]
+
+    def write(self, wait_time_ps, signal_idx, level):
+        if self.wait_time_func is None:
+            return
+        self.line_list.append(self.line_format_per_sig_list[signal_idx](self.wait_time_func(wait_time_ps), level))
+        self.num_events += 1
+        if len(self.line_list) >= self.batch_lines:
+            self.flush()
+
+    def flush(self):
+        self.dofile.write(''.join(self.line_list))
+        self.line_list.clear()
+
+    def close(self):
+        self.flush()
+
+
+class StimuliBlockWriter(StimuliLineWriter):
+    ''' Coalesce the events of one resolution tick (rounded wait time 0) into one block with a single wait
+
+        The signals of a bus (param_dict['BUSES']: bus name -> vhdl signal names, MSB first) are written
+        as one vector assignment per bus and block. Blocks with a single signal event are written like StimuliLineWriter.
+        A further event of a signal in the same tick starts a new block with wait time 0 (as StimuliLineWriter),
+        so zero width glitches are kept. Bus bits without any event so far are written as 'U'.
+    '''
+
+    def __init__(self, dofile, file_extension, vhdl_signal_names, param_dict, batch_lines=65536):
+        super().__init__(dofile, file_extension, vhdl_signal_names, param_dict, batch_lines)
+        self.target_per_sig_list = list(vhdl_signal_names)  # signal or bus assigned by an event of the signal
+        self.bus_bit_per_sig_list = [None for vhdl_signal_name in vhdl_signal_names]
+        self.bus_level_dict = {}  # bus name -> current level of its bits ('U' until the first event)
+        for bus_name, bus_signal_names in param_dict.get('BUSES', {}).items():
+            self.bus_level_dict[bus_name] = ['U' for bus_signal_name in bus_signal_names]
+            for bit_num, bus_signal_name in enumerate(bus_signal_names):
+                if bus_signal_name not in vhdl_signal_names:
+                    raise ValueError(f"signal {bus_signal_name} of bus {bus_name} is no vhdl_signal_name")
+                signal_idx = vhdl_signal_names.index(bus_signal_name)
+                if self.bus_bit_per_sig_list[signal_idx] is not None:
+                    raise ValueError(f"signal {bus_signal_name} is part of several buses")
+                self.target_per_sig_list[signal_idx] = bus_name
+                self.bus_bit_per_sig_list[signal_idx] = bit_num
+
+        if file_extension == '.do':
+            self.wait_template = "run {}\n"
+            self.assignment_template = "force -freeze {} {}\n"
+            self.bit_quote, self.vector_quote = '', ''
+        else:
+            num_max_digits = int(math.log10(param_dict['MAX_WAIT_TIME_NS'])) + 1 + (3 if param_dict["RESOLUTION"] == "ps" else 0)
+            self.wait_template = f"\twait for {{: >{num_max_digits}}} {param_dict['RESOLUTION']};\n"
+            self.assignment_template = "\t\t{}\t\t<=\t{};\n"
+            self.bit_quote, self.vector_quote = "'", '"'
+        self.block_wait_time = None
+        self.block_event = None  # (signal_idx, level) of a block with one event
+        self.block_level_dict = {}  # target -> level of the block
+        self.block_signal_set = set()  # signal_idx of the events of the block
+
+    def write(self, wait_time_ps, signal_idx, level):
+        if self.wait_time_func is None:
+            return
+        wait_time = self.wait_time_func(wait_time_ps)
+        if wait_time != 0 or self.block_wait_time is None or signal_idx in self.block_signal_set:
+            self.write_block()
+            self.block_wait_time = wait_time
+            self.block_event = (signal_idx, level)
+        else:
+            self.block_event = None
+        target = self.target_per_sig_list[signal_idx]
+        bit_num = self.bus_bit_per_sig_list[signal_idx]
+        if bit_num is None:
+            self.block_level_dict[target] = f"{self.bit_quote}{level}{self.bit_quote}"
+        else:
+            self.block_event = None
+            self.bus_level_dict[target][bit_num] = str(level)
+            self.block_level_dict[target] = f"{self.vector_quote}{''.join(self.bus_level_dict[target])}{self.vector_quote}"
+        self.block_signal_set.add(signal_idx)
+        self.num_events += 1
+
+    def write_block(self):
+        if self.block_wait_time is None:
+            return
+        if self.block_event is not None:
+            self.line_list.append(self.line_format_per_sig_list[self.block_event[0]](self.block_wait_time, self.block_event[1]))
+        else:
+            self.line_list.append(self.wait_template.format(self.block_wait_time))
+            self.line_list.extend(self.assignment_template.format(target, level) for target, level in self.block_level_dict.items())
+        self.block_wait_time = None
+        self.block_level_dict.clear()
+        self.block_signal_set.clear()
+        if len(self.line_list) >= self.batch_lines:
+            self.flush()
+
+    def close(self):
+        self.write_block()
+        self.flush()
+
+
+class StimuliTableWriter(StimuliLineWriter):
+    ''' Write the events of write_stimuli_file() as constant tables of (delay, signal index, value) records into a VHDL package
+
+        The tables have at most chunk_size events each. close() writes a fixed loop per table into vhdfile,
+        so the code to compile does not grow with the number of events.
+    '''
+
+    def __init__(self, vhdfile, pkgfile, package_name, vhdl_signal_names, param_dict, batch_lines=65536, chunk_size=65536):
+        super().__init__(pkgfile, '.vhd', vhdl_signal_names, param_dict, batch_lines)
+        self.vhdfile = vhdfile
+        self.vhdl_signal_names = vhdl_signal_names
+        self.time_unit = param_dict["RESOLUTION"]
+        self.chunk_size = chunk_size
+        self.num_chunks = 0
+        self.num_chunk_events = 0
+
+        self.dofile.write('library ieee;\nuse ieee.std_logic_1164.all;\n\n')
+        self.dofile.write(f'package {package_name} is\n')
+        self.dofile.write('\ttype t_stimuli_event is record\n\t\tdelay : time;\n\t\tsig   : natural;\n\t\tvalue : std_logic;\n\tend record;\n')
+        self.dofile.write('\ttype t_stimuli_table is array (natural range <>) of t_stimuli_event;\n\n')
+        self.dofile.write(''.join(f'\t-- sig {signal_idx}: {vhdl_signal_name}\n' for signal_idx, vhdl_signal_name in enumerate(vhdl_signal_names)))
+
+    def write(self, wait_time_ps, signal_idx, level):
+        if self.num_chunk_events == 0:
+            self.line_list.append(f"\n\tconstant STIMULI_TABLE_{self.num_chunks} : t_stimuli_table := (")
+        self.line_list.append(f"{',' if self.num_chunk_events else ''}\n\t\t{self.num_chunk_events} => ({int(self.wait_time_func(wait_time_ps))} {self.time_unit}, {signal_idx}, '{level}')")
+        self.num_chunk_events += 1
+        self.num_events += 1
+        if self.num_chunk_events >= self.chunk_size:
+            self.close_chunk()
+        if len(self.line_list) >= self.batch_lines:
+            self.flush()
+
+    def close_chunk(self):
+        self.line_list.append("\n\t);\n")
+        self.num_chunks += 1
+        self.num_chunk_events = 0
+
+    def close(self):
+        if self.num_chunk_events:
+            self.close_chunk()
+        self.line_list.append("\nend package;\n")
+        self.flush()
+
+        case_lines = ''.join(f"\t\t\twhen {signal_idx} => {vhdl_signal_name} <= {{table}}(i).value;\n" for signal_idx, vhdl_signal_name in enumerate(self.vhdl_signal_names))
+        for chunk_num in range(self.num_chunks):
+            table = f"STIMULI_TABLE_{chunk_num}"
+            self.vhdfile.write(f"\tfor i in {table}'range loop\n")
+            self.vhdfile.write(f"\t\twait for {table}(i).delay;\n")
+            self.vhdfile.write(f"\t\tcase {table}(i).sig is\n")
+            self.vhdfile.write(case_lines.format(table=table))
+            self.vhdfile.write("\t\t\twhen others => null;\n\t\tend case;\n\tend loop;\n")
+
+
+class RunSynchronizer:
+    ''' Sync of the runs (param_dict['DO_SYNC']) for write_stimuli_file()
+
+        If the wait time before the next transition is longer than 3 periods of the min. frequency and the next switching
+        signal of every run is of the same type (e.g. 'CLK'), the runs are shifted so that these transitions happen at the same time.
+        All signals of a run always have the same neg. offset, so the offsets are stored per run.
+        The next transition of every run is tracked in a heap per run -> a sync decision costs O(runs).
+    '''
+    TIMESTAMP_IDX = 0
+
+    def __init__(self, run_num_list, signals_list, min_freq_mhz):
+        self.run_num_list = run_num_list
+        self.signals_list = signals_list
+        self.num_different_runs = len(set(run_num_list))  # num of different runs
+        self.sync_wait_time_s = 3 * (1 / (min_freq_mhz * 1000000))  # 3 heuristical value
+        self.sync_cnt = 0
+
+        # runs are numbered 1..num_different_runs
+        self.run_sig_idx_map = {run_num: [sig_idx for sig_idx, run_of_signal in enumerate(run_num_list) if run_of_signal == run_num]
+                                for run_num in range(1, self.num_different_runs + 1)}
+        self.neg_offset_per_run_dict = {run_num: 0 for run_num in set(run_num_list)}
+        self.neg_offset_per_sig_s_list = [0 for i in range(len(run_num_list))]
+        self.nxt_timestamp_heap_per_run_dict = {run_num: [] for run_num in self.run_sig_idx_map}
+        self.is_active_per_sig_list = [False for i in range(len(run_num_list))]
+        self.neg_offset_tmp_per_run_dict = {run_num: 0 for run_num in self.run_sig_idx_map}
+
+    def start(self, nxt_data_tuple_per_sig_list):
+        ''' Set the first transition of every signal (None if the signal has no transitions) '''
+        for sig_idx, data_tuple in enumerate(nxt_data_tuple_per_sig_list):
+            if data_tuple is not None:
+                self.is_active_per_sig_list[sig_idx] = True
+                if self.run_num_list[sig_idx] in self.nxt_timestamp_heap_per_run_dict:
+                    self.nxt_timestamp_heap_per_run_dict[self.run_num_list[sig_idx]].append((data_tuple[self.TIMESTAMP_IDX], sig_idx))
+        for nxt_timestamp_heap in self.nxt_timestamp_heap_per_run_dict.values():
+            heapq.heapify(nxt_timestamp_heap)
+
+    def advance(self, sig_idx, nxt_data_tuple):
+        ''' Transition of sig_idx was written, nxt_data_tuple is its next transition (None if no more transitions) '''
+        nxt_timestamp_heap = self.nxt_timestamp_heap_per_run_dict.get(self.run_num_list[sig_idx])
+        if nxt_data_tuple is None:
+            self.is_active_per_sig_list[sig_idx] = False
+            if nxt_timestamp_heap is not None:
+                heapq.heappop(nxt_timestamp_heap)
+        elif nxt_timestamp_heap is not None:
+            heapq.heapreplace(nxt_timestamp_heap, (nxt_data_tuple[self.TIMESTAMP_IDX], sig_idx))
+
+    def sync(self, wait_time_ps, sig_idx, data_timestamp_tmp, nxt_data_tuple_per_sig_list, simulation_time_ns):
+        ''' Check for sync before the transition of sig_idx at data_timestamp_tmp (timestamp - neg. offset)
+
+            Returns True if the neg. offsets changed.
+        '''
+        wait_time_s = wait_time_ps / 1E+12
+        if not wait_time_s > self.sync_wait_time_s:
+            return False
+        tracer.trace('debug', "%s > %s -> Prüfe auf Sync", wait_time_s, self.sync_wait_time_s)
+
+        # check if for every run the next signal is of same type (don´t sync if e.g. next signal is run1=CLK and run2=MOSI)
+        sync_signal_type = None
+        for nxt_timestamp_heap in self.nxt_timestamp_heap_per_run_dict.values():
+            if not nxt_timestamp_heap:
+                tracer.trace('debug', "run without transitions -> KEIN Sync")
+                return False
+            signal_type = self.signals_list[nxt_timestamp_heap[0][1]]
+            if sync_signal_type is None:
+                sync_signal_type = signal_type
+            elif signal_type != sync_signal_type:
+                tracer.trace('debug', "next switching signals %s, %s differ -> KEIN Sync", sync_signal_type, signal_type)
+                return False
+
+        print("### Mach SYNC")
+        print(f"simulation_time_ns: {simulation_time_ns}")
+        self.sync_cnt += 1
+        sync_run_num = self.run_num_list[sig_idx]
+        # ermittle Zeitdifferenz zwischen den Syncsignalen: the last active signal of the sync type in every other run
+        max_neg_offset_tmp = 0
+        for run_num, run_sig_idx_list in self.run_sig_idx_map.items():
+            self.neg_offset_tmp_per_run_dict[run_num] = 0
+            if run_num == sync_run_num:  # do not sync if signal is in same run as signal_nxt_timestamp_min
+                continue
+            for run_sig_idx in reversed(run_sig_idx_list):
+                if self.is_active_per_sig_list[run_sig_idx] and self.signals_list[run_sig_idx] == sync_signal_type:
+                    nxt_timestamp = nxt_data_tuple_per_sig_list[run_sig_idx][self.TIMESTAMP_IDX] - self.neg_offset_per_run_dict[run_num]
+                    time_delta_ps = round((nxt_timestamp - data_timestamp_tmp) * 1000000000000)
+                    tracer.trace('debug', "time_delta_ps: %s", time_delta_ps)
+                    # speichere Zeitdifferenz als neg. Offset für nächsten Zeitstempel für alle Signale diesen Runs
+                    self.neg_offset_tmp_per_run_dict[run_num] = time_delta_ps / 1e+12
+                    max_neg_offset_tmp = max(max_neg_offset_tmp, self.neg_offset_tmp_per_run_dict[run_num])
+                    break
+        print(f"neg_offset_tmp_per_run_dict: {self.neg_offset_tmp_per_run_dict}")
+
+        if max_neg_offset_tmp == 0.0:
+            print(f"neg_offset_tmp_per_run_dict only 0.0 values.")
+            return False
+
+        # reduce neg_offset to minimum
+        min_neg_offset = min(max_neg_offset_tmp, self.neg_offset_per_run_dict[sync_run_num])
+        print(f"min_neg_offset: {min_neg_offset}")
+        for run_num in self.run_sig_idx_map:
+            self.neg_offset_per_run_dict[run_num] += self.neg_offset_tmp_per_run_dict[run_num] - min_neg_offset
+            for run_sig_idx in self.run_sig_idx_map[run_num]:
+                self.neg_offset_per_sig_s_list[run_sig_idx] = self.neg_offset_per_run_dict[run_num]
+        print(f"neg_offset_per_run_dict: {self.neg_offset_per_run_dict}")
+        return True
+
+
+def get_edge_train(all_ch_level_matrix, sig_idx_list):
+    ''' Sorted timestamps of the transitions of the signals sig_idx_list (without the initial level rows) '''
+    return sorted(itertools.chain.from_iterable(itertools.islice(all_ch_level_matrix[sig_idx].timestamps, 1, None) for sig_idx in sig_idx_list))
+
+
+def get_run_offset_table(all_ch_level_matrix, run_num_list, signals_list, min_freq_mhz, param_dict):
+    ''' Neg. offsets of every run for the alignment of the runs before writing (param_dict['SYNC_MODE'], alternative to RunSynchronizer)
+
+        The runs are aligned by the edge trains of their signals of type param_dict['SYNC_SIGNAL'] (default: 'signal' of the first input).
+        SYNC_MODE "bursts": the i-th burst (first edge after an idle time > 3 periods of min_freq_mhz) of every run is aligned to the
+            earliest i-th burst of all runs, the offset of a burst applies from the last edge of the previous burst on.
+        SYNC_MODE "xcorr": one offset per run from the maximum of the cross-correlation of the edge trains (param_dict['SYNC_XCORR_BIN_NS']).
+        all_ch_level_matrix: list of EdgeArray
+        Returns {run_num: [(timestamp_from, neg_offset), ...]}, the neg. offset applies to the timestamps > timestamp_from of the run.
+    '''
+    sync_signal = param_dict.get('SYNC_SIGNAL') or signals_list[0]
+    run_edge_train_dict = {}
+    for run_num in sorted(set(run_num_list)):
+        sig_idx_list = [sig_idx for sig_idx, run_of_signal in enumerate(run_num_list) if run_of_signal == run_num and signals_list[sig_idx] == sync_signal]
+        if not sig_idx_list:
+            raise ValueError(f"SYNC_MODE: run {run_num} has no signal of type '{sync_signal}' (SYNC_SIGNAL)")
+        run_edge_train_dict[run_num] = get_edge_train(all_ch_level_matrix, sig_idx_list)
+
+    sync_mode = param_dict.get('SYNC_MODE', 'events')
+    if sync_mode == 'xcorr' and np is None:
+        print("in get_run_offset_table(): numpy is not installed -> fall back to SYNC_MODE 'bursts'")
+        sync_mode = 'bursts'
+    if sync_mode == 'xcorr':
+        bin_s = param_dict.get('SYNC_XCORR_BIN_NS', 1) / 1e9
+        max_time_s = max((edge_train[-1] for edge_train in run_edge_train_dict.values() if edge_train), default=0.0)
+        bin_s = max(bin_s, max_time_s / 2 ** 24)  # limit the FFT size
+        num_bins = int(max_time_s / bin_s) + 2  # np.rint() may round up the last edge
+        fft_size = 1 << (2 * num_bins - 1).bit_length()
+        spectrum_dict = {run_num: np.fft.rfft(np.bincount(np.rint(np.array(edge_train) / bin_s).astype(np.int64), minlength=num_bins), fft_size)
+                         for run_num, edge_train in run_edge_train_dict.items()}
+        ref_run_num = min(run_edge_train_dict)
+        lag_s_dict = {}
+        for run_num, spectrum in spectrum_dict.items():
+            correlation = np.fft.irfft(spectrum * np.conj(spectrum_dict[ref_run_num]), fft_size)  # correlation[k]: run is k bins later than the reference
+            lag_bins = int(np.argmax(correlation))
+            lag_s_dict[run_num] = (lag_bins if lag_bins < fft_size // 2 else lag_bins - fft_size) * bin_s
+        min_lag_s = min(lag_s_dict.values())
+        return {run_num: [(-math.inf, lag_s - min_lag_s)] for run_num, lag_s in lag_s_dict.items()}
+    if sync_mode != 'bursts':
+        raise ValueError('SYNC_MODE has an illegal value.')
+
+    sync_wait_time_s = 3 * (1 / (min_freq_mhz * 1000000))  # same idle time as RunSynchronizer
+    run_burst_dict = {}  # run_num -> [(last edge before the burst, first edge of the burst), ...]
+    for run_num, edge_train in run_edge_train_dict.items():
+        run_burst_dict[run_num] = [(-math.inf, edge_train[0])] if edge_train else []
+        run_burst_dict[run_num] += [(last_edge, edge) for last_edge, edge in zip(edge_train, edge_train[1:]) if edge - last_edge > sync_wait_time_s]
+    num_bursts = min(len(burst_list) for burst_list in run_burst_dict.values())
+    offset_table = {run_num: [] for run_num in run_burst_dict}
+    for burst_num in range(num_bursts):
+        min_burst_start = min(burst_list[burst_num][1] for burst_list in run_burst_dict.values())
+        for run_num, burst_list in run_burst_dict.items():
+            offset_table[run_num].append((burst_list[burst_num][0], burst_list[burst_num][1] - min_burst_start))
+    return {run_num: offset_list or [(-math.inf, 0.0)] for run_num, offset_list in offset_table.items()}
+
+
+def apply_run_offset_table(all_ch_level_matrix, run_num_list, offset_table):
+    ''' Subtract the neg. offsets of get_run_offset_table() from the timestamps, returns a list of EdgeArray
+
+        The offsets of a signal are walked along with its timestamps (O(1) per transition). A timestamp is never moved before the
+        previous timestamp of its signal (the initial level row stays at 0.0).
+    '''
+    aligned_level_matrix_list = []
+    for level_matrix, run_num in zip(all_ch_level_matrix, run_num_list):
+        offset_list = offset_table.get(run_num, [(-math.inf, 0.0)])
+        offset_idx = 0
+        last_timestamp = -math.inf
+        timestamps = array('d')
+        for row_idx, timestamp in enumerate(level_matrix.timestamps):
+            if row_idx > 0:
+                while offset_idx + 1 < len(offset_list) and timestamp > offset_list[offset_idx + 1][0]:
+                    offset_idx += 1
+                timestamp = max(timestamp - offset_list[offset_idx][1], last_timestamp)
+            timestamps.append(timestamp)
+            last_timestamp = timestamp
+        aligned_level_matrix_list.append(EdgeArray.from_arrays(timestamps, level_matrix.levels()))
+    return aligned_level_matrix_list
+
+
 @time_wrapper
-def write_stimuli_file(path, all_ch_level_matrix, vhdl_signal_names, run_num_list, signals_list, min_freq_list, param_dict) -> None:
+def align_runs(all_ch_level_matrix, run_num_list, signals_list, min_freq_mhz, param_dict):
+    ''' Alignment stage of param_dict['SYNC_MODE'] "bursts"/"xcorr": returns the level matrices with the offsets of get_run_offset_table() applied '''
+    all_ch_level_matrix = [level_matrix if isinstance(level_matrix, EdgeArray) else EdgeArray(level_matrix) for level_matrix in all_ch_level_matrix]
+    offset_table = get_run_offset_table(all_ch_level_matrix, run_num_list, signals_list, min_freq_mhz, param_dict)
+    print(f"run offset table (timestamp from, neg. offset): {offset_table}")
+    metrics = get_metrics()
+    if metrics is not None:
+        metrics.count('sync_events', sum(1 for offset_list in offset_table.values() for timestamp_from, neg_offset in offset_list if neg_offset != 0.0))
+    return apply_run_offset_table(all_ch_level_matrix, run_num_list, offset_table)
+
+
+class StimuliShardPlan:
+    ''' Start state of every shard of write_stimuli_shards(), recorded by the planning pass of write_stimuli_file()
+
+        A new shard starts after events_per_shard events or after the first event at/after the next multiple of shard_duration_ns (simulation time).
+    '''
+
+    def __init__(self, events_per_shard=math.inf, shard_duration_ns=math.inf):
+        self.events_per_shard = events_per_shard
+        self.shard_duration_ns = shard_duration_ns
+        self.next_event_cnt = 0  # the first shard starts with the first event
+        self.next_time_ns = 0
+        self.num_events = None
+        self.shard_list = []
+
+    def add_shard(self, event_cnt, simulation_time_ns, last_timestamp, cursor_per_sig_list, level_per_sig_list, neg_offset_per_run_dict):
+        self.shard_list.append({'event_cnt': event_cnt,
+                                'simulation_time_ns': simulation_time_ns,
+                                'last_timestamp': last_timestamp,
+                                'cursors': list(cursor_per_sig_list),
+                                'initial_levels': list(level_per_sig_list),
+                                'neg_offset_per_run': [[run_num, neg_offset] for run_num, neg_offset in neg_offset_per_run_dict.items()]})
+        self.next_event_cnt = event_cnt + self.events_per_shard
+        self.next_time_ns = (simulation_time_ns // self.shard_duration_ns + 1) * self.shard_duration_ns
+
+
+def get_vhd_package_name(param_dict):
+    ''' Name of the VHDL package of VHD_OUTPUT_MODE "table": file name of VHD_DO_FILENAME as legal VHDL identifier '''
+    filename = os.path.splitext(os.path.basename(param_dict["VHD_DO_FILENAME"]))[0]
+    identifier_parts = ''.join(char if (char.isascii() and char.isalnum()) else '_' for char in filename).split('_')
+    return '_'.join(['stimuli'] + [part for part in identifier_parts if part] + ['pkg'])  # no double or trailing underscores
+
+
+@time_wrapper
+def write_stimuli_file(path, all_ch_level_matrix, vhdl_signal_names, run_num_list, signals_list, min_freq_list, param_dict, writer_state=None, shard_plan=None):
+    ''' Merge the transitions of all signals in time order and write them as .vhd or .do file
+
+        The next transition is taken from a heap of per signal cursors (O(log signals) per event).
+        all_ch_level_matrix: one level matrix per signal, any iterable of [timestamp, level] (e.g. a list or BufferedEdgeStream)
+        param_dict['VHD_OUTPUT_MODE']: "statements" (one wait/assignment per transition) or "table" (see StimuliTableWriter,
+            the tables are written to the package file '<VHD_DO_FILENAME>_pkg.vhd')
+        param_dict['COALESCE_EVENTS'], param_dict['BUSES']: write the events of one resolution tick as one block (see StimuliBlockWriter)
+        writer_state: start state of the writer (see append_stimuli_file() and write_stimuli_shards()), None: write a new file.
+            Only the events up to writer_state['horizon'] and at most writer_state['max_events'] are written, the state at the end
+            is returned (the events not written are returned in its 'pending' list). If writer_state has an 'output_size', the file is appended.
+        shard_plan: planning pass of write_stimuli_shards(), nothing is written and the start state of every shard is recorded in shard_plan
+    '''
     TIMESTAMP_IDX = 0
     last_timestamp = 0
-    num_timestamps_per_sig_list = [len(all_ch_level_matrix[i]) for i in range(len(all_ch_level_matrix))]  # [5, 12, 210]
-    debug_print(f"num_timestamps_per_sig_list {num_timestamps_per_sig_list}")
     filename, file_extension = os.path.splitext(param_dict["VHD_DO_FILENAME"])
     simulation_time_ns = 0
+    is_resumed = writer_state is not None and 'last_timestamp' in writer_state
+    is_appended = writer_state is not None and writer_state.get('output_size') is not None
+    if is_resumed:
+        last_timestamp = writer_state['last_timestamp']
+        simulation_time_ns = writer_state['simulation_time_ns']
 
     min_freq_mhz = min(min_freq_list)
-    debug_print(f"min_freq_mhz: {min_freq_mhz}")
+    tracer.trace('debug', "min_freq_mhz: %s", min_freq_mhz)
 
-    do_sync = False
+    synchronizer = None
     if param_dict['DO_SYNC'] is True:
         num_different_runs = len(set(run_num_list))  # num of different runs
-        debug_print(f"run_num_list: {run_num_list}")
-        debug_print(f"num_different_runs: {num_different_runs}")
+        tracer.trace('debug', "run_num_list: %s, num_different_runs: %s", run_num_list, num_different_runs)
         if num_different_runs > 1:
-            do_sync = True
+            synchronizer = RunSynchronizer(run_num_list, signals_list, min_freq_mhz)
+            if is_resumed:
+                for run_num, neg_offset in writer_state['neg_offset_per_run']:
+                    synchronizer.neg_offset_per_run_dict[run_num] = neg_offset
+                    for run_sig_idx in synchronizer.run_sig_idx_map.get(run_num, []):
+                        synchronizer.neg_offset_per_sig_s_list[run_sig_idx] = neg_offset
         else:
-            debug_print(f"num_different_runs was < 2 => No sync action possible ")
-
-    with open(os.path.join(path, param_dict["VHD_DO_FILENAME"]), 'w') as dofile:
-        if file_extension == '.do':
-            str_run_cmd = (os.path.dirname(os.path.realpath(__file__)) + os.sep + param_dict["VHD_DO_FILENAME"]).replace('\\', '/')  # ModelSim needs '/'
-            dofile.write(f'#do {str_run_cmd}\n')
-            dofile.write('restart -f\n\n')
-        elif file_extension == '.vhd':
-            dofile.write('\t--\n')
-            dofile.write(f'\t-- Measurement data of {param_dict["VHD_DO_FILENAME"]} starts here\n')
-            dofile.write('\t--\n')
-
-        nxt_timestamp_per_sig_idx = [0 for i in range(len(vhdl_signal_names))]  # [0, 0, 0]
-        nxt_time_neg_offset_per_sig_s_list = [0 for i in range(len(vhdl_signal_names))]
-
-        while nxt_timestamp_per_sig_idx != []:
-            nxt_timestamp_list = [all_ch_level_matrix[num][nxt_timestamp_per_sig_idx[num]][TIMESTAMP_IDX] for num in range(len(nxt_timestamp_per_sig_idx))]  # [0.0, 2.76e-07, 1.968e-07]
-            debug_print(f"----- nxt_timestamp_list {nxt_timestamp_list}")  # [0.0, 2.76e-07, 1.968e-07]
-
-            for timestamp_idx in range(len(nxt_timestamp_list)):
-                nxt_timestamp_list[timestamp_idx] -= nxt_time_neg_offset_per_sig_s_list[timestamp_idx]
-
-            debug_print(f"nxt_timestamp_list {nxt_timestamp_list}")  # [0.0, 2.76e-07, 1.968e-07]
-            signal_nxt_timestamp_min_val_idx = min(range(len(nxt_timestamp_list)), key=nxt_timestamp_list.__getitem__)  # signal_nxt_timestamp_min_val_idx = signal with the next min timestamp
-            debug_print(f" signal_nxt_timestamp_min_val_idx {signal_nxt_timestamp_min_val_idx}")
-            data_tuple = all_ch_level_matrix[signal_nxt_timestamp_min_val_idx][nxt_timestamp_per_sig_idx[signal_nxt_timestamp_min_val_idx]]
-            debug_print(f"selected data_tuple: {data_tuple}")
-            data_tuple_tmp = data_tuple.copy()
-            data_tuple_tmp[TIMESTAMP_IDX] -= nxt_time_neg_offset_per_sig_s_list[signal_nxt_timestamp_min_val_idx]
-            debug_print(f"last_timestamp: {last_timestamp}")
-            wait_time_tmp_ps = round((data_tuple_tmp[TIMESTAMP_IDX] - last_timestamp) * 1000000000000, 0)
+            tracer.trace('debug', "num_different_runs was < 2 => No sync action possible")
+
+    with contextlib.ExitStack() as stack:
+        if shard_plan is not None:
+            dofile = io.StringIO()  # nothing is written
+        elif is_appended:
+            dofile = stack.enter_context(open(os.path.join(path, param_dict["VHD_DO_FILENAME"]), 'r+'))
+            dofile.truncate(writer_state['output_size'])  # drop the rest of an interrupted run
+            dofile.seek(writer_state['output_size'])  # the header was written by the first run
+        else:
+            dofile = stack.enter_context(open(os.path.join(path, param_dict["VHD_DO_FILENAME"]), 'w'))
+            if file_extension == '.do':
+                str_run_cmd = (os.path.dirname(os.path.realpath(__file__)) + os.sep + param_dict["VHD_DO_FILENAME"]).replace('\\', '/')  # ModelSim needs '/'
+                dofile.write(f'#do {str_run_cmd}\n')
+                dofile.write('restart -f\n\n')
+            elif file_extension == '.vhd':
+                dofile.write('\t--\n')
+                dofile.write(f'\t-- Measurement data of {param_dict["VHD_DO_FILENAME"]} starts here\n')
+                dofile.write('\t--\n')
+            if writer_state is not None:
+                comment_prefix = '# ' if file_extension == '.do' else '\t-- '
+                dofile.writelines(f"{comment_prefix}{header_line}\n" for header_line in writer_state.get('header_lines', []))
+        if shard_plan is not None:
+            line_writer = StimuliLineWriter(dofile, None, vhdl_signal_names, param_dict)  # no output
+        elif file_extension == '.vhd' and param_dict.get('VHD_OUTPUT_MODE', 'statements') == 'table':
+            dofile.write(f'\t-- uses the tables of package {get_vhd_package_name(param_dict)} (use work.{get_vhd_package_name(param_dict)}.all;)\n')
+            pkgfile = stack.enter_context(open(os.path.join(path, f'{filename}_pkg.vhd'), 'w'))
+            line_writer = StimuliTableWriter(dofile, pkgfile, get_vhd_package_name(param_dict), vhdl_signal_names, param_dict, param_dict.get('WRITE_BATCH_LINES', 65536), param_dict.get('VHD_TABLE_CHUNK_SIZE', 65536))
+        elif param_dict.get('COALESCE_EVENTS', False) is True or param_dict.get('BUSES'):
+            line_writer = StimuliBlockWriter(dofile, file_extension, vhdl_signal_names, param_dict, param_dict.get('WRITE_BATCH_LINES', 65536))
+        else:
+            line_writer = StimuliLineWriter(dofile, file_extension, vhdl_signal_names, param_dict, param_dict.get('WRITE_BATCH_LINES', 65536))
+        if writer_state is not None:
+            for sig_idx, level in enumerate(writer_state.get('initial_levels', [])):
+                if level is not None:
+                    line_writer.write(0, sig_idx, level)
+
+        level_iter_per_sig_list = [iter(level_matrix) for level_matrix in all_ch_level_matrix]
+        nxt_data_tuple_per_sig_list = [next(level_iter, None) for level_iter in level_iter_per_sig_list]  # cursor: next transition of every signal
+        if synchronizer is not None:
+            synchronizer.start(nxt_data_tuple_per_sig_list)
+            nxt_time_neg_offset_per_sig_s_list = synchronizer.neg_offset_per_sig_s_list  # changed by synchronizer.sync()
+        else:
+            nxt_time_neg_offset_per_sig_s_list = [0 for i in range(len(vhdl_signal_names))]
+        active_sig_idx_list = [sig_idx for sig_idx in range(len(vhdl_signal_names)) if nxt_data_tuple_per_sig_list[sig_idx] is not None]  # signals with transitions left
+
+        # heap of (next timestamp - neg. offset, signal index) -> on equal timestamps the signal with the lower index is first
+        nxt_timestamp_heap = [(nxt_data_tuple_per_sig_list[sig_idx][TIMESTAMP_IDX] - nxt_time_neg_offset_per_sig_s_list[sig_idx], sig_idx) for sig_idx in active_sig_idx_list]
+        heapq.heapify(nxt_timestamp_heap)
+
+        # events after the horizon are not written: transitions of a signal read by the next run might be before them
+        horizon = math.inf if writer_state is None else writer_state.get('horizon', math.inf)
+        horizon_key = horizon - max(nxt_time_neg_offset_per_sig_s_list, default=0) if horizon < math.inf else math.inf  # no hold back if all inputs are complete
+        max_events = math.inf if writer_state is None else writer_state.get('max_events', math.inf)
+        event_cnt = 0
+        sim_time_reached = False
+        trace_every = tracer.sample_every()  # 0: no event traces
+        if shard_plan is not None:
+            cursor_per_sig_list = [0 for i in range(len(vhdl_signal_names))]  # num of events of every signal before the shard start
+            level_per_sig_list = [None for i in range(len(vhdl_signal_names))]
+
+        while nxt_timestamp_heap:
+            if nxt_timestamp_heap[0][0] > horizon_key or event_cnt >= max_events:
+                break
+            if shard_plan is not None and (event_cnt >= shard_plan.next_event_cnt or simulation_time_ns >= shard_plan.next_time_ns):
+                shard_plan.add_shard(event_cnt, simulation_time_ns, last_timestamp, cursor_per_sig_list, level_per_sig_list,
+                                     {} if synchronizer is None else synchronizer.neg_offset_per_run_dict)
+            signal_nxt_timestamp_min_val_idx = nxt_timestamp_heap[0][1]  # signal_nxt_timestamp_min_val_idx = signal with the next min timestamp
+            data_tuple = nxt_data_tuple_per_sig_list[signal_nxt_timestamp_min_val_idx]
+            data_timestamp_tmp = nxt_timestamp_heap[0][0]
+            wait_time_tmp_ps = round((data_timestamp_tmp - last_timestamp) * 1000000000000, 0)
             wait_time_ps = min(wait_time_tmp_ps, (param_dict['MAX_WAIT_TIME_NS'] * 1000))
 
             # the sync stuff
-            if do_sync is True:
-                nxt_switching_signal_per_run_list = [None for i in range(num_different_runs)]
-                wait_time_s = wait_time_ps / 1E+12
-                if (wait_time_s) > (3 * (1 / (min_freq_mhz * 1000000))):  # 3 heuristical value
-                    debug_print(f"{wait_time_s} > {3 * (1 / (min_freq_mhz * 1000000))} -> Prüfe auf Sync")
-                    # finde für jeden run den nächsten Zeitstempel
-                    for run_num in range(num_different_runs):
-                        nxt_timestamp_min_this_run_idx = None
-                        # gehe alle Signale durch
-                        for signal_idx, run_of_signal in enumerate(run_num_list):
-                            # prüfe of Signal zu aktuellem run gehört
-                            if run_of_signal == (run_num + 1):
-                                if nxt_timestamp_min_this_run_idx is None:
-                                    nxt_timestamp_min_this_run_idx = signal_idx
-                                    nxt_switching_signal_per_run_list[run_num] = signals_list[signal_idx]
-                                else:
-                                    debug_print(f"signal_idx {signal_idx}")
-                                    debug_print(f"nxt_timestamp_min_this_run_idx {nxt_timestamp_min_this_run_idx}")
-                                    if nxt_timestamp_list[nxt_timestamp_min_this_run_idx] > nxt_timestamp_list[signal_idx]:
-                                        nxt_timestamp_min_this_run_idx = signal_idx
-                                        nxt_switching_signal_per_run_list[run_num] = signals_list[signal_idx]
-                                debug_print(f"nxt_switching_signal_per_run_list: {nxt_switching_signal_per_run_list}")
-                    # check if for every run the next signal is of same type (don´t sync if e.g. next signal is run1=CLK and run2=MOSI)
-                    debug_print(f"nxt_switching_signal_per_run_list: {nxt_switching_signal_per_run_list}")
-                    if len(set(nxt_switching_signal_per_run_list)) == 1:
-                        print("### Mach SYNC")
-                        print(f"simulation_time_ns: {simulation_time_ns}")
-                        nxt_time_neg_offset_per_sig_s_tmp_list = [0 for i in range(len(vhdl_signal_names))]
-                        # ermittle Zeitdifferenz zwischen den Syncsignalen
-                        for signal_idx, signal_type in enumerate(signals_list):
-                            debug_print(f"signal_idx, signal_type: {signal_idx}, {signal_type}")
-                            debug_print(f"signal_nxt_timestamp_min_val_idx {signal_nxt_timestamp_min_val_idx}")
-                            if run_num_list[signal_idx] != run_num_list[signal_nxt_timestamp_min_val_idx]:  # do not sync if signal is in same run as signal_nxt_timestamp_min
-                                if signal_type == nxt_switching_signal_per_run_list[0]:
-                                    debug_print(f"nxt_timestamp_list[signal_idx]: {nxt_timestamp_list[signal_idx]}")
-                                    time_delta_ps = round((nxt_timestamp_list[signal_idx] - data_tuple_tmp[TIMESTAMP_IDX]) * 1000000000000)
-                                    debug_print(f"time_delta_ps: {time_delta_ps}")
-                                    neg_offset_this_run_in_s = time_delta_ps / 1e+12
-                                    # speichere Zeitdifferenz als neg. Offset für nächsten Zeitstempel für alle Signale diesen Runs
-                                    for signal_idx_loop, run_num_loop in enumerate(run_num_list):
-                                        if run_num_loop == run_num_list[signal_idx]:
-                                            nxt_time_neg_offset_per_sig_s_tmp_list[signal_idx_loop] = neg_offset_this_run_in_s
-                                    print(f"nxt_time_neg_offset_per_sig_s_tmp_list: {nxt_time_neg_offset_per_sig_s_tmp_list}")
-                                else:
-                                    debug_print(f"signal_type {signal_type} not matching.")
-                            else:
-                                debug_print("do not sync if signal is in same run as signal_nxt_timestamp_min")
-
-                        # # reduce neg_offset to minimum
-                        # get min of nxt_time_neg_offset_per_sig_s_list
-                        if max(nxt_time_neg_offset_per_sig_s_tmp_list) == 0.0:
-                            print(f"nxt_time_neg_offset_per_sig_s_tmp_list only 0.0 values.")
-                        else:
-                            min_neg_offset = max(nxt_time_neg_offset_per_sig_s_tmp_list)  # abs min value
-                            for signal_idx, neg_offset in enumerate(nxt_time_neg_offset_per_sig_s_list):
-                                if neg_offset <= min_neg_offset:
-                                    if run_num_list[signal_idx] == run_num_list[signal_nxt_timestamp_min_val_idx]:  # do take min val only if signal is in same run as signal_nxt_timestamp_min
-                                        min_neg_offset = neg_offset
-                                        run_num_of_min = run_num_list[signal_idx]
-                            print(f"min_neg_offset: {min_neg_offset}")
-                            print(f"run_num_of_min: {run_num_of_min}")
-                            # go again trough the list and add the new neg_offset
-                            if max(nxt_time_neg_offset_per_sig_s_tmp_list) >= min_neg_offset:
-                                for signal_idx, neg_offset in enumerate(nxt_time_neg_offset_per_sig_s_list):
-                                    nxt_time_neg_offset_per_sig_s_list[signal_idx] += nxt_time_neg_offset_per_sig_s_tmp_list[signal_idx] - min_neg_offset
-                            else:
-                                for signal_idx, neg_offset in enumerate(nxt_time_neg_offset_per_sig_s_list):
-                                    if run_num_list[signal_idx] != run_num_list[signal_nxt_timestamp_min_val_idx]:  # do change val if signal is in same run as signal_nxt_timestamp_min
-                                        nxt_time_neg_offset_per_sig_s_list[signal_idx] += nxt_time_neg_offset_per_sig_s_tmp_list[signal_idx]
-                        print(f"nxt_time_neg_offset_per_sig_s_list: {nxt_time_neg_offset_per_sig_s_list}")
-
-                    else:
-                        debug_print(f"set(nxt_switching_signal_per_run_list) {set(nxt_switching_signal_per_run_list)}")
-                else:
-                    debug_print(f"wait_time_s {wait_time_s} < {3 * (1 / (min_freq_mhz * 1000000))} -> KEIN Sync")
+            offsets_changed = False
+            if synchronizer is not None:
+                offsets_changed = synchronizer.sync(wait_time_ps, signal_nxt_timestamp_min_val_idx, data_timestamp_tmp, nxt_data_tuple_per_sig_list, simulation_time_ns)
 
             # cut idle time to 'MAX_WAIT_TIME_NS'
-            data_tuple[TIMESTAMP_IDX] -= nxt_time_neg_offset_per_sig_s_list[signal_nxt_timestamp_min_val_idx]
-            debug_print(f"data_tuple after sync: {data_tuple}")
-            wait_time_tmp_ps = round((data_tuple[TIMESTAMP_IDX] - last_timestamp) * 1000000000000, 0)
+            data_timestamp = data_tuple[TIMESTAMP_IDX] - nxt_time_neg_offset_per_sig_s_list[signal_nxt_timestamp_min_val_idx]
+            wait_time_tmp_ps = round((data_timestamp - last_timestamp) * 1000000000000, 0)
             wait_time_ps = min(wait_time_tmp_ps, (param_dict['MAX_WAIT_TIME_NS'] * 1000))
-            debug_print(f"wait_time_ps real: {wait_time_tmp_ps}; wait_time_ps used: {wait_time_ps}")
+            if trace_every and event_cnt % trace_every == 0:
+                tracer.trace('event', "event %d: signal %d data_tuple %s, after sync %s, last_timestamp %s, wait_time_ps real %s used %s, simulation_time_ns %s",
+                             event_cnt, signal_nxt_timestamp_min_val_idx, data_tuple, data_timestamp, last_timestamp, wait_time_tmp_ps, wait_time_ps, simulation_time_ns)
             if wait_time_tmp_ps > wait_time_ps:
                 print(f"wait_time_ps was greater than MAX_WAIT_TIME_NS: {wait_time_tmp_ps} ps -> is cutted to {wait_time_ps}ps")
 
             # writing the file
-            if file_extension == '.do':
-                if param_dict["RESOLUTION"] == "ns":
-                    dofile.write(f"run {round(wait_time_ps/1000,0)}\n")  # convert diff to ns and round to ns
-                elif param_dict["RESOLUTION"] == "ps":
-                    dofile.write(f"run {wait_time_ps/1000}\n")  # convert diff to ns and round to ps
-                else:
-                    raise ValueError('RESOLUTION has an illegal value.')
-                dofile.write(f"force -freeze {vhdl_signal_names[signal_nxt_timestamp_min_val_idx]} {data_tuple[1]}\n")
-                # -deposit
-                # (optional) Sets the object to the specified <value>. The <value> remains until the object is
-                # forced again,
-            elif file_extension == '.vhd':
-                num_max_digits = int(math.log10(param_dict['MAX_WAIT_TIME_NS'])) + 1  # +1 to round up, ceil does not work for MAX_WAIT_TIME_NS=10,100,1000,...
-
-                if param_dict["RESOLUTION"] == "ns":
-                    dofile.write(f"\twait for {round(wait_time_ps / 1000, 0): >{num_max_digits}} ns;\t")  # convert diff to ns and round to ns; +2-> because of ".0" in output format
-                elif param_dict["RESOLUTION"] == "ps":
-                    dofile.write(f"\twait for {wait_time_ps: >{num_max_digits+3}} ps;\t")  # convert diff to ns and round to ps; +4-> ".000"
-                else:
-                    raise ValueError('RESOLUTION has an illegal value.')
-                dofile.write(f"\t{vhdl_signal_names[signal_nxt_timestamp_min_val_idx]}\t\t<=\t'{data_tuple[1]}';\n")
+            line_writer.write(wait_time_ps, signal_nxt_timestamp_min_val_idx, data_tuple[1])
+            event_cnt += 1
+            if shard_plan is not None:
+                cursor_per_sig_list[signal_nxt_timestamp_min_val_idx] += 1
+                level_per_sig_list[signal_nxt_timestamp_min_val_idx] = data_tuple[1]
+                if file_extension != '.vhd':
+                    simulation_time_ns += round(wait_time_ps / 1000)  # shard durations of '.do' files
+            if file_extension == '.vhd':
                 simulation_time_ns += round(wait_time_ps / 1000)
-                debug_print(f"simulation_time_ns: {simulation_time_ns}")
                 if simulation_time_ns > (param_dict['MAX_SIM_TIME_US'] * 1000):
                     print(f"BREAK as MAX_SIM_TIME_US is reached.")
+                    sim_time_reached = True
                     break
-            last_timestamp = data_tuple[TIMESTAMP_IDX]
-            nxt_timestamp_per_sig_idx[signal_nxt_timestamp_min_val_idx] += 1
+            last_timestamp = data_timestamp
+            nxt_data_tuple = next(level_iter_per_sig_list[signal_nxt_timestamp_min_val_idx], None)
+            nxt_data_tuple_per_sig_list[signal_nxt_timestamp_min_val_idx] = nxt_data_tuple
+            if synchronizer is not None:
+                synchronizer.advance(signal_nxt_timestamp_min_val_idx, nxt_data_tuple)
             # check if signal has no more transitions
-            if nxt_timestamp_per_sig_idx[signal_nxt_timestamp_min_val_idx] == num_timestamps_per_sig_list[signal_nxt_timestamp_min_val_idx]:
-                del nxt_timestamp_per_sig_idx[signal_nxt_timestamp_min_val_idx]
-                del all_ch_level_matrix[signal_nxt_timestamp_min_val_idx]
-                del num_timestamps_per_sig_list[signal_nxt_timestamp_min_val_idx]
-                del vhdl_signal_names[signal_nxt_timestamp_min_val_idx]
-                del run_num_list[signal_nxt_timestamp_min_val_idx]
-                del signals_list[signal_nxt_timestamp_min_val_idx]
-                del nxt_time_neg_offset_per_sig_s_list[signal_nxt_timestamp_min_val_idx]
-            debug_print(f"nxt_timestamp_per_sig_idx {nxt_timestamp_per_sig_idx}")
+            if nxt_data_tuple is None:
+                heapq.heappop(nxt_timestamp_heap)
+                active_sig_idx_list.remove(signal_nxt_timestamp_min_val_idx)
+            else:
+                heapq.heapreplace(nxt_timestamp_heap, (nxt_data_tuple[TIMESTAMP_IDX] - nxt_time_neg_offset_per_sig_s_list[signal_nxt_timestamp_min_val_idx], signal_nxt_timestamp_min_val_idx))
+            if offsets_changed is True:
+                # neg. offsets of the sync changed the keys of all signals
+                nxt_timestamp_heap = [(nxt_data_tuple_per_sig_list[signal_idx][TIMESTAMP_IDX] - nxt_time_neg_offset_per_sig_s_list[signal_idx], signal_idx) for signal_idx in active_sig_idx_list]
+                heapq.heapify(nxt_timestamp_heap)
+                horizon_key = horizon - max(nxt_time_neg_offset_per_sig_s_list, default=0) if horizon < math.inf else math.inf
+        line_writer.close()
+    if shard_plan is not None:
+        shard_plan.num_events = event_cnt
+        return None
+    metrics = get_metrics()
+    if metrics is not None:
+        metrics.count('lines_written', line_writer.num_events)
+        if synchronizer is not None:
+            metrics.count('sync_events', synchronizer.sync_cnt)
     print(f"\n{os.path.join(path, param_dict['VHD_DO_FILENAME'])} was written successfully!")
+    if writer_state is None:
+        return None
+    pending_per_sig_list = [[] if nxt_data_tuple is None or sim_time_reached else [[nxt_data_tuple[TIMESTAMP_IDX], nxt_data_tuple[1]]] + [[timestamp, level] for timestamp, level in level_iter]
+                            for nxt_data_tuple, level_iter in zip(nxt_data_tuple_per_sig_list, level_iter_per_sig_list)]
+    return {'last_timestamp': last_timestamp,
+            'simulation_time_ns': simulation_time_ns,
+            'neg_offset_per_run': [] if synchronizer is None else [[run_num, neg_offset] for run_num, neg_offset in synchronizer.neg_offset_per_run_dict.items()],
+            'finished': sim_time_reached,
+            'pending': pending_per_sig_list,
+            'output_size': os.path.getsize(os.path.join(path, param_dict["VHD_DO_FILENAME"]))}
+
+
+def plan_stimuli_shards_vectorized(all_ch_level_matrix, file_extension, param_dict, shard_plan):
+    ''' numpy version of the planning pass of write_stimuli_shards() for stimuli without sync
+
+        Merge order, wait times and simulation time of all events are calculated like in write_stimuli_file() by sorting the timestamps.
+        all_ch_level_matrix: list of EdgeArray
+    '''
+    timestamps = np.concatenate([np.array(level_matrix.timestamps, dtype=np.float64) for level_matrix in all_ch_level_matrix])
+    sig_idx_arr = np.repeat(np.arange(len(all_ch_level_matrix)), [len(level_matrix) for level_matrix in all_ch_level_matrix])
+    order = np.lexsort((sig_idx_arr, timestamps))  # stable: timestamp, then signal index like the heap of write_stimuli_file()
+    timestamps = timestamps[order]
+    sig_idx_arr = sig_idx_arr[order]
+    wait_time_ps = np.minimum(np.round(np.diff(timestamps, prepend=0.0) * 1000000000000, 0), param_dict['MAX_WAIT_TIME_NS'] * 1000)
+    simulation_time_ns = np.concatenate(([0], np.cumsum(np.rint(wait_time_ps / 1000).astype(np.int64))))  # before every event
+    num_events = len(timestamps)
+    if file_extension == '.vhd':
+        sim_time_reached_idx = np.flatnonzero(simulation_time_ns[1:] > param_dict['MAX_SIM_TIME_US'] * 1000)
+        if len(sim_time_reached_idx):
+            num_events = int(sim_time_reached_idx[0]) + 1  # same break as write_stimuli_file()
+
+    cursor_arr = np.zeros(len(all_ch_level_matrix), dtype=np.int64)
+    shard_start = 0
+    while shard_start < num_events:
+        shard_plan.add_shard(shard_start, int(simulation_time_ns[shard_start]), float(timestamps[shard_start - 1]) if shard_start else 0,
+                             [int(cursor) for cursor in cursor_arr],
+                             [level_matrix.level(int(cursor) - 1) if cursor else None for level_matrix, cursor in zip(all_ch_level_matrix, cursor_arr)], {})
+        shard_stop = min(shard_plan.next_event_cnt, num_events)
+        if shard_plan.next_time_ns != math.inf:
+            shard_stop = min(shard_stop, int(np.searchsorted(simulation_time_ns[:num_events], shard_plan.next_time_ns, 'left')))
+        cursor_arr += np.bincount(sig_idx_arr[shard_start:shard_stop], minlength=len(all_ch_level_matrix))
+        shard_start = shard_stop
+    shard_plan.num_events = num_events
+
+
+@time_wrapper
+def write_stimuli_shards(path, all_ch_level_matrix, vhdl_signal_names, run_num_list, signals_list, min_freq_list, param_dict):
+    ''' Split the output of write_stimuli_file() into shards '<VHD_DO_FILENAME>_shard<num>' which can be simulated in parallel
+
+        param_dict['SHARDS']: num of shards with the same num of events
+        param_dict['SHARD_DURATION_NS']: shards of this simulated duration (instead of SHARDS)
+        A planning pass of write_stimuli_file() (merge and sync without writing) records the start state of every shard
+        (without sync: plan_stimuli_shards_vectorized() if numpy is installed),
+        then the shards are written in parallel (param_dict['POOL_MODE'], param_dict['NUM_WORKERS']).
+        Every shard starts with the levels of all signals and the sync offsets at its start, the simulation time 0 of a shard is
+        the time of the last event of the previous shard -> the shards one after another give the same stimuli as one file.
+        Returns the file names of the shards.
+    '''
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+    all_ch_level_matrix = [level_matrix if isinstance(level_matrix, EdgeArray) else EdgeArray(level_matrix) for level_matrix in all_ch_level_matrix]  # e.g. BufferedEdgeStream
+    if param_dict.get('SHARD_DURATION_NS') is not None:
+        shard_plan = StimuliShardPlan(shard_duration_ns=param_dict['SHARD_DURATION_NS'])
+    else:
+        num_events = sum(len(level_matrix) for level_matrix in all_ch_level_matrix)
+        shard_plan = StimuliShardPlan(events_per_shard=max(1, math.ceil(num_events / param_dict.get('SHARDS', 1))))
+    filename, file_extension = os.path.splitext(param_dict["VHD_DO_FILENAME"])
+    if np is not None and not (param_dict['DO_SYNC'] is True and len(set(run_num_list)) > 1):
+        plan_stimuli_shards_vectorized(all_ch_level_matrix, file_extension, param_dict, shard_plan)
+    else:
+        write_stimuli_file(path, all_ch_level_matrix, vhdl_signal_names, run_num_list, signals_list, min_freq_list, param_dict, shard_plan=shard_plan)
+
+    num_shards = len(shard_plan.shard_list)
+    shard_filename_list = [f"{filename}_shard{shard_num:03d}{file_extension}" for shard_num in range(num_shards)]
+    executor_class = ProcessPoolExecutor if param_dict.get('POOL_MODE', 'thread') == 'process' else ThreadPoolExecutor
+    with executor_class(max_workers=param_dict.get('NUM_WORKERS', 2)) as executor:
+        future_list = []
+        for shard_num, shard in enumerate(shard_plan.shard_list):
+            if shard_num + 1 < num_shards:
+                stop_event_cnt, stop_cursor_list = shard_plan.shard_list[shard_num + 1]['event_cnt'], shard_plan.shard_list[shard_num + 1]['cursors']
+            else:
+                stop_event_cnt, stop_cursor_list = shard_plan.num_events, [len(level_matrix) for level_matrix in all_ch_level_matrix]
+            # one more transition per signal: the sync looks at the next transition of every signal
+            shard_level_matrix_list = [level_matrix[start_cursor:stop_cursor + 1] for level_matrix, start_cursor, stop_cursor in zip(all_ch_level_matrix, shard['cursors'], stop_cursor_list)]
+            header_line_list = [f"shard {shard_num + 1} of {num_shards} of {param_dict['VHD_DO_FILENAME']}, starts at simulation time {shard['simulation_time_ns']} ns"]
+            if any(level is not None for level in shard['initial_levels']):
+                header_line_list.append("initial levels: " + ', '.join(f"{vhdl_signal_name} = '{level}'" for vhdl_signal_name, level in zip(vhdl_signal_names, shard['initial_levels']) if level is not None))
+            if shard['neg_offset_per_run']:
+                header_line_list.append("sync offsets per run: " + ', '.join(f"{run_num}: {neg_offset} s" for run_num, neg_offset in shard['neg_offset_per_run']))
+            writer_state = dict(shard, max_events=stop_event_cnt - shard['event_cnt'], header_lines=header_line_list)
+            future_list.append(submit_with_metrics(executor, write_stimuli_file, path, shard_level_matrix_list, vhdl_signal_names, run_num_list, signals_list, min_freq_list,
+                                                   dict(param_dict, VHD_DO_FILENAME=shard_filename_list[shard_num]), writer_state))
+        for future in future_list:
+            future.result()
+    return shard_filename_list
+
+
+EDGE_CACHE_MAGIC = b'C2VEDGE1'
+EDGE_CACHE_HEADER = struct.Struct('<8sdQ')  # magic, max_transitions used for the cached data (inf if complete), num of rows
+
+
+def is_window_level_from_index(csv_filepath, start_time_ns, param_dict):
+    ''' True if the initial level of the time window is the hysteresis level of the csv index (see get_csv_level_at_time()),
+        False if it is the level of the first row of the window
+    '''
+    return start_time_ns is not None and not is_binary_input(csv_filepath) and get_compression(csv_filepath) is None and param_dict.get('CSV_INDEX', False) is True
+
+
+def get_edge_cache_path(csv_filepath, input_dict, param_dict):
+    ''' Path of the edge cache file of a csv file in param_dict['EDGE_CACHE_DIR']
+
+        The key covers the file (size, mtime and optionally the content hash) and all settings changing the level matrix.
+    '''
+    file_stat = os.stat(csv_filepath)
+    key_list = [os.path.abspath(csv_filepath), file_stat.st_size, file_stat.st_mtime_ns,
+                input_dict.get('column', 1), input_dict['logic_family'], input_dict['POSITIVE_GOING_VOLTAGE'], input_dict['NEGATIVE_GOING_VOLTAGE'], input_dict['ignore_time_ns'],
+                param_dict['maxDataRows'], param_dict['CSV_Delimiter'], get_time_window_ns(input_dict, param_dict),
+                is_window_level_from_index(csv_filepath, get_time_window_ns(input_dict, param_dict)[0], param_dict)]
+    if is_binary_input(csv_filepath):
+        key_list.append(sorted(get_binary_info(csv_filepath).items()))  # sidecar header
+    if param_dict.get('EDGE_CACHE_HASH_CONTENT', False) is True:
+        content_hash = hashlib.sha256()
+        with open(csv_filepath, 'rb') as csvfile:
+            for data in iter(lambda: csvfile.read(16 * 1024 * 1024), b''):
+                content_hash.update(data)
+        key_list[0:3] = [content_hash.hexdigest()]
+    key = hashlib.sha256(repr(key_list).encode()).hexdigest()
+    return os.path.join(param_dict['EDGE_CACHE_DIR'], f"{key}.edges")
+
+
+def load_edge_cache(cache_path, max_transitions):
+    ''' Level matrix from the edge cache (see save_edge_cache()), None if not cached for max_transitions '''
+    try:
+        with open(cache_path, 'rb') as cachefile:
+            magic, cached_max_transitions, num_rows = EDGE_CACHE_HEADER.unpack(cachefile.read(EDGE_CACHE_HEADER.size))
+            if magic != EDGE_CACHE_MAGIC or max_transitions > cached_max_transitions:
+                return None  # cached data was cut by a smaller max_transitions
+            timestamps = array('d')
+            timestamps.fromfile(cachefile, num_rows)
+            levels = cachefile.read(num_rows)
+            if len(levels) != num_rows:
+                return None
+    except (OSError, EOFError, struct.error):
+        return None
+    os.utime(cache_path)  # mtime = last use for the LRU eviction
+
+    # same break as in read_csv_and_get_edges()
+    num_rows = min(num_rows, math.floor(max_transitions) + 2)
+    return EdgeArray.from_arrays(timestamps[:num_rows], levels[:num_rows])
+
+
+def save_edge_cache(cache_path, level_matrix, max_transitions, max_cache_mb=1024):
+    ''' Save a level matrix to the edge cache and evict the least recently used files above max_cache_mb '''
+    cache_dir = os.path.dirname(cache_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    if len(level_matrix) - 1 <= max_transitions:
+        max_transitions = math.inf  # data is complete, valid for every max_transitions
+    if not isinstance(level_matrix, EdgeArray):
+        level_matrix = EdgeArray(level_matrix)
+    timestamps = level_matrix.timestamps
+    levels = level_matrix.levels()
+
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as cachefile:
+        cachefile.write(EDGE_CACHE_HEADER.pack(EDGE_CACHE_MAGIC, max_transitions, len(level_matrix)))
+        timestamps.tofile(cachefile)
+        cachefile.write(levels)
+    os.replace(tmp_path, cache_path)
+
+    # LRU eviction
+    cache_files = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.endswith('.edges')]
+    cache_files = sorted((os.stat(path).st_mtime_ns, os.path.getsize(path), path) for path in cache_files)
+    cache_size = sum(file_size for mtime, file_size, path in cache_files)
+    for mtime, file_size, path in cache_files:
+        if cache_size <= max_cache_mb * 1024 * 1024 or path == cache_path:
+            break
+        os.remove(path)
+        cache_size -= file_size
+
+
+def clear_edge_cache(cache_dir):
+    ''' Remove all files of the edge cache '''
+    if os.path.isdir(cache_dir):
+        for name in os.listdir(cache_dir):
+            if name.endswith('.edges'):
+                os.remove(os.path.join(cache_dir, name))
+
+
+class CachedLevelMatrix:
+    ''' Level matrix taken from the edge cache, result() like Future.result() '''
+
+    def __init__(self, level_matrix):
+        self.level_matrix = level_matrix
+
+    def result(self):
+        return self.level_matrix
+
+
+class CsvColumnFuture:
+    ''' Level matrix of one column of a multi channel csv file (see read_csv_and_get_edges_of_columns()), result() like Future.result() '''
+
+    def __init__(self, future, channel_num):
+        self.future = future
+        self.channel_num = channel_num
+
+    def result(self):
+        return self.future.result()[self.channel_num]
+
+
+class CsvChunkFutures:
+    ''' Level matrix of a csv file whose chunks are processed in parallel (see get_edges_of_csv_chunk())
+
+        result() waits for all chunks and stitches them together, like Future.result().
+    '''
+
+    def __init__(self, csv_filepath, first_level, future_list, max_transitions):
+        self.csv_filepath = csv_filepath
+        self.first_level = first_level
+        self.future_list = future_list
+        self.max_transitions = max_transitions
+
+    def result(self):
+        level_matrix = EdgeArray([[0.0, self.first_level]])
+        last_level = self.first_level
+        for future in self.future_list:
+            chunk_level_matrix = future.result()
+            # level of a chunk start is unknown: first transition of a chunk is no transition if the level did not change
+            first_edge_idx = 1 if (chunk_level_matrix and chunk_level_matrix[0][1] == last_level) else 0
+            if first_edge_idx == 1:
+                chunk_level_matrix = chunk_level_matrix[1:]
+            level_matrix.extend(chunk_level_matrix)
+            last_level = level_matrix[-1][1]
+
+        # same break as in read_csv_and_get_edges()
+        max_edges = math.floor(self.max_transitions) + 1
+        if len(level_matrix) - 1 > self.max_transitions:
+            level_matrix.truncate(max_edges + 1)
+            print(f"in read_csv_and_get_edges(): Break because of level_transition_cnt reached {max_edges} > max_sim_time_us * max_freq_mhz")
+        print(f"{os.path.basename(self.csv_filepath)} num of read rows: {len(level_matrix)}\n")
+        return level_matrix
+
+
+def get_edges_of_csv_chunk(csv_filepath, byte_start, byte_stop, time_offset, num_columns, input_dict, param_dict, last_level=-1):
+    ''' Find digital level transitions in one byte range of a csv file (see get_csv_chunks())
+
+        last_level: level at the chunk start (see get_csv_index()), -1 if unknown.
+        If the level at the chunk start is unknown, the first returned transition is the first sample above/below a threshold,
+        CsvChunkFutures.result() drops it if the level of the previous chunk is the same.
+    '''
+    start = time.perf_counter()
+    get_edges_func = get_block_edges_func(param_dict.get('EDGE_ENGINE', 'python'), param_dict.get('EDGE_ENVELOPE_BLOCK'))
+    level_matrix = EdgeArray()
+    row_cnt = 0
+
+    with open(csv_filepath, 'rb') as csvfile:
+        with mmap.mmap(csvfile.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+            for block in iter_csv_blocks(mapped_file, byte_start, byte_stop, param_dict['CSV_Delimiter'], num_columns, param_dict.get('CSV_BLOCK_BYTES', 16 * 1024 * 1024)):
+                detected_edges, last_level = get_edges_func(time_offset,
+                                                            block[0],
+                                                            block[input_dict.get('column', 1)],
+                                                            last_level,
+                                                            input_dict['POSITIVE_GOING_VOLTAGE'],
+                                                            input_dict['NEGATIVE_GOING_VOLTAGE'],
+                                                            input_dict['ignore_time_ns'])
+                level_matrix.extend(detected_edges)
+                row_cnt += len(block[0])
+    metrics = get_metrics()
+    if metrics is not None:
+        metrics.add_file(csv_filepath, time.perf_counter() - start, row_cnt, len(level_matrix))
+    return level_matrix
+
+
+def submit_csv_chunks(executor, csv_filepath, file_num, input_dict_list, param_dict):
+    ''' Split a csv file into param_dict['CSV_CHUNKS'] byte ranges and find their transitions in parallel, returns CsvChunkFutures
+
+        With param_dict['CSV_INDEX'] the chunks start at rows of the csv index with known level.
+    '''
+    print(f"Read data from {csv_filepath} in {param_dict['CSV_CHUNKS']} chunks")
+    header_str, row1, chunk_list = get_csv_chunks(csv_filepath, param_dict['CSV_Delimiter'], param_dict['CSV_CHUNKS'])
+    get_header_info(header_str)  # ZUTUN
+
+    time_offset = row1[0]
+    first_level = 0  if row1[input_dict_list[file_num].get('column', 1)] < 0.5 * input_dict_list[file_num]['logic_family'] else 1
+    chunk_level_list = [-1 for chunk in chunk_list]
+    if param_dict.get('CSV_INDEX', False) is True and chunk_list:
+        csv_index = get_csv_index(csv_filepath, [input_dict_list[file_num]], param_dict)
+        levels = csv_index['levels'][get_csv_index_level_key(input_dict_list[file_num])]
+        # move the chunk borders to the next row of the index
+        entry_num_list = sorted({bisect.bisect_left(csv_index['offsets'], byte_start) for byte_start, byte_stop in chunk_list} - {len(csv_index['offsets'])})
+        offset_list = [csv_index['offsets'][entry_num] for entry_num in entry_num_list] + [chunk_list[-1][1]]
+        chunk_list = list(zip(offset_list[:-1], offset_list[1:]))
+        chunk_level_list = [levels[entry_num] for entry_num in entry_num_list]
+    future_list = [submit_with_metrics(executor, get_edges_of_csv_chunk, csv_filepath, byte_start, byte_stop, time_offset, len(row1), input_dict_list[file_num], param_dict, chunk_level)
+                   for (byte_start, byte_stop), chunk_level in zip(chunk_list, chunk_level_list)]
+    max_transitions = param_dict['MAX_SIM_TIME_US'] * param_dict['MAX_FREQ_MHZ']
+    return CsvChunkFutures(csv_filepath, first_level, future_list, max_transitions)
 
 
 @time_wrapper
 def get_and_prepare_csv_data(input_dict_list, param_dict):
-    ''' Read all csv file(s) and create Matrix/Table from content'''
+    ''' Read all csv file(s) and create Matrix/Table from content
 
-    from concurrent.futures import ThreadPoolExecutor, as_completed
+        param_dict['POOL_MODE']: "thread" or "process" (CPU bound work -> process is faster for many files)
+        param_dict['NUM_WORKERS']: num of parallel workers
+        param_dict['CSV_CHUNKS']: > 1 to split every csv file into this num of chunks processed in parallel (binary/compressed files and time windows are not split)
+        param_dict['EDGE_CACHE_DIR']: directory of the edge cache (None: no cache)
+    '''
+
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
     all_ch_level_matrix = []
-    future_list = []
     csv_filepaths = [dict_elem['filepath'] for dict_elem in input_dict_list]
 
+    executor_class = ProcessPoolExecutor if param_dict.get('POOL_MODE', 'thread') == 'process' else ThreadPoolExecutor
+    csv_chunks = param_dict.get('CSV_CHUNKS', 1)
+    if csv_chunks > 1 and param_dict["maxDataRows"] is not None:
+        print("in get_and_prepare_csv_data(): CSV_CHUNKS is not supported with maxDataRows -> files are read serially")
+        csv_chunks = 1
+
+    cache_path_list = [None for csv_filepath in csv_filepaths]
+    max_transitions = param_dict['MAX_SIM_TIME_US'] * param_dict['MAX_FREQ_MHZ']
+    if param_dict.get('EDGE_CACHE_DIR') is not None:
+        if param_dict.get('EDGE_CACHE_CLEAR', False) is True:
+            clear_edge_cache(param_dict['EDGE_CACHE_DIR'])
+        cache_path_list = [get_edge_cache_path(csv_filepath, input_dict_list[file_num], param_dict) for file_num, csv_filepath in enumerate(csv_filepaths)]
+
     # read and process all csv files (parallel)
-    with ThreadPoolExecutor(max_workers=2) as executor:
+    with executor_class(max_workers=param_dict.get('NUM_WORKERS', 2)) as executor:
+        future_dict = {}  # file_num -> future of its level matrix
+        column_file_num_dict = {}  # (csv_filepath, time window) -> file_nums of its columns, read in one pass
         for file_num, csv_filepath in enumerate(csv_filepaths):
-            level_matrix = executor.submit(read_csv_and_get_edges, csv_filepath, file_num, input_dict_list, param_dict)
-            future_list.append(level_matrix)
-
-    for f in future_list:
-        all_ch_level_matrix.append(f.result())
+            cached_level_matrix = None if cache_path_list[file_num] is None else load_edge_cache(cache_path_list[file_num], max_transitions)
+            if cached_level_matrix is not None:
+                print(f"{os.path.basename(csv_filepath)} read from edge cache, num of read rows: {len(cached_level_matrix)}\n")
+                future_dict[file_num] = CachedLevelMatrix(cached_level_matrix)
+                cache_path_list[file_num] = None  # nothing to save
+            elif (csv_chunks > 1 and not is_binary_input(csv_filepath) and get_compression(csv_filepath) is None
+                  and get_time_window_ns(input_dict_list[file_num], param_dict) == (None, None)):
+                future_dict[file_num] = submit_csv_chunks(executor, csv_filepath, file_num, input_dict_list, param_dict)
+            else:
+                column_file_num_dict.setdefault((csv_filepath, get_time_window_ns(input_dict_list[file_num], param_dict)), []).append(file_num)
+        for (csv_filepath, time_window_ns), file_num_list in column_file_num_dict.items():
+            column_future = submit_with_metrics(executor, read_csv_and_get_edges_of_columns, csv_filepath, file_num_list, input_dict_list, param_dict)
+            for channel_num, file_num in enumerate(file_num_list):
+                future_dict[file_num] = CsvColumnFuture(column_future, channel_num)
+
+    for file_num in range(len(csv_filepaths)):
+        all_ch_level_matrix.append(future_dict[file_num].result())
+
+    for cache_path, level_matrix in zip(cache_path_list, all_ch_level_matrix):
+        if cache_path is not None:
+            save_edge_cache(cache_path, level_matrix, max_transitions, param_dict.get('EDGE_CACHE_MAX_MB', 1024))
 
     return all_ch_level_matrix
 
 
 def read_csv_and_get_edges(csv_filepath, file_num, input_dict_list, param_dict):
-
-    # compare transitions instead of sim_time as sim_time can be altered by use of 'MAX_WAIT_TIME_NS'
+    ''' Read a csv file and return its level matrix: [[0.0, initial_level], [timestamp, level], ...] '''
+    return EdgeArray(iter_csv_edges(csv_filepath, file_num, input_dict_list, param_dict))
+
+
+def read_csv_and_get_edges_of_columns(csv_filepath, file_num_list, input_dict_list, param_dict):
+    ''' Read a (multi channel) csv file once and return one level matrix per input_dict_list[file_num] of file_num_list '''
+    level_matrix_list = [EdgeArray() for file_num in file_num_list]
+    for channel_num, level_matrix_rows in iter_csv_edges_of_columns(csv_filepath, file_num_list, input_dict_list, param_dict):
+        level_matrix_list[channel_num].extend(level_matrix_rows)
+    return level_matrix_list
+
+
+def iter_csv_edges(csv_filepath, file_num, input_dict_list, param_dict):
+    ''' Generator version of read_csv_and_get_edges(): yields the rows of the level matrix while reading the csv file '''
+    for channel_num, level_matrix_rows in iter_csv_edges_of_columns(csv_filepath, [file_num], input_dict_list, param_dict):
+        yield from level_matrix_rows
+
+
+def read_first_csv_row(csv_filepath, delimiter_arg=','):
+    ''' First data row of a (not compressed) csv file as list of float '''
+    with open(csv_filepath, 'rb') as csvfile:
+        csvfile.readline()  # header
+        return list(map(float, csvfile.readline().split(delimiter_arg.encode())))
+
+
+def iter_csv_edges_of_columns(csv_filepath, file_num_list, input_dict_list, param_dict):
+    ''' Read a csv file once and find the transitions of the voltage column input_dict_list[file_num]['column'] (default 1) of every file_num
+
+        The inputs of file_num_list have to share the time window (see get_time_window_ns()).
+
+        Yields (index of file_num in file_num_list, list of level matrix rows) while reading the csv file.
+        Every channel stops after max_sim_time_us * max_freq_mhz transitions, reading stops when all channels stopped.
+    '''
+
+    start = time.perf_counter()
+    row_cnt = 0
+    level_transition_cnt_list = [0 for file_num in file_num_list]
+    read_csv_row_generator = None
+    try:
+        # compare transitions instead of sim_time as sim_time can be altered by use of 'MAX_WAIT_TIME_NS'
+        max_transitions = param_dict['MAX_SIM_TIME_US'] * param_dict['MAX_FREQ_MHZ']
+
+        # all inputs of file_num_list share the time window
+        start_time_ns, stop_time_ns = get_time_window_ns(input_dict_list[file_num_list[0]], param_dict)
+        csv_reader = 'binary' if is_binary_input(csv_filepath) else param_dict.get('CSV_READER', 'csv')
+        compression = None if csv_reader == 'binary' else get_compression(csv_filepath)
+        if compression is not None and csv_reader == 'block' and (start_time_ns is not None or stop_time_ns is not None):
+            csv_reader = 'csv'  # compressed files can not seek to the time window
+        decompress_workers = param_dict.get('DECOMPRESS_WORKERS', 2)
+        # rows before ignore_time_ns never change the level -> seek to it like to a time window, the initial level is the one of the first row
+        ignore_time_ns = min(input_dict_list[file_num]['ignore_time_ns'] for file_num in file_num_list)
+        seek_ignore_time = (ignore_time_ns > 0 and start_time_ns is None and stop_time_ns is None and param_dict["maxDataRows"] is None
+                            and csv_reader != 'binary' and compression is None)
+        read_start_time_ns = ignore_time_ns if seek_ignore_time else start_time_ns
+        if csv_reader == 'binary':
+            read_csv_row_generator = readBinary(csv_filepath, param_dict["maxDataRows"], param_dict.get('BINARY_BLOCK_ROWS', 1024 * 1024), start_time_ns, stop_time_ns)
+        elif csv_reader == 'block':
+            read_csv_row_generator = readCsvBlocks(csv_filepath, param_dict['CSV_Delimiter'], param_dict["maxDataRows"], param_dict.get('CSV_BLOCK_BYTES', 16 * 1024 * 1024), read_start_time_ns, stop_time_ns, decompress_workers)
+        else:
+            read_csv_row_generator = readCsv(csv_filepath, param_dict['CSV_Delimiter'], param_dict["maxDataRows"], read_start_time_ns, stop_time_ns, decompress_workers)
+
+        header_str = next(read_csv_row_generator)
+        time_offset = next(read_csv_row_generator)
+
+        get_header_info(header_str)  # ZUTUN
+
+        # read ro1 outside of for loop as this inits some variables
+        first_data_rows = []  # rows after row1 which were read before the loops
+        if seek_ignore_time:
+            row1 = read_first_csv_row(csv_filepath, param_dict['CSV_Delimiter'])
+            try:
+                first_data_rows.append(next(read_csv_row_generator))  # first row at/after ignore_time_ns
+            except ValueError as error:
+                if not str(error).startswith("no data in time window"):
+                    raise
+        else:
+            row1 = next(read_csv_row_generator)
+        row_cnt = 1
+        input_dict_per_ch_list = [input_dict_list[file_num] for file_num in file_num_list]
+        column_per_ch_list = [input_dict.get('column', 1) for input_dict in input_dict_per_ch_list]
+        last_level_per_ch_list = [0  if row1[column] < 0.5 * input_dict['logic_family'] else 1 for column, input_dict in zip(column_per_ch_list, input_dict_per_ch_list)]
+        if is_window_level_from_index(csv_filepath, start_time_ns, param_dict):
+            # hysteresis level at the window start instead of the level of its first row
+            csv_index = get_csv_index(csv_filepath, input_dict_per_ch_list, param_dict)
+            for channel_num, input_dict in enumerate(input_dict_per_ch_list):
+                window_level = get_csv_level_at_time(csv_filepath, csv_index, input_dict, time_offset, start_time_ns, param_dict['CSV_Delimiter'])
+                if window_level is not None:
+                    last_level_per_ch_list[channel_num] = window_level
+        for channel_num, last_level in enumerate(last_level_per_ch_list):
+            yield channel_num, [[0.0, last_level]]
+        active_ch_list = list(range(len(file_num_list)))
+        trace_every = tracer.sample_every()  # 0: no event traces
+
+        edge_engine = param_dict.get('EDGE_ENGINE', 'python')
+        if edge_engine == 'numpy' and np is None:
+            print("in iter_csv_edges(): numpy is not installed -> fall back to EDGE_ENGINE 'python'")
+            edge_engine = 'python'
+
+        if edge_engine == 'numpy' or csv_reader in ('block', 'binary') or param_dict.get('EDGE_ENVELOPE_BLOCK') is not None:
+            get_edges_func = get_block_edges_func(edge_engine, param_dict.get('EDGE_ENVELOPE_BLOCK'))
+            if csv_reader in ('block', 'binary'):
+                block_generator = itertools.chain([list(zip(*first_data_rows))] if first_data_rows else [], read_csv_row_generator)
+            else:
+                block_size = param_dict.get('EDGE_BLOCK_SIZE', 65536)
+                data_rows = itertools.chain(first_data_rows, read_csv_row_generator)
+                block_generator = (list(zip(*block)) for block in iter(lambda: list(itertools.islice(data_rows, block_size)), []))
+
+            # transitions until break: level_transition_cnt > max_transitions
+            max_edges = math.floor(max_transitions) + 1
+            for block in block_generator:
+                row_cnt += len(block[0])
+                for channel_num in list(active_ch_list):
+                    input_dict = input_dict_per_ch_list[channel_num]
+                    detected_edges, last_level_per_ch_list[channel_num] = get_edges_func(time_offset,
+                                                                                         block[0],
+                                                                                         block[column_per_ch_list[channel_num]],
+                                                                                         last_level_per_ch_list[channel_num],
+                                                                                         input_dict['POSITIVE_GOING_VOLTAGE'],
+                                                                                         input_dict['NEGATIVE_GOING_VOLTAGE'],
+                                                                                         input_dict['ignore_time_ns'],
+                                                                                         max_edges - level_transition_cnt_list[channel_num])
+                    yield channel_num, detected_edges
+                    if trace_every:
+                        for edge_num in range(-level_transition_cnt_list[channel_num] % trace_every, len(detected_edges), trace_every):
+                            tracer.trace('event', "%s block up to row %d: edge %d of channel %d: %s", csv_filepath, row_cnt, level_transition_cnt_list[channel_num] + edge_num, channel_num, detected_edges[edge_num])
+                    level_transition_cnt_list[channel_num] += len(detected_edges)
+                    if level_transition_cnt_list[channel_num] > max_transitions:  # break to shorten runtime;
+                        print(f"in read_csv_and_get_edges(): Break because of level_transition_cnt reached {level_transition_cnt_list[channel_num]} > max_sim_time_us * max_freq_mhz")
+                        active_ch_list.remove(channel_num)
+                if not active_ch_list:
+                    break
+        else:
+            # go through all the rows of the csv file
+            for row_cnt, row in enumerate(itertools.chain(first_data_rows, read_csv_row_generator), start=2):
+                for channel_num in active_ch_list:
+                    column = column_per_ch_list[channel_num]
+                    input_dict = input_dict_per_ch_list[channel_num]
+                    detected_edge = get_edges(time_offset,
+                                                         row if column == 1 else (row[0], row[column]),
+                                                         last_level_per_ch_list[channel_num],
+                                                         input_dict['logic_family'],
+                                                         input_dict['POSITIVE_GOING_VOLTAGE'],
+                                                         input_dict['NEGATIVE_GOING_VOLTAGE'],
+                                                         input_dict['ignore_time_ns'])
+                    if detected_edge is not None:
+                        last_level_per_ch_list[channel_num] = detected_edge[1]
+                        yield channel_num, [detected_edge]
+                        if trace_every and level_transition_cnt_list[channel_num] % trace_every == 0:
+                            tracer.trace('event', "%s row %d: edge %d of channel %d: %s", csv_filepath, row_cnt, level_transition_cnt_list[channel_num], channel_num, detected_edge)
+                        level_transition_cnt_list[channel_num] += 1
+                        if level_transition_cnt_list[channel_num] > max_transitions:  # break to shorten runtime;
+                            print(f"in read_csv_and_get_edges(): Break because of level_transition_cnt reached {level_transition_cnt_list[channel_num]} > max_sim_time_us * max_freq_mhz")
+                            active_ch_list = [active_ch for active_ch in active_ch_list if active_ch != channel_num]
+                if not active_ch_list:
+                    break
+        for level_transition_cnt in level_transition_cnt_list:
+            print(f"{os.path.basename(csv_filepath)} num of read rows: {level_transition_cnt + 1}\n")
+    finally:
+        if read_csv_row_generator is not None:
+            read_csv_row_generator.close()
+        metrics = get_metrics()
+        if metrics is not None:
+            metrics.add_file(csv_filepath, time.perf_counter() - start, row_cnt, sum(level_transition_cnt_list))
+
+
+class BufferedEdgeStream:
+    ''' Iterate over the level matrix rows of an edge generator (see iter_csv_edges()) which runs in a background thread
+
+        At most buffer_edges rows per queue entry and two queue entries are buffered,
+        so memory is bounded by the buffer size and not by the file size.
+    '''
+
+    def __init__(self, edge_generator, buffer_edges=65536):
+        import queue
+
+        self.edge_generator = edge_generator
+        self.metrics = get_metrics()  # metrics of the creating thread
+        self.trace_spec = tracer.spec
+        self.buffer_edges = buffer_edges
+        self.queue = queue.Queue(maxsize=2)
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._produce, daemon=True)
+        self.thread.start()
+
+    def _put(self, item):
+        import queue
+
+        while not self.stop_event.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _produce(self):
+        with collect_metrics(self.metrics), tracing(self.trace_spec):
+            self._produce_batches()
+
+    def _produce_batches(self):
+        try:
+            while True:
+                edge_batch = list(itertools.islice(self.edge_generator, self.buffer_edges))
+                if not edge_batch or not self._put(edge_batch):
+                    break
+        except Exception as exc:  # forwarded to the consuming thread
+            self._put(exc)
+            return
+        self._put(None)
+
+    def __iter__(self):
+        while True:
+            edge_batch = self.queue.get()
+            if edge_batch is None:
+                return
+            if isinstance(edge_batch, Exception):
+                raise edge_batch
+            yield from edge_batch
+
+    def close(self):
+        ''' Stop the background thread (e.g. if write_stimuli_file() stopped before the end of the data) '''
+        self.stop_event.set()
+        self.thread.join()
+
+
+def get_csv_edge_streams(input_dict_list, param_dict):
+    ''' Streaming alternative to get_and_prepare_csv_data(): one BufferedEdgeStream per csv file
+
+        Files found in the edge cache (param_dict['EDGE_CACHE_DIR']) are taken from there, the cache is not filled while streaming.
+    '''
+    max_transitions = param_dict['MAX_SIM_TIME_US'] * param_dict['MAX_FREQ_MHZ']
+    edge_stream_list = []
+    for file_num, dict_elem in enumerate(input_dict_list):
+        cached_level_matrix = None
+        if param_dict.get('EDGE_CACHE_DIR') is not None:
+            cached_level_matrix = load_edge_cache(get_edge_cache_path(dict_elem['filepath'], dict_elem, param_dict), max_transitions)
+        if cached_level_matrix is not None:
+            print(f"{os.path.basename(dict_elem['filepath'])} read from edge cache, num of read rows: {len(cached_level_matrix)}\n")
+            edge_stream_list.append(cached_level_matrix)
+        else:
+            edge_stream_list.append(BufferedEdgeStream(iter_csv_edges(dict_elem['filepath'], file_num, input_dict_list, param_dict), param_dict.get('STREAM_BUFFER_EDGES', 65536)))
+    return edge_stream_list
+
+
+APPEND_CHECKPOINT_VERSION = 1
+
+
+def get_append_checkpoint_key(input_dict_list, param_dict):
+    ''' Key of the inputs and all settings changing the stimuli file, a checkpoint with another key is not resumed '''
+    key_list = [sorted(input_dict.items()) for input_dict in input_dict_list]
+    key_list.append([param_dict.get(key) for key in ('RESOLUTION', 'VHD_DO_FILENAME', 'MAX_WAIT_TIME_NS', 'MAX_SIM_TIME_US', 'MAX_FREQ_MHZ', 'DO_SYNC',
+                                                     'CSV_Delimiter', 'COALESCE_EVENTS', 'BUSES')])
+    return hashlib.sha256(repr(key_list).encode()).hexdigest()
+
+
+def load_append_checkpoint(checkpoint_path, checkpoint_key, input_dict_list, output_path):
+    ''' Checkpoint of the last APPEND_CHECKPOINT run (see append_stimuli_file()), None if it can not be resumed '''
+    try:
+        with open(checkpoint_path) as checkpointfile:
+            checkpoint = json.load(checkpointfile)
+    except (OSError, ValueError):
+        return None
+    if checkpoint.get('version') != APPEND_CHECKPOINT_VERSION or checkpoint.get('key') != checkpoint_key:
+        print(f"{checkpoint_path} was written for other inputs or settings -> new stimuli file")
+        return None
+    if not os.path.isfile(output_path) or os.path.getsize(output_path) < checkpoint['writer']['output_size']:
+        print(f"{output_path} was changed since the last run -> new stimuli file")
+        return None
+    for input_dict, file_state in zip(input_dict_list, checkpoint['files']):
+        if file_state is None:
+            continue
+        with open(input_dict['filepath'], 'rb') as csvfile:
+            if csvfile.readline().decode(errors='replace') != file_state['header'] or os.fstat(csvfile.fileno()).st_size < file_state['byte_offset']:
+                print(f"{input_dict['filepath']} was replaced since the last run -> new stimuli file")
+                return None
+    return checkpoint
+
+
+def save_append_checkpoint(checkpoint_path, checkpoint):
+    tmp_path = f"{checkpoint_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as checkpointfile:
+        json.dump(checkpoint, checkpointfile)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def read_csv_and_get_new_edges(csv_filepath, input_dict, param_dict, file_state=None):
+    ''' Append mode version of read_csv_and_get_edges(): only read the rows of a growing csv file after file_state
+
+        file_state: state returned by the last call, None to read the file from the start.
+        Returns the level matrix of the new rows (starting with [0.0, initial_level] if file_state is None) and the new file_state:
+        byte offset after the last complete line, last_level, time_offset, transition count and timestamp of the last row.
+        An incomplete last line (the file is still written) is read by the next call.
+    '''
+    start = time.perf_counter()
+    if is_binary_input(csv_filepath) or get_compression(csv_filepath) is not None:
+        raise ValueError(f"{csv_filepath}: APPEND_CHECKPOINT only supports plain csv files")
     max_transitions = param_dict['MAX_SIM_TIME_US'] * param_dict['MAX_FREQ_MHZ']
+    get_edges_func = get_block_edges_func(param_dict.get('EDGE_ENGINE', 'python'), param_dict.get('EDGE_ENVELOPE_BLOCK'))
+    column = input_dict.get('column', 1)
+    ignore_time_s = input_dict['ignore_time_ns'] / 1e9
+    level_matrix = EdgeArray()
+    row_cnt = 0
+
+    with open(csv_filepath, 'rb') as csvfile:
+        header_line = csvfile.readline()
+        if file_state is None:
+            row_line = csvfile.readline()
+            if not row_line.endswith(b'\n'):
+                return level_matrix, None  # first row not complete yet
+            row = list(map(float, row_line.split(param_dict['CSV_Delimiter'].encode())))
+            time_offset = row[0]
+            last_level = 0 if row[column] < 0.5 * input_dict['logic_family'] else 1
+            level_matrix.append([0.0, last_level])
+            file_state = {'header': header_line.decode(errors='replace'), 'num_columns': len(row), 'time_offset': time_offset, 'byte_offset': csvfile.tell(),
+                          'last_level': last_level, 'transition_cnt': 0, 'last_time': row[0] + abs(time_offset) - ignore_time_s, 'complete': False}
+            row_cnt = 1
+        else:
+            file_state = dict(file_state)
+
+        file_size = os.fstat(csvfile.fileno()).st_size
+        if not file_state['complete'] and file_state['byte_offset'] < file_size:
+            with mmap.mmap(csvfile.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+                data_stop = max(mapped_file.rfind(b'\n', file_state['byte_offset']) + 1, file_state['byte_offset'])  # after the last complete line
+                for block in iter_csv_blocks(mapped_file, file_state['byte_offset'], data_stop, param_dict['CSV_Delimiter'], file_state['num_columns'], param_dict.get('CSV_BLOCK_BYTES', 16 * 1024 * 1024)):
+                    if not len(block[0]):
+                        continue
+                    row_cnt += len(block[0])
+                    detected_edges, last_level = get_edges_func(file_state['time_offset'],
+                                                                block[0],
+                                                                block[column],
+                                                                file_state['last_level'],
+                                                                input_dict['POSITIVE_GOING_VOLTAGE'],
+                                                                input_dict['NEGATIVE_GOING_VOLTAGE'],
+                                                                input_dict['ignore_time_ns'],
+                                                                math.floor(max_transitions) + 1 - file_state['transition_cnt'])
+                    level_matrix.extend(detected_edges)
+                    file_state['last_level'] = int(last_level)
+                    file_state['transition_cnt'] += len(detected_edges)
+                    file_state['last_time'] = float(block[0][-1]) + abs(file_state['time_offset']) - ignore_time_s
+                    if file_state['transition_cnt'] > max_transitions:  # same break as in read_csv_and_get_edges()
+                        print(f"in read_csv_and_get_new_edges(): Break because of level_transition_cnt reached {file_state['transition_cnt']} > max_sim_time_us * max_freq_mhz")
+                        file_state['complete'] = True
+                        break
+                file_state['byte_offset'] = data_stop
+
+    metrics = get_metrics()
+    if metrics is not None:
+        metrics.add_file(csv_filepath, time.perf_counter() - start, row_cnt, len(level_matrix))
+    print(f"{os.path.basename(csv_filepath)} num of new rows: {row_cnt}, new transitions: {len(level_matrix)}\n")
+    return level_matrix, file_state
+
+
+def append_stimuli_file(input_dict_list, param_dict):
+    ''' Incremental conversion of csv files which grow between the runs (param_dict['APPEND_CHECKPOINT'])
+
+        Every run reads only the rows appended since the last run (see read_csv_and_get_new_edges()) and appends their events
+        to VHD_DO_FILENAME, the reader and writer state is saved in the json file APPEND_CHECKPOINT.
+        Events after the last timestamp read from all files are kept in the checkpoint until the next run.
+        param_dict['APPEND_FINALIZE']: the csv files are completely written, all kept events are written and later runs do not change
+        VHD_DO_FILENAME any more.
+        Without a valid checkpoint (first run, other inputs/settings, replaced files) a new stimuli file is written.
+    '''
+    if param_dict.get('VHD_OUTPUT_MODE', 'statements') == 'table':
+        raise ValueError("APPEND_CHECKPOINT is not supported with VHD_OUTPUT_MODE 'table'")
+    if param_dict['maxDataRows'] is not None or any(get_time_window_ns(input_dict, param_dict) != (None, None) for input_dict in input_dict_list):
+        raise ValueError("APPEND_CHECKPOINT is not supported with maxDataRows or time windows")
+    if param_dict.get('SHARDS', 1) > 1 or param_dict.get('SHARD_DURATION_NS') is not None:
+        raise ValueError("APPEND_CHECKPOINT is not supported with SHARDS or SHARD_DURATION_NS")
+    if param_dict['DO_SYNC'] is True and param_dict.get('SYNC_MODE', 'events') != 'events':
+        raise ValueError("APPEND_CHECKPOINT is only supported with SYNC_MODE 'events' (the alignment needs the complete data)")
+    path = os.path.dirname(input_dict_list[0]['filepath'])
+    checkpoint_key = get_append_checkpoint_key(input_dict_list, param_dict)
+    checkpoint = load_append_checkpoint(param_dict['APPEND_CHECKPOINT'], checkpoint_key, input_dict_list, os.path.join(path, param_dict['VHD_DO_FILENAME']))
+    if checkpoint is None:
+        checkpoint = {'version': APPEND_CHECKPOINT_VERSION, 'key': checkpoint_key, 'files': [None for input_dict in input_dict_list],
+                      'writer': {'pending': [[] for input_dict in input_dict_list]}}
+    elif checkpoint['writer']['finished'] is True:
+        print(f"an earlier run reached MAX_SIM_TIME_US or was finalized -> {param_dict['VHD_DO_FILENAME']} is not changed")
+        return
+
+    all_ch_level_matrix = []
+    for file_num, input_dict in enumerate(input_dict_list):
+        new_level_matrix, checkpoint['files'][file_num] = read_csv_and_get_new_edges(input_dict['filepath'], input_dict, param_dict, checkpoint['files'][file_num])
+        level_matrix = EdgeArray(checkpoint['writer']['pending'][file_num])
+        level_matrix.extend(new_level_matrix)
+        all_ch_level_matrix.append(level_matrix)
+    # all transitions up to the horizon are known, complete files (max transitions reached or APPEND_FINALIZE) do not limit it
+    is_finalized = param_dict.get('APPEND_FINALIZE', False) is True
+    checkpoint['writer']['horizon'] = min((-math.inf if file_state is None else (math.inf if file_state['complete'] or is_finalized else file_state['last_time'])
+                                           for file_state in checkpoint['files']), default=math.inf)
 
-    read_csv_row_generator = readCsv(csv_filepath, param_dict['CSV_Delimiter'], param_dict["maxDataRows"])
+    vhdl_signal_names = [dict_elem['vhdl_signal_name'] for dict_elem in input_dict_list]
+    signals_list = [dict_elem['signal'] for dict_elem in input_dict_list]
+    run_num_list = [dict_elem['RUN_NUM'] for dict_elem in input_dict_list]
+    min_freq_list = [dict_elem['MIN_FREQ_MHZ'] for dict_elem in input_dict_list]
+    checkpoint['writer'] = write_stimuli_file(path, all_ch_level_matrix, vhdl_signal_names, run_num_list, signals_list, min_freq_list, param_dict, checkpoint['writer'])
+    if is_finalized:
+        checkpoint['writer']['finished'] = True  # no events are kept
+    save_append_checkpoint(param_dict['APPEND_CHECKPOINT'], checkpoint)
 
-    header_str = next(read_csv_row_generator)
-    time_offset = next(read_csv_row_generator)
 
-    get_header_info(header_str)  # ZUTUN
+def run_csv_to_do_main(input_dict_list, param_dict):
+    ''' Convert the csv files of input_dict_list to VHD_DO_FILENAME, returns the PipelineMetrics of the conversion
 
-    # read ro1 outside of for loop as this inits some variables
-    row1 = next(read_csv_row_generator)
-    last_level = 0  if row1[1] < 0.5 * input_dict_list[file_num]['logic_family'] else 1
-    level_matrix = [[0.0, last_level]]
-    level_transition_cnt = 0
-
-    # go through all the rows of the csv file
-    for row in read_csv_row_generator:
-        detected_edge = get_edges(time_offset,
-                                             row,
-                                             last_level,
-                                             input_dict_list[file_num]['logic_family'],
-                                             input_dict_list[file_num]['POSITIVE_GOING_VOLTAGE'],
-                                             input_dict_list[file_num]['NEGATIVE_GOING_VOLTAGE'],
-                                             input_dict_list[file_num]['ignore_time_ns'])
-        if detected_edge is not None:
-            last_level = detected_edge[1]
-            level_matrix.append(detected_edge)
-            debug_print(level_matrix)
-            level_transition_cnt += 1
-            if level_transition_cnt > max_transitions:  # break to shorten runtime;
-                print(f"in read_csv_and_get_edges(): Break because of level_transition_cnt reached {level_transition_cnt} > max_sim_time_us * max_freq_mhz")
-                break
-    print(f"{os.path.basename(csv_filepath)} num of read rows: {len(level_matrix)}\n")
-    return level_matrix
+        param_dict['METRICS_FILE']: optional file for the metrics, json for '.json' else line protocol
+        param_dict['TRACE']: optional trace spec for this conversion, e.g. "debug" or "event:1000" (see Tracer)
+    '''
+    metrics = PipelineMetrics()
+    with collect_metrics(metrics), tracing(param_dict.get('TRACE')):
+        _run_csv_to_do_main(input_dict_list, param_dict)
+    metrics.update_peak_memory()
+    print(metrics.summary())
+    if param_dict.get('METRICS_FILE') is not None:
+        metrics.write(param_dict['METRICS_FILE'])
+    return metrics
 
 
-def run_csv_to_do_main(input_dict_list, param_dict):
+@time_wrapper
+def _run_csv_to_do_main(input_dict_list, param_dict):
     # print params
     [print(key, value) for key, value in param_dict.items()]
+    tracer.trace('info', "trace spec: %s", tracer.spec)
+    if param_dict.get('APPEND_CHECKPOINT') is not None:
+        append_stimuli_file(input_dict_list, param_dict)
+        return
     # [dict_elem['filepath'] for dict_elem in input_dict_list], [dict_elem['logic_family'] for dict_elem in input_dict_list]
-    all_ch_level_matrix = get_and_prepare_csv_data(input_dict_list, param_dict)
+    if param_dict.get('STREAMING', False) is True:
+        all_ch_level_matrix = get_csv_edge_streams(input_dict_list, param_dict)
+    else:
+        all_ch_level_matrix = get_and_prepare_csv_data(input_dict_list, param_dict)
     # all_ch_level_matrix looks like:  [[[0.0, 1], [9.896e-07, 0]], [[2.672e-07, 1],..]] ; all_ch_level_matrix(data_set_file1(timestamp0, logic_level0), ...)
     # print(f" all_ch_level_matrix {all_ch_level_matrix}")
     vhdl_signal_names = [dict_elem['vhdl_signal_name'] for dict_elem in input_dict_list]
     signals_list = [dict_elem['signal'] for dict_elem in input_dict_list]
     run_num_list = [dict_elem['RUN_NUM'] for dict_elem in input_dict_list]
     min_freq_list = [dict_elem['MIN_FREQ_MHZ'] for dict_elem in input_dict_list]
-    write_stimuli_file(os.path.dirname(input_dict_list[0]['filepath']), all_ch_level_matrix, vhdl_signal_names, run_num_list, signals_list, min_freq_list, param_dict)
+    try:
+        stimuli_level_matrix = all_ch_level_matrix
+        if param_dict['DO_SYNC'] is True and param_dict.get('SYNC_MODE', 'events') != 'events' and len(set(run_num_list)) > 1:
+            stimuli_level_matrix = align_runs(all_ch_level_matrix, run_num_list, signals_list, min(min_freq_list), param_dict)
+            param_dict = dict(param_dict, DO_SYNC=False)  # the runs are aligned, no sync while writing
+        if param_dict.get('SHARDS', 1) > 1 or param_dict.get('SHARD_DURATION_NS') is not None:
+            write_stimuli_shards(os.path.dirname(input_dict_list[0]['filepath']), stimuli_level_matrix, vhdl_signal_names, run_num_list, signals_list, min_freq_list, param_dict)
+        else:
+            write_stimuli_file(os.path.dirname(input_dict_list[0]['filepath']), stimuli_level_matrix, vhdl_signal_names, run_num_list, signals_list, min_freq_list, param_dict)
+    finally:
+        for level_matrix in all_ch_level_matrix:
+            if isinstance(level_matrix, BufferedEdgeStream):
+                level_matrix.close()
+
+
+def load_job_file(job_filepath):
+    ''' Load a .json or .toml job file (see run_batch_jobs() and run_watch_folders()) '''
+    if os.path.splitext(job_filepath)[1].lower() == '.toml':
+        try:
+            import tomllib
+        except ImportError:  # python < 3.11: tomli is the same parser as package
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise ValueError("TOML job files need python >= 3.11 or the package tomli, use a JSON job file")
+        with open(job_filepath, 'rb') as jobfile:
+            return tomllib.load(jobfile)
+    with open(job_filepath) as jobfile:
+        return json.load(jobfile)
+
+
+def load_batch_jobs(job_filepath):
+    ''' Load a batch job file (.json or .toml, see run_batch_jobs()), relative input paths are relative to the job file '''
+    batch = load_job_file(job_filepath)
+    job_dir = os.path.dirname(os.path.abspath(job_filepath))
+    for job in batch['jobs']:
+        for input_dict in job['input_dict_list']:
+            if 'filepath' in input_dict:
+                input_dict['filepath'] = os.path.join(job_dir, input_dict['filepath'])
+    return batch
+
+
+def get_batch_job_size(job):
+    ''' Size of a batch job for the scheduling: bytes of its (existing) input files '''
+    return sum(os.path.getsize(filepath) for filepath in {input_dict['filepath'] for input_dict in job['input_dict_list']} if os.path.isfile(filepath))
+
+
+def run_batch_job(job):
+    ''' Run one job of run_batch_jobs(), returns its result dict (failures are returned, not raised) '''
+    import traceback
+
+    start = time.perf_counter()
+    job_result = {'name': job['name'], 'status': 'ok', 'error': None, 'metrics': None}
+    try:
+        job_result['metrics'] = run_csv_to_do_main(job['input_dict_list'], job['param_dict']).to_dict()
+    except Exception as exc:
+        job_result['status'] = 'failed'
+        job_result['error'] = f"{type(exc).__name__}: {exc}"
+        job_result['traceback'] = traceback.format_exc()
+    job_result['runtime_s'] = time.perf_counter() - start
+    return job_result
+
+
+def run_batch_jobs(batch, max_workers=None, pool_mode=None, summary_file=None):
+    ''' Run many run_csv_to_do_main() jobs on a shared worker pool, the largest jobs (input bytes) first
+
+        batch: job file path (see load_batch_jobs()) or dict like
+            {"max_workers": 4, "pool_mode": "process", "summary_file": "summary.json",
+             "defaults": {"param_dict": {...}, "input_dict": {...}},  # merged into every job
+             "jobs": [{"name": "capture_01", "param_dict": {...}, "input_dict_list": [{...}, ...]}, ...]}
+        max_workers, pool_mode ("thread" or "process"), summary_file: overrule the values of batch
+        With pool_mode "process" the jobs run with POOL_MODE "thread" (their shards and csv files are written/read by threads).
+        A failing job is reported in its result and does not abort the batch.
+        Returns the summary: {"runtime_s": ..., "num_failed": ..., "jobs": [result of run_batch_job() per job in batch order]}
+    '''
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+    start = time.perf_counter()
+    if not isinstance(batch, dict):
+        batch = load_batch_jobs(batch)
+    max_workers = max_workers or batch.get('max_workers', os.cpu_count())
+    pool_mode = pool_mode or batch.get('pool_mode', 'process')
+    summary_file = summary_file or batch.get('summary_file')
+
+    defaults = batch.get('defaults', {})
+    job_list = []
+    for job_num, job in enumerate(batch['jobs']):
+        job_list.append({'name': job.get('name', f"job_{job_num}"),
+                         'param_dict': dict(defaults.get('param_dict', {}), **job.get('param_dict', {})),
+                         'input_dict_list': [dict(defaults.get('input_dict', {}), **input_dict) for input_dict in job['input_dict_list']]})
+        if pool_mode == 'process':
+            job_list[-1]['param_dict']['POOL_MODE'] = 'thread'  # workers of a process pool can not start processes (daemonic on python < 3.9)
+    job_size_list = [get_batch_job_size(job) for job in job_list]
+
+    job_result_list = [None for job in job_list]
+    executor_class = ProcessPoolExecutor if pool_mode == 'process' else ThreadPoolExecutor
+    with executor_class(max_workers=max_workers) as executor:
+        future_dict = {}
+        for schedule_num, job_num in enumerate(sorted(range(len(job_list)), key=lambda job_num: job_size_list[job_num], reverse=True)):
+            future_dict[job_num] = (schedule_num, executor.submit(run_batch_job, job_list[job_num]))
+        for job_num, (schedule_num, future) in future_dict.items():
+            try:
+                job_result_list[job_num] = future.result()
+            except Exception as exc:  # e.g. a crashed worker process
+                job_result_list[job_num] = {'name': job_list[job_num]['name'], 'status': 'failed', 'error': f"{type(exc).__name__}: {exc}", 'metrics': None, 'runtime_s': None}
+            job_result_list[job_num].update(input_bytes=job_size_list[job_num], schedule_num=schedule_num)
+
+    summary = {'runtime_s': time.perf_counter() - start,
+               'num_failed': sum(1 for job_result in job_result_list if job_result['status'] != 'ok'),
+               'jobs': job_result_list}
+    print(f"\nbatch of {len(job_list)} jobs finished in {summary['runtime_s']:0.3f} s, {summary['num_failed']} failed")
+    for job_result in job_result_list:
+        runtime = '-' if job_result['runtime_s'] is None else f"{job_result['runtime_s']:0.3f} s"
+        print(f"\t{job_result['name']}: {job_result['status']}, {runtime}" + ('' if job_result['error'] is None else f", {job_result['error']}"))
+    if summary_file is not None:
+        with open(summary_file, 'w') as summaryfile:
+            json.dump(summary, summaryfile, indent=2)
+    return summary
+
+
+def find_capture_sets(watch_dir, capture_set):
+    ''' Complete capture sets of capture_set in watch_dir (see run_watch_folders())
+
+        The file name of the first input (e.g. "{name}_CH1_CLK_01.CSV") selects the captures, '{name}' is replaced by the
+        capture name in the file names of all inputs. Returns {capture name: [filepath per input]} of the captures with all files.
+    '''
+    filename_list = [os.path.basename(input_dict['filepath']) for input_dict in capture_set['input_dict_list']]
+    name_pattern = re.compile(re.escape(filename_list[0]).replace(re.escape('{name}'), '(?P<name>.+)') + '$')
+    capture_dict = {}
+    for dir_entry in os.scandir(watch_dir):
+        name_match = name_pattern.match(dir_entry.name)
+        if name_match is None or not dir_entry.is_file():
+            continue
+        name = name_match.group('name') if '{name}' in filename_list[0] else ''
+        filepath_list = [os.path.join(watch_dir, filename.replace('{name}', name)) for filename in filename_list]
+        if all(os.path.isfile(filepath) for filepath in filepath_list):
+            capture_dict[name] = filepath_list
+    return capture_dict
+
+
+async def watch_folders(watch):
+    ''' asyncio loop of run_watch_folders(): poll the watch dirs, debounce the capture sets and convert them on a bounded worker pool '''
+    import asyncio
+    import collections
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    max_workers = watch.get('max_workers', 2)
+    defaults = watch.get('defaults', {})
+    job_queue = asyncio.Queue()
+    signature_dict = {}  # (watch dir, capture set, capture name) -> [file sizes/mtimes, time they were seen first]
+    done_signature_dict = {}  # (watch dir, capture set, capture name) -> file sizes/mtimes of the last successful conversion
+    queued_signature_dict = {}  # (watch dir, capture set, capture name) -> file sizes/mtimes of the queued or running conversion
+    failed_signature_dict = {}  # (watch dir, capture set, capture name) -> file sizes/mtimes of the last failed conversion
+    status = {'queue_depth': 0, 'running': 0, 'num_done': 0, 'num_failed': 0, 'throughput_jobs_per_min': 0.0,
+              'latency_s': {'last': None, 'mean': None, 'max': None}, 'jobs': []}
+    finish_time_list = collections.deque()  # finish times of the last minute for the throughput
+    latency_list = []
+    last_activity = time.perf_counter()
+
+    def write_status():
+        now = time.perf_counter()
+        while finish_time_list and finish_time_list[0] < now - 60:
+            finish_time_list.popleft()
+        status.update(time=datetime.datetime.now().isoformat(timespec='seconds'), uptime_s=now - start, queue_depth=job_queue.qsize(),
+                      throughput_jobs_per_min=len(finish_time_list) * 60 / min(60, max(now - start, 1e-9)))
+        if latency_list:
+            status['latency_s'] = {'last': latency_list[-1], 'mean': sum(latency_list) / len(latency_list), 'max': max(latency_list)}
+        if watch.get('status_file') is not None:
+            tmp_path = f"{watch['status_file']}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as statusfile:
+                json.dump(status, statusfile, indent=2)
+            os.replace(tmp_path, watch['status_file'])
+
+    def stat_capture_sets():
+        ''' Blocking part of scan() (directory listings and file stats, e.g. of a slow network share), runs in the default executor
+
+            Returns [(key, capture set, param_dict, filepath_list, signature, output mtime or None)] of the complete capture sets.
+        '''
+        capture_list = []
+        for watch_dir in watch['watch_dirs']:
+            for capture_set_num, capture_set in enumerate(watch['capture_sets']):
+                set_name = capture_set.get('name', f"capture_set_{capture_set_num}")
+                try:
+                    capture_dict = find_capture_sets(watch_dir, capture_set)
+                    for name, filepath_list in capture_dict.items():
+                        signature = [(file_stat.st_size, file_stat.st_mtime_ns) for file_stat in map(os.stat, filepath_list)]
+                        param_dict = dict(defaults.get('param_dict', {}), **capture_set.get('param_dict', {}))
+                        param_dict['VHD_DO_FILENAME'] = param_dict['VHD_DO_FILENAME'].replace('{name}', name)
+                        if watch.get('pool_mode', 'thread') == 'process':
+                            param_dict['POOL_MODE'] = 'thread'  # see run_batch_jobs()
+                        output_path = os.path.join(watch_dir, param_dict['VHD_DO_FILENAME'])
+                        output_mtime_ns = os.stat(output_path).st_mtime_ns if os.path.isfile(output_path) else None
+                        capture_list.append(((watch_dir, set_name, name), capture_set, param_dict, filepath_list, signature, output_mtime_ns))
+                except OSError as exc:  # e.g. network share not available or file removed while scanning
+                    print(f"in watch_folders(): {watch_dir}: {exc}")
+        return capture_list
+
+    def scan(capture_list):
+        ''' Queue the capture sets of stat_capture_sets() whose files did not change for settle_s, returns True if a capture set is not settled yet '''
+        is_settling = False
+        now = time.perf_counter()
+        for key, capture_set, param_dict, filepath_list, signature, output_mtime_ns in capture_list:
+            if done_signature_dict.get(key) == signature or queued_signature_dict.get(key) == signature:
+                continue
+            if signature_dict.get(key, [None])[0] != signature:
+                signature_dict[key] = [signature, now]  # new or still written
+                is_settling = True
+                continue
+            if now - signature_dict[key][1] < watch.get('settle_s', 5.0):
+                is_settling = True
+                continue
+            if output_mtime_ns is not None and output_mtime_ns >= max(mtime_ns for size, mtime_ns in signature) and failed_signature_dict.get(key) != signature:
+                done_signature_dict[key] = signature  # converted before (e.g. by an earlier run of the service)
+                continue
+            watch_dir, set_name, name = key
+            job = {'name': f"{set_name}/{name}" if name else set_name, 'param_dict': param_dict,
+                   'input_dict_list': [dict(defaults.get('input_dict', {}), **dict(input_dict, filepath=filepath)) for input_dict, filepath in zip(capture_set['input_dict_list'], filepath_list)]}
+            print(f"in watch_folders(): queued {job['name']} ({watch_dir})")
+            queued_signature_dict[key] = signature
+            job_queue.put_nowait((job, key, signature, signature_dict[key][1]))
+        return is_settling
+
+    async def worker(executor):
+        nonlocal last_activity
+        while True:
+            job, key, signature, detect_time = await job_queue.get()
+            status['running'] += 1
+            try:
+                job_result = await loop.run_in_executor(executor, run_batch_job, job)
+            except Exception as exc:  # e.g. a crashed worker process
+                job_result = {'name': job['name'], 'status': 'failed', 'error': f"{type(exc).__name__}: {exc}", 'metrics': None, 'runtime_s': None}
+            status['running'] -= 1
+            last_activity = time.perf_counter()
+            finish_time_list.append(last_activity)
+            latency_list.append(last_activity - detect_time)
+            status['num_done' if job_result['status'] == 'ok' else 'num_failed'] += 1
+            del queued_signature_dict[key]
+            if job_result['status'] == 'ok':
+                done_signature_dict[key] = signature
+                failed_signature_dict.pop(key, None)
+            else:  # retried after settle_s if the files do not change
+                failed_signature_dict[key] = signature
+                signature_dict[key] = [signature, last_activity]
+            status['jobs'] = (status['jobs'] + [{'name': job_result['name'], 'status': job_result['status'], 'error': job_result['error'],
+                                                 'runtime_s': job_result['runtime_s'], 'latency_s': latency_list[-1]}])[-watch.get('status_jobs', 20):]
+            print(f"in watch_folders(): {job_result['name']}: {job_result['status']}, latency {latency_list[-1]:0.3f} s" + ('' if job_result['error'] is None else f", {job_result['error']}"))
+            write_status()
+            job_queue.task_done()
+
+    executor_class = ProcessPoolExecutor if watch.get('pool_mode', 'thread') == 'process' else ThreadPoolExecutor
+    with executor_class(max_workers=max_workers) as executor:  # workers (and their caches) are reused for all conversions
+        worker_task_list = [asyncio.create_task(worker(executor)) for worker_num in range(max_workers)]
+        try:
+            while True:
+                if scan(await loop.run_in_executor(None, stat_capture_sets)) or not job_queue.empty() or status['running']:
+                    last_activity = time.perf_counter()
+                write_status()
+                if watch.get('idle_exit_s') is not None and time.perf_counter() - last_activity >= watch['idle_exit_s']:
+                    break
+                await asyncio.sleep(watch.get('poll_s', 2.0))
+            await job_queue.join()
+        finally:
+            for worker_task in worker_task_list:
+                worker_task.cancel()
+            await asyncio.gather(*worker_task_list, return_exceptions=True)
+    write_status()
+    return status
+
+
+def run_watch_folders(watch):
+    ''' Service mode: convert the capture sets dropped into watch directories as soon as they are completely written
+
+        watch: job file path (.json or .toml, relative watch dirs are relative to it) or dict like
+            {"watch_dirs": ["captures"], "poll_s": 2.0, "settle_s": 5.0, "max_workers": 2, "pool_mode": "thread",
+             "status_file": "watch_status.json", "idle_exit_s": null,
+             "defaults": {"param_dict": {...}, "input_dict": {...}},  # like run_batch_jobs()
+             "capture_sets": [{"name": "spi", "param_dict": {"VHD_DO_FILENAME": "{name}.vhd"},
+                               "input_dict_list": [{"filepath": "{name}_CH1_CLK_01.CSV", ...}, {"filepath": "{name}_CH4_MOSI_01.CSV", ...}]}]}
+        A capture set is converted when all its files exist and did not change for settle_s seconds (see find_capture_sets()),
+        again if its files change and not if its VHD_DO_FILENAME is newer than its files. Failed conversions are retried every settle_s.
+        The watch dirs are scanned in a thread, so a slow or missing network share does not block the workers and status updates.
+        The status file holds queue depth, running jobs, throughput, latency (first seen -> converted) and the last results.
+        Runs until idle_exit_s seconds passed without work (None: forever), returns the last status.
+    '''
+    import asyncio
+
+    if not isinstance(watch, dict):
+        watch_dir = os.path.dirname(os.path.abspath(watch))
+        watch = load_job_file(watch)
+        watch['watch_dirs'] = [os.path.join(watch_dir, path) for path in watch['watch_dirs']]
+    return asyncio.run(watch_folders(watch))
 
 
 if __name__ == '__main__':
@@ -393,7 +2908,41 @@ if __name__ == '__main__':
         'MAX_FREQ_MHZ': 200,  # currently only used to calc break because of MAX_SIM_TIME_US to shorten runtime,
                                 # either the maximum possible frequency of the oscilloscope or the maximum expected signal frequency
         'DO_SYNC': True,
-        'CSV_Delimiter': ','
+        'SYNC_MODE': "events",  # legal values: "events", "bursts", "xcorr" -> DO_SYNC while writing or alignment of the runs before writing (see get_run_offset_table())
+        'SYNC_SIGNAL': None,  # 'signal' type of the inputs used to align the runs for SYNC_MODE "bursts"/"xcorr", None: 'signal' of the first input
+        'SYNC_XCORR_BIN_NS': 1,  # time resolution of the cross-correlation of SYNC_MODE "xcorr"
+        'CSV_Delimiter': ',',
+        'EDGE_ENGINE': "python",  # legal values: "python", "numpy" -> numpy detects the edges blockwise (needs numpy installed)
+        'EDGE_BLOCK_SIZE': 65536,  # rows per block for EDGE_ENGINE "numpy" with CSV_READER "csv"
+        'EDGE_ENVELOPE_BLOCK': None,  # samples per sub block of the min/max envelope pre-pass which skips sub blocks that can not cross a threshold (e.g. 256 for oversampled captures), None: off
+        'CSV_READER': "csv",  # legal values: "csv", "block" -> block reads the file blockwise into flat float buffers (much faster)
+        'CSV_BLOCK_BYTES': 16 * 1024 * 1024,  # bytes per block for CSV_READER "block"
+        'POOL_MODE': "thread",  # legal values: "thread", "process" -> process uses all cores
+        'NUM_WORKERS': 2,  # num of parallel workers for reading the csv files
+        'CSV_CHUNKS': 1,  # > 1: every csv file is split into this num of chunks which are processed in parallel
+        'STREAMING': False,  # True: edges are streamed from the csv files to the stimuli file -> memory does not grow with the file size
+        'STREAM_BUFFER_EDGES': 65536,  # num of edges buffered per csv file for STREAMING
+        'EDGE_CACHE_DIR': None,  # directory to cache the edges of the csv files for following runs, None: no cache
+        'EDGE_CACHE_MAX_MB': 1024,  # least recently used cache files are removed above this size
+        'EDGE_CACHE_HASH_CONTENT': False,  # True: identify the csv files by content hash instead of size and modification time
+        'EDGE_CACHE_CLEAR': False,  # True: clear the cache before reading
+        'WRITE_BATCH_LINES': 65536,  # lines collected before writing them to VHD_DO_FILENAME
+        'BINARY_BLOCK_ROWS': 1024 * 1024,  # rows per block for binary input files ('.npy', '.bin', '.raw' + sidecar '<file>.json', see get_binary_info())
+        'START_TIME_NS': None,  # only read the data from this time on (time axis before ignore_time_ns), None: start of the file, can be set per input by 'start_time_ns'
+        'STOP_TIME_NS': None,  # only read the data up to this time, None: end of the file, can be set per input by 'stop_time_ns'
+        'CSV_INDEX': False,  # True: use the sparse index '<csv file>.idx' (built if missing or stale) for time windows and CSV_CHUNKS
+        'CSV_INDEX_BYTES': 4 * 1024 * 1024,  # distance of the rows of the csv index in bytes
+        'DECOMPRESS_WORKERS': 2,  # threads decompressing multi member gzip files (.csv.gz, .csv.bz2 and .csv.xz are read without decompressing them to disk)
+        'VHD_OUTPUT_MODE': "statements",  # legal values: "statements", "table" -> table writes the transitions as constant arrays into '<VHD_DO_FILENAME>_pkg.vhd' (fast to compile)
+        'VHD_TABLE_CHUNK_SIZE': 65536,  # max num of transitions per constant array for VHD_OUTPUT_MODE "table"
+        'COALESCE_EVENTS': False,  # True: events of the same resolution tick are written with a single wait/run
+        'BUSES': {},  # bus name -> list of vhdl_signal_names (MSB first), written as one vector assignment/force per tick (implies COALESCE_EVENTS)
+        'SHARDS': 1,  # > 1: split the stimuli into this num of files '<VHD_DO_FILENAME>_shard<num>' with the same num of events, simulated in parallel
+        'SHARD_DURATION_NS': None,  # split the stimuli into files of this simulated duration (instead of SHARDS)
+        'APPEND_CHECKPOINT': None,  # json file of the reader/writer state: every run only reads the rows appended to the csv files since the last run and appends to VHD_DO_FILENAME
+        'APPEND_FINALIZE': False,  # True: the csv files of APPEND_CHECKPOINT are completely written -> also writes the events kept for the next run, later runs do not change VHD_DO_FILENAME
+        'TRACE': None,  # debug traces, e.g. "debug" or "event:1000" (every 1000th row/transition), None: environment variable CSV_TO_VHDL_TRACE (see Tracer)
+        'METRICS_FILE': None  # file for runtimes/counters of the conversion, json for '.json' else line protocol
     }
 
     default_input_dict = {'logic_family': 3.3, 'POSITIVE_GOING_VOLTAGE': 2.0, 'NEGATIVE_GOING_VOLTAGE': 0.8, 'MIN_FREQ_MHZ': 20}
@@ -408,6 +2957,7 @@ if __name__ == '__main__':
         #  'POSITIVE_GOING_VOLTAGE': in V, "NEGATIVE_GOING_VOLTAGE": in V, 'logic_family' in V
         #  'ignore_time_ns' typischerweise aus ModelSim-Wave ablesen
         #  'IS_CLK', 'RUN_NUM' and 'CLK_FREQ_MHZ' only used for sync
+        #  optional 'column': voltage column of the csv file (default 1), input dicts with the same 'filepath' are read in one pass
         input_dict1 = dict({'filepath': r"RTA4004_CH1_CLK_01.CSV", 'vhdl_signal_name': 'spi_clk_stimu01_sl_s', 'signal': 'CLK', 'RUN_NUM': 1, 'ignore_time_ns': 10608}, ** default_input_dict)  # concat dicts
         input_dict2 = dict({'filepath': r"RTA4004_CH4_MOSI_01.CSV", 'vhdl_signal_name': 'spi_mosi_stimu01_sl_s', 'signal': 'MOSI', 'RUN_NUM': 1, 'ignore_time_ns': 10608}, ** default_input_dict)
         input_dict3 = dict({'filepath': r"RTA4004_CH1_CLK_02.CSV", 'vhdl_signal_name': 'spi_clk_stimu02_sl_s', 'signal': 'CLK', 'RUN_NUM': 2, 'ignore_time_ns': 0}, ** default_input_dict)
@@ -415,6 +2965,11 @@ if __name__ == '__main__':
         input_dict_list = [input_dict1, input_dict2, input_dict3, input_dict4]
 
     starttime = datetime.datetime.now()
-    run_csv_to_do_main(input_dict_list, param_dict)
+    if len(sys.argv) > 2 and sys.argv[1] == '--watch':  # python csv_to_vhdl.py --watch watch.json -> service mode
+        run_watch_folders(sys.argv[2])
+    elif len(sys.argv) > 1:  # python csv_to_vhdl.py jobs.json -> batch of jobs instead of the dicts above
+        run_batch_jobs(sys.argv[1])
+    else:
+        run_csv_to_do_main(input_dict_list, param_dict)
     runtime = datetime.datetime.now() - starttime
     print(f"runtime: {runtime}")
@@ -89,6 +89,269 @@ class Test_CSV_TO_VHDL(unittest.TestCase):
         self.assertEqual(time_offset, -2e-07)
         self.assertEqual(matrix, [[-2e-07, 3.36426], [-1.992e-07, 3.33496], [-1.984e-07, 3.40332], [-1.976e-07, 3.40332]])
 
+    def test_readCsvBlocks(self):
+        print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
+        numpy_module = csv_to_vhdl.np
+        try:
+            for use_numpy in [True, False]:
+                if use_numpy is False:
+                    csv_to_vhdl.np = None  # test pure python parser
+                for max_row, block_bytes in [(None, 16 * 1024 * 1024), (None, 100), (3, 100), (2000, 1000)]:
+                    read_csv_row_generator = csv_to_vhdl.readCsv("test_csv_to_vhdl_input_RTB2004_CHAN1.CSV", delimiter_arg=',', max_row=max_row)
+                    read_csv_block_generator = csv_to_vhdl.readCsvBlocks("test_csv_to_vhdl_input_RTB2004_CHAN1.CSV", delimiter_arg=',', max_row=max_row, block_bytes=block_bytes)
+
+                    self.assertEqual(next(read_csv_block_generator), next(read_csv_row_generator))  # header
+                    self.assertEqual(next(read_csv_block_generator), next(read_csv_row_generator))  # time_offset
+                    self.assertEqual(next(read_csv_block_generator), next(read_csv_row_generator))  # first row
+
+                    matrix = []
+                    for block in read_csv_block_generator:
+                        matrix.extend([list(row) for row in zip(*block)])
+                    self.assertEqual(matrix, list(read_csv_row_generator))
+
+                # ragged rows: further columns are ignored like by the csv reader, rows with missing columns raise
+                self.assertEqual([list(column) for column in csv_to_vhdl.parse_csv_block(b"1,2\n3,4,5,6\n7,8\n")], [[1.0, 3.0, 7.0], [2.0, 4.0, 8.0]])
+                self.assertEqual([list(column) for column in csv_to_vhdl.parse_csv_block(b"1,2\r\n\r\n3,4\r\n")], [[1.0, 3.0], [2.0, 4.0]])
+                with self.assertRaisesRegex(ValueError, "byte offset 100"):
+                    csv_to_vhdl.parse_csv_block(b"1,2\n3,4,5\n7\n9,10\n", block_offset=100)
+        finally:
+            csv_to_vhdl.np = numpy_module
+
+        # whole files: block reader has to give the same result as the csv reader
+        for param_update in [{}, {'EDGE_ENGINE': 'numpy'}, {'MAX_SIM_TIME_US': 0.02}, {'maxDataRows': 1000, 'CSV_BLOCK_BYTES': 500}]:
+            if param_update.get('EDGE_ENGINE') == 'numpy' and csv_to_vhdl.np is None:
+                continue
+            param_dict_csv = dict(PARAM_DICT, **param_update)
+            param_dict_block = dict(param_dict_csv, CSV_READER='block')
+            for file_num in range(len(INPUT_DICT_LIST)):
+                self.assertEqual(csv_to_vhdl.read_csv_and_get_edges(INPUT_DICT_LIST[file_num]['filepath'], file_num, INPUT_DICT_LIST, param_dict_block),
+                                 csv_to_vhdl.read_csv_and_get_edges(INPUT_DICT_LIST[file_num]['filepath'], file_num, INPUT_DICT_LIST, param_dict_csv))
+
+    def test_readBinary(self):
+        print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
+        import json
+        import struct
+        import tempfile
+        from array import array
+
+        # same samples as the csv file: .npy with [time, voltage] rows, raw float64 rows and raw int16 voltages with sample rate
+        csv_reader = csv_to_vhdl.readCsv(INPUT_DICT1['filepath'])
+        next(csv_reader)
+        next(csv_reader)
+        rows = list(csv_reader)
+        sample_rate_hz = 1 / (rows[1][0] - rows[0][0])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            npy_filepath = os.path.join(tmp_dir, 'chan1.npy')
+            npy_header = f"{{'descr': '<f8', 'fortran_order': False, 'shape': ({len(rows)}, 2), }}".encode().ljust(118) + b'\n'
+            with open(npy_filepath, 'wb') as binfile:
+                binfile.write(b'\x93NUMPY\x01\x00' + struct.pack('<H', len(npy_header)) + npy_header)
+                array('d', [value for row in rows for value in row]).tofile(binfile)
+            raw_filepath = os.path.join(tmp_dir, 'chan1.bin')
+            with open(raw_filepath, 'wb') as binfile:
+                array('d', [value for row in rows for value in row]).tofile(binfile)
+            with open(f"{raw_filepath}.json", 'w') as sidecarfile:
+                json.dump({'dtype': 'float64', 'columns': 2}, sidecarfile)
+            int16_filepath = os.path.join(tmp_dir, 'chan1.raw')
+            with open(int16_filepath, 'wb') as binfile:
+                array('h', [round(row[1] * 1000) for row in rows]).tofile(binfile)
+            with open(f"{int16_filepath}.json", 'w') as sidecarfile:
+                json.dump({'dtype': 'int16', 'sample_rate_hz': sample_rate_hz, 'time_offset_s': rows[0][0], 'scale': 0.001}, sidecarfile)
+
+            numpy_module = csv_to_vhdl.np
+            try:
+                for use_numpy in [True, False]:
+                    if use_numpy is False:
+                        csv_to_vhdl.np = None  # test pure python reader
+                    for max_row, block_rows in [(None, 1024 * 1024), (None, 7), (100, 7)]:
+                        for binary_filepath in [npy_filepath, raw_filepath]:
+                            binary_reader = csv_to_vhdl.readBinary(binary_filepath, max_row, block_rows)
+                            self.assertEqual(next(binary_reader)['num_rows'], len(rows))
+                            self.assertEqual(next(binary_reader), rows[0][0])  # time_offset
+                            self.assertEqual(next(binary_reader), rows[0])
+                            matrix = []
+                            for block in binary_reader:
+                                matrix.extend([list(map(float, row)) for row in zip(*block)])
+                            self.assertEqual(matrix, rows[1:] if max_row is None else rows[1:max_row + 1])
+
+                        binary_reader = csv_to_vhdl.readBinary(int16_filepath, max_row, block_rows)
+                        next(binary_reader)
+                        next(binary_reader)
+                        matrix = [next(binary_reader)]
+                        for block in binary_reader:
+                            matrix.extend([list(map(float, row)) for row in zip(*block)])
+                        self.assertEqual(len(matrix), len(rows) if max_row is None else max_row + 1)
+                        for row, binary_row in zip(rows, matrix):
+                            self.assertAlmostEqual(row[0], binary_row[0], places=12)
+                            self.assertAlmostEqual(row[1], binary_row[1], places=3)
+
+                    # the level matrix of a binary file is the same as the one of the csv file
+                    csv_level_matrix = csv_to_vhdl.read_csv_and_get_edges(INPUT_DICT1['filepath'], 0, INPUT_DICT_LIST, PARAM_DICT)
+                    for binary_filepath in [npy_filepath, raw_filepath]:
+                        input_dict_list = [dict(INPUT_DICT1, filepath=binary_filepath)]
+                        self.assertEqual(csv_to_vhdl.read_csv_and_get_edges(binary_filepath, 0, input_dict_list, PARAM_DICT), csv_level_matrix)
+                    int16_level_matrix = csv_to_vhdl.read_csv_and_get_edges(int16_filepath, 0, [dict(INPUT_DICT1, filepath=int16_filepath)], PARAM_DICT)
+                    self.assertEqual(int16_level_matrix.levels(), csv_level_matrix.levels())
+            finally:
+                csv_to_vhdl.np = numpy_module
+
+    def test_read_time_window(self):
+        print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
+        import tempfile
+        from array import array
+        csv_reader = csv_to_vhdl.readCsv(INPUT_DICT1['filepath'])
+        next(csv_reader)
+        time_offset = next(csv_reader)
+        rows = list(csv_reader)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            npy_filepath = os.path.join(tmp_dir, 'chan1.npy')
+            npy_header = f"{{'descr': '<f8', 'fortran_order': False, 'shape': ({len(rows)}, 2), }}".encode().ljust(118) + b'\n'
+            with open(npy_filepath, 'wb') as binfile:
+                binfile.write(b'\x93NUMPY\x01\x00' + len(npy_header).to_bytes(2, 'little') + npy_header)
+                array('d', [value for row in rows for value in row]).tofile(binfile)
+
+            numpy_module = csv_to_vhdl.np
+            try:
+                for use_numpy in [True, False]:
+                    if use_numpy is False:
+                        csv_to_vhdl.np = None  # test pure python readers
+                    for start_time_ns, stop_time_ns, max_row in [(500, 1500, None), (None, 1000, None), (1000, None, None), (rows[10][0] * 1e9 + 200, None, 5), (0, 1e9, None)]:
+                        window_rows = [row for row in rows if (start_time_ns is None or row[0] + abs(time_offset) >= start_time_ns / 1e9)
+                                       and (stop_time_ns is None or row[0] + abs(time_offset) <= stop_time_ns / 1e9)]
+                        if max_row is not None:
+                            window_rows = window_rows[:max_row + 1]
+                        for read_generator in [csv_to_vhdl.readCsv(INPUT_DICT1['filepath'], ',', max_row, start_time_ns, stop_time_ns),
+                                               csv_to_vhdl.readCsvBlocks(INPUT_DICT1['filepath'], ',', max_row, 1000, start_time_ns, stop_time_ns),
+                                               csv_to_vhdl.readBinary(npy_filepath, max_row, 100, start_time_ns, stop_time_ns)]:
+                            next(read_generator)
+                            self.assertEqual(next(read_generator), time_offset)
+                            matrix = [next(read_generator)]
+                            for block in read_generator:
+                                matrix.extend([block] if isinstance(block[0], float) else [list(map(float, row)) for row in zip(*block)])
+                            self.assertEqual(matrix, window_rows)
+
+                    # window without data
+                    with self.assertRaises(ValueError):
+                        list(csv_to_vhdl.readCsvBlocks(INPUT_DICT1['filepath'], start_time_ns=1e9))
+            finally:
+                csv_to_vhdl.np = numpy_module
+
+            # level matrix of the window: same for all readers and inputs, only transitions within the window
+            param_dict_window = dict(PARAM_DICT, START_TIME_NS=500, STOP_TIME_NS=1500)
+            input_dict_list = [dict(INPUT_DICT1, start_time_ns=700), INPUT_DICT2, dict(INPUT_DICT1, filepath=npy_filepath)]
+            window_level_matrices = csv_to_vhdl.get_and_prepare_csv_data(input_dict_list, param_dict_window)
+            for param_update in [{'CSV_READER': 'block'}, {'CSV_CHUNKS': 2}]:
+                self.assertEqual(csv_to_vhdl.get_and_prepare_csv_data(input_dict_list, dict(param_dict_window, **param_update)), window_level_matrices)
+            for level_matrix, start_time_ns in zip(window_level_matrices, [700, 500, 500]):
+                self.assertTrue(all(start_time_ns / 1e9 <= timestamp <= 1500 / 1e9 for timestamp, level in level_matrix[1:]))
+            full_level_matrix = csv_to_vhdl.read_csv_and_get_edges(INPUT_DICT1['filepath'], 0, INPUT_DICT_LIST, PARAM_DICT)
+            self.assertEqual(list(window_level_matrices[2])[1:], [edge for edge in full_level_matrix[1:] if 500 / 1e9 <= edge[0] <= 1500 / 1e9])
+
+            # ignore_time_ns: the rows before it are skipped by a seek, same level matrix as parsing them (maxDataRows disables the seek)
+            for ignore_time_ns in [300, rows[10][0] * 1e9 + abs(time_offset) * 1e9, 2000, 1e9]:
+                input_dict_list = [dict(input_dict, ignore_time_ns=ignore_time_ns) for input_dict in INPUT_DICT_LIST]
+                for param_update in [{}, {'CSV_READER': 'block', 'CSV_BLOCK_BYTES': 1000}, {'EDGE_ENGINE': 'numpy'}]:
+                    param_dict_ignore = dict(PARAM_DICT, **param_update)
+                    metrics = csv_to_vhdl.PipelineMetrics()
+                    with csv_to_vhdl.collect_metrics(metrics):
+                        level_matrices = csv_to_vhdl.get_and_prepare_csv_data(input_dict_list, param_dict_ignore)
+                    self.assertEqual(level_matrices, csv_to_vhdl.get_and_prepare_csv_data(input_dict_list, dict(param_dict_ignore, maxDataRows=10 ** 9)))
+                    self.assertLess(metrics.counter_dict['rows_parsed'], 2 * 3000)
+
+    def test_csv_index(self):
+        print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
+        import shutil
+        import tempfile
+        full_level_matrix = csv_to_vhdl.read_csv_and_get_edges(INPUT_DICT2['filepath'], 1, INPUT_DICT_LIST, PARAM_DICT)
+        csv_reader = csv_to_vhdl.readCsv(INPUT_DICT2['filepath'])
+        next(csv_reader)
+        time_offset = next(csv_reader)
+        timestamps = [row[0] + abs(time_offset) for row in csv_reader]
+
+        def get_level_after(timestamp):  # hysteresis level of the complete file after the row of timestamp
+            return [level for edge_timestamp, level in full_level_matrix if edge_timestamp <= timestamp][-1]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_filepath = os.path.join(tmp_dir, 'chan3.CSV')
+            shutil.copy(INPUT_DICT2['filepath'], csv_filepath)
+            input_dict_list = [dict(INPUT_DICT2, filepath=csv_filepath)]
+            param_dict_index = dict(PARAM_DICT, CSV_INDEX=True, CSV_INDEX_BYTES=1000)
+
+            csv_index = csv_to_vhdl.get_csv_index(csv_filepath, input_dict_list, param_dict_index)
+            self.assertTrue(os.path.isfile(csv_to_vhdl.get_csv_index_path(csv_filepath)))
+            self.assertGreater(len(csv_index['offsets']), 50)
+            with open(csv_filepath, 'rb') as csvfile:
+                csv_data = csvfile.read()
+            levels = csv_index['levels'][csv_to_vhdl.get_csv_index_level_key(input_dict_list[0])]
+            for offset, time_fl, level in zip(csv_index['offsets'], csv_index['times'], levels):
+                self.assertEqual(csv_data[offset - 1:offset], b'\n')
+                self.assertEqual(float(csv_data[offset:].split(b',')[0]), time_fl)
+                self.assertEqual(level, get_level_after(timestamps[timestamps.index(time_fl + abs(time_offset)) - 1]))
+
+            # valid index is reused, stale index is rebuilt
+            index_mtime = os.stat(csv_to_vhdl.get_csv_index_path(csv_filepath)).st_mtime_ns
+            self.assertEqual(csv_to_vhdl.get_csv_index(csv_filepath, input_dict_list, param_dict_index), csv_index)
+            self.assertEqual(os.stat(csv_to_vhdl.get_csv_index_path(csv_filepath)).st_mtime_ns, index_mtime)
+            with open(csv_filepath, 'ab') as csvfile:
+                csvfile.write(b'4.0000E-06,0.0\n')
+            self.assertEqual(csv_to_vhdl.get_csv_index(csv_filepath, input_dict_list, param_dict_index)['size'], len(csv_data) + 15)
+            shutil.copy(INPUT_DICT2['filepath'], csv_filepath)
+
+            # chunks start at rows of the index with known level: same level matrix as serial read
+            for csv_chunks in [2, 7]:
+                self.assertEqual(csv_to_vhdl.get_and_prepare_csv_data(input_dict_list, dict(param_dict_index, CSV_CHUNKS=csv_chunks))[0], full_level_matrix)
+
+            # time window starts with the hysteresis level of the complete file after its first row
+            for start_time_ns in [300, 555.5, 1300, 2000]:
+                window_level_matrix = csv_to_vhdl.read_csv_and_get_edges(csv_filepath, 0, input_dict_list, dict(param_dict_index, START_TIME_NS=start_time_ns))
+                window_timestamp = min(timestamp for timestamp in timestamps if timestamp >= start_time_ns / 1e9)
+                self.assertEqual(window_level_matrix[0][1], get_level_after(window_timestamp))
+                self.assertEqual(list(window_level_matrix)[1:], [edge for edge in full_level_matrix[1:] if edge[0] > window_timestamp])
+
+    def test_read_compressed_csv(self):
+        print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
+        import bz2
+        import gzip
+        import lzma
+        import mmap
+        import tempfile
+        with open(INPUT_DICT2['filepath'], 'rb') as csvfile:
+            csv_data = csvfile.read()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            compressed_filepath_list = []
+            for extension, compress_func in [('.gz', gzip.compress), ('.bz2', bz2.compress), ('.xz', lzma.compress)]:
+                compressed_filepath_list.append(os.path.join(tmp_dir, f"chan3.csv{extension}"))
+                with open(compressed_filepath_list[-1], 'wb') as compressedfile:
+                    compressedfile.write(compress_func(csv_data))
+            multi_member_filepath = os.path.join(tmp_dir, 'chan3_multi_member.csv.gz')
+            with open(multi_member_filepath, 'wb') as compressedfile:
+                for member_start in range(0, len(csv_data), 5000):
+                    compressedfile.write(gzip.compress(csv_data[member_start:member_start + 5000]))
+            compressed_filepath_list.append(multi_member_filepath)
+
+            # decompression of multi member gzip files: parallel and serial fallback
+            self.assertEqual(csv_to_vhdl.get_compression(INPUT_DICT2['filepath']), None)
+            self.assertEqual(csv_to_vhdl.get_compression(multi_member_filepath), 'gzip')
+            for decompress_workers, chunk_bytes in [(1, 1000), (4, 1000), (4, 100000)]:
+                self.assertEqual(b''.join(csv_to_vhdl.iter_decompressed_chunks(multi_member_filepath, 'gzip', decompress_workers, chunk_bytes)), csv_data)
+            with open(multi_member_filepath, 'rb') as compressedfile:
+                with mmap.mmap(compressedfile.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+                    self.assertEqual(csv_to_vhdl.decompress_gzip_range(mapped_file, 0, 100), None)  # range ends within a member
+                    self.assertEqual(csv_to_vhdl.decompress_gzip_range(mapped_file, 1, len(mapped_file)), None)  # range starts within a member
+
+            # compressed files give the same level matrix as the plain csv file
+            level_matrix = csv_to_vhdl.read_csv_and_get_edges(INPUT_DICT2['filepath'], 1, INPUT_DICT_LIST, PARAM_DICT)
+            window_param_dict = dict(PARAM_DICT, START_TIME_NS=500, STOP_TIME_NS=1500)
+            window_level_matrix = csv_to_vhdl.read_csv_and_get_edges(INPUT_DICT2['filepath'], 1, INPUT_DICT_LIST, window_param_dict)
+            for compressed_filepath in compressed_filepath_list:
+                input_dict_list = [dict(INPUT_DICT2, filepath=compressed_filepath)]
+                for param_update in [{}, {'CSV_READER': 'block', 'CSV_BLOCK_BYTES': 1000}, {'CSV_CHUNKS': 2}, {'maxDataRows': 100, 'CSV_READER': 'block'}]:
+                    param_dict_local = dict(PARAM_DICT, **param_update)
+                    self.assertEqual(csv_to_vhdl.get_and_prepare_csv_data(input_dict_list, param_dict_local)[0],
+                                     csv_to_vhdl.get_and_prepare_csv_data([INPUT_DICT2], param_dict_local)[0])
+                for param_update in [{}, {'CSV_READER': 'block'}]:
+                    self.assertEqual(csv_to_vhdl.read_csv_and_get_edges(compressed_filepath, 0, input_dict_list, dict(window_param_dict, **param_update)), window_level_matrix)
+                self.assertEqual(csv_to_vhdl.read_csv_and_get_edges(compressed_filepath, 0, input_dict_list, PARAM_DICT), level_matrix)
+
     def test_get_edges(self):
         print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
         input_matrix = [[-3.9990000E-03, 3.32520E+00],
@@ -133,6 +396,107 @@ class Test_CSV_TO_VHDL(unittest.TestCase):
             level_matrix.append(detected_edge)
         self.assertEqual(level_matrix, [[0.0, 1], [1.9999999996293e-09, 0], [4.399999999580353e-09, 1]])
 
+    @unittest.skipIf(csv_to_vhdl.np is None, "numpy not installed")
+    def test_get_edges_vectorized(self):
+        print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
+        time_arr = [-3.9990000E-03, -3.9989992E-03, -3.9989984E-03, -3.9989976E-03, -3.9989968E-03, -3.9989960E-03,
+                    -3.9989952E-03, -3.9989944E-03, -3.9989936E-03, -3.9989928E-03, -3.9989920E-03, -3.9989912E-03]
+        voltage_arr = [3.32520E+00, 3.34473E+00, 3.35449E+00, 2.33496E+00, 1.33496E+00, 0.33496E+00,
+                       0.36426E+00, 1.35449E+00, 2.33496E+00, 3.34473E+00, 3.34473E+00, 3.36426E+00]
+
+        level_matrix, last_level = csv_to_vhdl.get_edges_vectorized(time_arr[0], time_arr, voltage_arr, 1, positive_going_voltage=2.0, negative_going_voltage=0.8, ignore_time_ns=0)
+        self.assertEqual(level_matrix, [[3.9999999996293e-09, 0], [6.3999999995803525e-09, 1]])
+        self.assertEqual(last_level, 1)
+
+        level_matrix, last_level = csv_to_vhdl.get_edges_vectorized(time_arr[0], time_arr, voltage_arr, 1, positive_going_voltage=2.0, negative_going_voltage=0.8, ignore_time_ns=2)
+        self.assertEqual(level_matrix, [[1.9999999996293e-09, 0], [4.399999999580353e-09, 1]])
+
+        level_matrix, last_level = csv_to_vhdl.get_edges_vectorized(time_arr[0], time_arr, voltage_arr, 1, ignore_time_ns=0, max_edges=1)
+        self.assertEqual(level_matrix, [[3.9999999996293e-09, 0]])
+        self.assertEqual(last_level, 0)
+
+        # whole files: numpy engine has to give the same result as the python engine
+        for param_update in [{}, {'MAX_SIM_TIME_US': 0.02}, {'EDGE_BLOCK_SIZE': 7}]:
+            param_dict_python = dict(PARAM_DICT, **param_update)
+            param_dict_numpy = dict(param_dict_python, EDGE_ENGINE='numpy')
+            for file_num in range(len(INPUT_DICT_LIST)):
+                input_dict_list = [dict(input_dict, ignore_time_ns=300) for input_dict in INPUT_DICT_LIST]
+                self.assertEqual(csv_to_vhdl.read_csv_and_get_edges(INPUT_DICT_LIST[file_num]['filepath'], file_num, input_dict_list, param_dict_numpy),
+                                 csv_to_vhdl.read_csv_and_get_edges(INPUT_DICT_LIST[file_num]['filepath'], file_num, input_dict_list, param_dict_python))
+                self.assertEqual(csv_to_vhdl.read_csv_and_get_edges(INPUT_DICT_LIST[file_num]['filepath'], file_num, INPUT_DICT_LIST, param_dict_numpy),
+                                 csv_to_vhdl.read_csv_and_get_edges(INPUT_DICT_LIST[file_num]['filepath'], file_num, INPUT_DICT_LIST, param_dict_python))
+
+    def test_get_edges_envelope(self):
+        print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
+        import random
+        random.seed(25)
+        # oversampled signal: long idle phases around 0 V / 3.3 V with short bursts, noise and a NaN sample
+        time_arr = [sample_num * 1e-10 for sample_num in range(20000)]
+        voltage_arr = []
+        level = 0
+        for sample_num in range(len(time_arr)):
+            if sample_num % 2500 < 400 and sample_num % 20 == 0:
+                level = 1 - level
+            voltage_arr.append(level * 3.3 + random.uniform(-0.3, 0.3))
+        voltage_arr[7777] = float('nan')
+
+        get_edges_func_list = [csv_to_vhdl.get_edges_block] + ([csv_to_vhdl.get_edges_vectorized] if csv_to_vhdl.np is not None else [])
+        for get_edges_func in get_edges_func_list:
+            for last_level, ignore_time_ns, max_edges in [(0, 0, None), (1, 0, None), (-1, 300, None), (0, 0, 50)]:
+                expected = get_edges_func(time_arr[0], time_arr, voltage_arr, last_level, 2.0, 0.8, ignore_time_ns, max_edges)
+                for envelope_block in [1, 64, 256, 100000]:
+                    metrics = csv_to_vhdl.PipelineMetrics()
+                    with csv_to_vhdl.collect_metrics(metrics):
+                        self.assertEqual(csv_to_vhdl.get_edges_envelope(get_edges_func, envelope_block, time_arr[0], time_arr, voltage_arr, last_level, 2.0, 0.8, ignore_time_ns, max_edges), expected)
+                    if max_edges is None:
+                        self.assertEqual(metrics.counter_dict['envelope_blocks'], -(-len(time_arr) // envelope_block))
+                if max_edges is None and envelope_block == 100000:
+                    self.assertEqual(metrics.counter_dict['envelope_blocks_skipped'], 0)
+
+        # most sub blocks of the idle phases are skipped
+        metrics = csv_to_vhdl.PipelineMetrics()
+        with csv_to_vhdl.collect_metrics(metrics):
+            csv_to_vhdl.get_edges_envelope(csv_to_vhdl.get_edges_block, 64, time_arr[0], time_arr, voltage_arr, 0)
+        self.assertGreater(metrics.counter_dict['envelope_blocks_skipped'] / metrics.counter_dict['envelope_blocks'], 0.7)
+        self.assertIn("envelope blocks skipped: ", metrics.summary())
+
+        # whole files with the text and the block reader
+        for param_update in [{}, {'CSV_READER': 'block'}, {'EDGE_ENGINE': 'numpy'}]:
+            param_dict = dict(PARAM_DICT, **param_update)
+            for file_num in range(len(INPUT_DICT_LIST)):
+                self.assertEqual(csv_to_vhdl.read_csv_and_get_edges(INPUT_DICT_LIST[file_num]['filepath'], file_num, INPUT_DICT_LIST, dict(param_dict, EDGE_ENVELOPE_BLOCK=4)),
+                                 csv_to_vhdl.read_csv_and_get_edges(INPUT_DICT_LIST[file_num]['filepath'], file_num, INPUT_DICT_LIST, param_dict))
+
+    def test_edge_array(self):
+        print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
+        import pickle
+        level_matrix = [[0.0, 1], [9.903999999999999e-07, 0], [1.4303999999999999e-06, 1], [1.4504e-06, 0], [2.2904e-06, 1],
+                        [2.3e-06, 0], [2.4e-06, 1], [2.5e-06, 0], [2.6e-06, 1], [2.7e-06, 0]]
+        edge_array = csv_to_vhdl.EdgeArray(level_matrix)
+
+        self.assertEqual(edge_array, level_matrix)
+        self.assertEqual(len(edge_array), 10)
+        self.assertEqual(edge_array[8], [2.6e-06, 1])
+        self.assertEqual(edge_array[-1], [2.7e-06, 0])
+        self.assertEqual(edge_array[1:4], level_matrix[1:4])
+        self.assertEqual(list(edge_array), level_matrix)
+        self.assertEqual(pickle.loads(pickle.dumps(edge_array)), edge_array)
+        self.assertNotEqual(edge_array, level_matrix[:-1])
+        with self.assertRaises(IndexError):
+            edge_array[10]
+
+        edge_array.truncate(9)
+        self.assertEqual(edge_array, level_matrix[:9])
+        edge_array.append([2.7e-06, 0])
+        self.assertEqual(edge_array, level_matrix)
+        edge_array.extend(csv_to_vhdl.EdgeArray(level_matrix))
+        self.assertEqual(edge_array, level_matrix + level_matrix)
+
+        # memory compared to list of [float, int]
+        level_matrix = [[i * 1e-9, i % 2] for i in range(10000)]
+        list_bytes = sys.getsizeof(level_matrix) + sum(sys.getsizeof(data_tuple) + sys.getsizeof(data_tuple[0]) for data_tuple in level_matrix)
+        self.assertGreater(list_bytes / csv_to_vhdl.EdgeArray(level_matrix).nbytes(), 5)
+
     def test_get_and_prepare_csv_data(self):
         print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
         all_ch_level_matrix = csv_to_vhdl.get_and_prepare_csv_data(INPUT_DICT_LIST, PARAM_DICT)
@@ -155,6 +519,95 @@ class Test_CSV_TO_VHDL(unittest.TestCase):
                                                 [8.272e-07, 1],
                                                 [2.2752e-06, 0]]])
 
+    def test_get_and_prepare_csv_data_parallel(self):
+        print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
+        input_dict_list = [dict(input_dict, ignore_time_ns=300) for input_dict in INPUT_DICT_LIST]
+        for param_update in [{'MAX_SIM_TIME_US': 0.02}, {}]:
+            param_dict_serial = dict(PARAM_DICT, **param_update)
+            for use_input_dict_list in [INPUT_DICT_LIST, input_dict_list]:
+                all_ch_level_matrix_serial = csv_to_vhdl.get_and_prepare_csv_data(use_input_dict_list, param_dict_serial)
+                for parallel_param_update in [{'POOL_MODE': 'process', 'NUM_WORKERS': 4},
+                                              {'CSV_CHUNKS': 2},
+                                              {'CSV_CHUNKS': 7, 'CSV_BLOCK_BYTES': 1000},
+                                              {'CSV_CHUNKS': 50, 'EDGE_ENGINE': 'numpy'},
+                                              {'CSV_CHUNKS': 3, 'POOL_MODE': 'process', 'NUM_WORKERS': 4}]:
+                    if parallel_param_update.get('EDGE_ENGINE') == 'numpy' and csv_to_vhdl.np is None:
+                        continue
+                    param_dict_parallel = dict(param_dict_serial, **parallel_param_update)
+                    self.assertEqual(csv_to_vhdl.get_and_prepare_csv_data(use_input_dict_list, param_dict_parallel), all_ch_level_matrix_serial)
+
+    def test_get_and_prepare_csv_data_multi_channel(self):
+        print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
+        import tempfile
+        # one csv file with shared time column: time, CHAN1, CHAN3, CHAN1
+        with open(INPUT_DICT1['filepath']) as csvfile1, open(INPUT_DICT2['filepath']) as csvfile2:
+            line_list = [f"{line1.rstrip()},{line2.rstrip().split(',')[1]},{line1.rstrip().split(',')[1]}\n" for line1, line2 in zip(csvfile1, csvfile2)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            multi_filepath = os.path.join(tmp_dir, 'multi_channel.CSV')
+            with open(multi_filepath, 'w') as csvfile:
+                csvfile.writelines(line_list)
+            input_dict_list = [dict(INPUT_DICT1, filepath=multi_filepath, column=1), dict(INPUT_DICT2, filepath=multi_filepath, column=2),
+                               dict(INPUT_DICT1, filepath=multi_filepath, column=3, POSITIVE_GOING_VOLTAGE=3.0)]
+            single_input_dict_list = [INPUT_DICT1, INPUT_DICT2, dict(INPUT_DICT1, POSITIVE_GOING_VOLTAGE=3.0)]
+            single_level_matrices = csv_to_vhdl.get_and_prepare_csv_data(single_input_dict_list, PARAM_DICT)
+
+            for param_update in [{}, {'CSV_READER': 'block'}, {'EDGE_ENGINE': 'numpy'}, {'CSV_CHUNKS': 2}, {'MAX_SIM_TIME_US': 0.02}]:
+                if param_update.get('EDGE_ENGINE') == 'numpy' and csv_to_vhdl.np is None:
+                    continue
+                param_dict_local = dict(PARAM_DICT, **param_update)
+                if 'MAX_SIM_TIME_US' in param_update:
+                    single_level_matrices = csv_to_vhdl.get_and_prepare_csv_data(single_input_dict_list, param_dict_local)
+                metrics = csv_to_vhdl.PipelineMetrics()
+                with csv_to_vhdl.collect_metrics(metrics):
+                    multi_level_matrices = csv_to_vhdl.get_and_prepare_csv_data(input_dict_list, param_dict_local)
+                self.assertEqual(multi_level_matrices, single_level_matrices)
+                if 'CSV_CHUNKS' not in param_update:
+                    self.assertEqual(metrics.to_dict()['files'][multi_filepath]['rows'], len(line_list) - 1)  # file read once
+                self.assertEqual(list(csv_to_vhdl.read_csv_and_get_edges(multi_filepath, 1, input_dict_list, param_dict_local)), list(multi_level_matrices[1]))
+
+    def test_get_and_prepare_csv_data_edge_cache(self):
+        print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
+        import tempfile
+        with tempfile.TemporaryDirectory() as cache_dir:
+            param_dict_cache = dict(PARAM_DICT, EDGE_CACHE_DIR=cache_dir)
+            all_ch_level_matrix = csv_to_vhdl.get_and_prepare_csv_data(INPUT_DICT_LIST, PARAM_DICT)
+            self.assertEqual(csv_to_vhdl.get_and_prepare_csv_data(INPUT_DICT_LIST, param_dict_cache), all_ch_level_matrix)
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+            # read from cache
+            for cache_path in [csv_to_vhdl.get_edge_cache_path(input_dict['filepath'], input_dict, param_dict_cache) for input_dict in INPUT_DICT_LIST]:
+                self.assertIsNotNone(csv_to_vhdl.load_edge_cache(cache_path, 1e9))
+            self.assertEqual(csv_to_vhdl.get_and_prepare_csv_data(INPUT_DICT_LIST, param_dict_cache), all_ch_level_matrix)
+
+            # other thresholds are not cached
+            input_dict_list = [dict(input_dict, POSITIVE_GOING_VOLTAGE=2.5) for input_dict in INPUT_DICT_LIST]
+            self.assertIsNone(csv_to_vhdl.load_edge_cache(csv_to_vhdl.get_edge_cache_path(input_dict_list[0]['filepath'], input_dict_list[0], param_dict_cache), 1e9))
+
+            # complete data is valid for smaller max_transitions, cut data only for smaller max_transitions
+            for max_sim_time_us in [0.02, 0.01, 1000]:
+                param_dict_local = dict(param_dict_cache, MAX_SIM_TIME_US=max_sim_time_us)
+                self.assertEqual(csv_to_vhdl.get_and_prepare_csv_data(INPUT_DICT_LIST, param_dict_local),
+                                 csv_to_vhdl.get_and_prepare_csv_data(INPUT_DICT_LIST, dict(param_dict_local, EDGE_CACHE_DIR=None)))
+
+            # the initial level of a time window depends on CSV_INDEX: the window starts in the hysteresis band after a high level
+            csv_filepath = os.path.join(cache_dir, 'window.CSV')
+            with open(csv_filepath, 'w') as csvfile:
+                csvfile.write("in s,C1 in V\n0.0,0.0\n1e-07,3.3\n2e-07,1.5\n3e-07,0.0\n4e-07,0.0\n")
+            input_dict_list_window = [dict(INPUT_DICT1, filepath=csv_filepath)]
+            for csv_index, expected_level_matrix in [(False, [[0.0, 0]]), (True, [[0.0, 1], [3e-07, 0]]), (False, [[0.0, 0]])]:
+                param_dict_window = dict(param_dict_cache, START_TIME_NS=150, CSV_INDEX=csv_index)
+                self.assertEqual(csv_to_vhdl.get_and_prepare_csv_data(input_dict_list_window, param_dict_window)[0], expected_level_matrix)
+            os.remove(csv_filepath)
+            os.remove(csv_to_vhdl.get_csv_index_path(csv_filepath))
+
+            # LRU eviction and clear
+            csv_to_vhdl.get_and_prepare_csv_data(input_dict_list, dict(param_dict_cache, EDGE_CACHE_MAX_MB=0))
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+            csv_to_vhdl.get_and_prepare_csv_data(INPUT_DICT_LIST, dict(param_dict_cache, EDGE_CACHE_CLEAR=True))
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+            csv_to_vhdl.clear_edge_cache(cache_dir)
+            self.assertEqual(os.listdir(cache_dir), [])
+
     def test_write_stimuli_file_simple(self):
         print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
         import difflib
@@ -195,6 +648,119 @@ class Test_CSV_TO_VHDL(unittest.TestCase):
         if found_diff is True:
             self.assertTrue(False)
 
+    def test_write_stimuli_file_batches(self):
+        print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
+        all_ch_level_matrix = csv_to_vhdl.get_and_prepare_csv_data(INPUT_DICT_LIST, PARAM_DICT)
+        run_num_list = [dict_elem['RUN_NUM'] for dict_elem in INPUT_DICT_LIST]
+        signals_list = [dict_elem['signal'] for dict_elem in INPUT_DICT_LIST]
+        vhdl_signal_names = [dict_elem['vhdl_signal_name'] for dict_elem in INPUT_DICT_LIST]
+        min_freq_list = [dict_elem['MIN_FREQ_MHZ'] for dict_elem in INPUT_DICT_LIST]
+
+        with open("test_write_stimuli_file_gm.vhd") as f1:
+            f1_text = f1.read()
+        for batch_lines in [1, 3]:
+            csv_to_vhdl.write_stimuli_file("", all_ch_level_matrix, vhdl_signal_names, run_num_list, signals_list, min_freq_list, dict(PARAM_DICT, WRITE_BATCH_LINES=batch_lines))
+            with open(PARAM_DICT['VHD_DO_FILENAME']) as f2:
+                self.assertEqual(f2.read(), f1_text)
+
+        param_dict_local = dict(PARAM_DICT, RESOLUTION="fs")
+        with self.assertRaises(ValueError):
+            csv_to_vhdl.write_stimuli_file("", all_ch_level_matrix, vhdl_signal_names, run_num_list, signals_list, min_freq_list, param_dict_local)
+
+    def test_write_stimuli_file_table(self):
+        print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
+        import re
+        import tempfile
+        all_ch_level_matrix = csv_to_vhdl.get_and_prepare_csv_data(INPUT_DICT_LIST, PARAM_DICT)
+        run_num_list = [dict_elem['RUN_NUM'] for dict_elem in INPUT_DICT_LIST]
+        signals_list = [dict_elem['signal'] for dict_elem in INPUT_DICT_LIST]
+        vhdl_signal_names = [dict_elem['vhdl_signal_name'] for dict_elem in INPUT_DICT_LIST]
+        min_freq_list = [dict_elem['MIN_FREQ_MHZ'] for dict_elem in INPUT_DICT_LIST]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            param_dict_table = dict(PARAM_DICT, VHD_OUTPUT_MODE='table', VHD_TABLE_CHUNK_SIZE=8)
+            csv_to_vhdl.write_stimuli_file(tmp_dir, all_ch_level_matrix, vhdl_signal_names, run_num_list, signals_list, min_freq_list, param_dict_table)
+            for golden_filename, filename in [("test_write_stimuli_file_table_gm.vhd", PARAM_DICT['VHD_DO_FILENAME']), ("test_write_stimuli_file_table_pkg_gm.vhd", "my_decoded_file_pkg.vhd")]:
+                with open(golden_filename) as f1, open(os.path.join(tmp_dir, filename)) as f2:
+                    self.assertEqual(f2.read(), f1.read())
+
+            # same events as VHD_OUTPUT_MODE "statements" for any chunk size and resolution
+            for resolution in ["ns", "ps"]:
+                csv_to_vhdl.write_stimuli_file(tmp_dir, all_ch_level_matrix, vhdl_signal_names, run_num_list, signals_list, min_freq_list, dict(PARAM_DICT, RESOLUTION=resolution))
+                with open(os.path.join(tmp_dir, PARAM_DICT['VHD_DO_FILENAME'])) as vhdfile:
+                    statement_events = [(float(delay), vhdl_signal_names.index(signal_name), level) for delay, signal_name, level in re.findall(r"wait for +([0-9.]+) \w+;\t\t(\w+)\t\t<=\t'(.)';", vhdfile.read())]
+                for chunk_size in [1, 5, 65536]:
+                    csv_to_vhdl.write_stimuli_file(tmp_dir, all_ch_level_matrix, vhdl_signal_names, run_num_list, signals_list, min_freq_list,
+                                                   dict(PARAM_DICT, RESOLUTION=resolution, VHD_OUTPUT_MODE='table', VHD_TABLE_CHUNK_SIZE=chunk_size))
+                    with open(os.path.join(tmp_dir, "my_decoded_file_pkg.vhd")) as pkgfile:
+                        table_events = [(float(delay), int(signal_idx), level) for delay, signal_idx, level in re.findall(r"\d+ => \((\d+) \w+, (\d+), '(.)'\)", pkgfile.read())]
+                    self.assertEqual(table_events, statement_events)
+                    with open(os.path.join(tmp_dir, PARAM_DICT['VHD_DO_FILENAME'])) as vhdfile:
+                        self.assertEqual(vhdfile.read().count("end loop;"), -(-len(statement_events) // chunk_size))
+
+        self.assertEqual(csv_to_vhdl.get_vhd_package_name({'VHD_DO_FILENAME': "my decoded-file__2.vhd"}), "stimuli_my_decoded_file_2_pkg")
+
+    def test_write_stimuli_file_coalesce(self):
+        print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
+        import tempfile
+        all_ch_level_matrix = csv_to_vhdl.get_and_prepare_csv_data(INPUT_DICT_LIST, PARAM_DICT)
+        run_num_list = [dict_elem['RUN_NUM'] for dict_elem in INPUT_DICT_LIST]
+        signals_list = [dict_elem['signal'] for dict_elem in INPUT_DICT_LIST]
+        vhdl_signal_names = [dict_elem['vhdl_signal_name'] for dict_elem in INPUT_DICT_LIST]
+        min_freq_list = [dict_elem['MIN_FREQ_MHZ'] for dict_elem in INPUT_DICT_LIST]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # only the two events at 0 ns share a tick
+            csv_to_vhdl.write_stimuli_file(tmp_dir, all_ch_level_matrix, vhdl_signal_names, run_num_list, signals_list, min_freq_list, dict(PARAM_DICT, COALESCE_EVENTS=True))
+            with open("test_write_stimuli_file_gm.vhd") as f1, open(os.path.join(tmp_dir, PARAM_DICT['VHD_DO_FILENAME'])) as f2:
+                f1_lines = f1.readlines()
+                self.assertEqual(f2.readlines(), f1_lines[:3] + ["\twait for   0.0 ns;\n", "\t\tspi_clk_stimu01_sl_s\t\t<=\t'1';\n", "\t\tspi_mosi_stimu01_sl_s\t\t<=\t'0';\n"] + f1_lines[5:])
+
+            # parallel bus: d1, d0 as bus, strobe as single signal
+            all_ch_level_matrix = [[[0.0, 0], [1e-7, 1], [3e-7, 0]],
+                                   [[0.0, 1], [1e-7, 0], [2e-7, 1], [3.0001e-7, 0]],
+                                   [[0.0, 0], [1e-7, 1], [4e-7, 0]]]
+            vhdl_signal_names = ['d1_s', 'd0_s', 'strobe_s']
+            param_dict_bus = dict(PARAM_DICT, BUSES={'data_bus_s': ['d1_s', 'd0_s']})
+            expected_text_dict = {'.vhd': ("\twait for   0.0 ns;\n\t\tdata_bus_s\t\t<=\t\"01\";\n\t\tstrobe_s\t\t<=\t'0';\n"
+                                          "\twait for 100.0 ns;\n\t\tdata_bus_s\t\t<=\t\"10\";\n\t\tstrobe_s\t\t<=\t'1';\n"
+                                          "\twait for 100.0 ns;\n\t\tdata_bus_s\t\t<=\t\"11\";\n"
+                                          "\twait for 100.0 ns;\n\t\tdata_bus_s\t\t<=\t\"00\";\n"
+                                          "\twait for 100.0 ns;\t\tstrobe_s\t\t<=\t'0';\n"),
+                                  '.do': ("run 0.0\nforce -freeze data_bus_s 01\nforce -freeze strobe_s 0\n"
+                                          "run 100.0\nforce -freeze data_bus_s 10\nforce -freeze strobe_s 1\n"
+                                          "run 100.0\nforce -freeze data_bus_s 11\n"
+                                          "run 100.0\nforce -freeze data_bus_s 00\n"
+                                          "run 100.0\nforce -freeze strobe_s 0\n")}
+            for file_extension, expected_text in expected_text_dict.items():
+                param_dict_local = dict(param_dict_bus, VHD_DO_FILENAME=f"bus{file_extension}")
+                csv_to_vhdl.write_stimuli_file(tmp_dir, all_ch_level_matrix, vhdl_signal_names, [1, 1, 1], ['CLK', 'MOSI', 'MOSI'], [20, 20, 20], param_dict_local)
+                with open(os.path.join(tmp_dir, param_dict_local['VHD_DO_FILENAME'])) as vhdfile:
+                    self.assertTrue(vhdfile.read().endswith(expected_text))
+
+            with self.assertRaises(ValueError):
+                csv_to_vhdl.write_stimuli_file(tmp_dir, all_ch_level_matrix, vhdl_signal_names, [1, 1, 1], ['CLK', 'MOSI', 'MOSI'], [20, 20, 20], dict(param_dict_bus, BUSES={'bus': ['d2_s']}))
+
+            # zero width glitch of a single signal: same events as without coalescing
+            all_ch_level_matrix = [[[0.0, 0], [1e-7, 1], [1.0001e-7, 0], [2e-7, 1]]]
+            for param_update in [{}, {'COALESCE_EVENTS': True}]:
+                param_dict_local = dict(PARAM_DICT, VHD_DO_FILENAME=f"glitch{len(param_update)}.vhd", **param_update)
+                csv_to_vhdl.write_stimuli_file(tmp_dir, all_ch_level_matrix, ['x_s'], [1], ['CLK'], [20], param_dict_local)
+                with open(os.path.join(tmp_dir, param_dict_local['VHD_DO_FILENAME'])) as vhdfile:
+                    self.assertTrue(vhdfile.read().endswith("\twait for 100.0 ns;\t\tx_s\t\t<=\t'1';\n\twait for   0.0 ns;\t\tx_s\t\t<=\t'0';\n"
+                                                            "\twait for 100.0 ns;\t\tx_s\t\t<=\t'1';\n"))
+
+        # glitch of a bus bit starts a new block, bits without event are 'U'
+        import io
+        vhdfile = io.StringIO()
+        block_writer = csv_to_vhdl.StimuliBlockWriter(vhdfile, '.vhd', ['d1_s', 'd0_s'], dict(PARAM_DICT, BUSES={'data_bus_s': ['d1_s', 'd0_s']}))
+        for wait_time_ps, signal_idx, level in [(0, 0, 1), (0, 0, 0), (100000, 1, 1)]:
+            block_writer.write(wait_time_ps, signal_idx, level)
+        block_writer.close()
+        self.assertEqual(vhdfile.getvalue(), "\twait for   0.0 ns;\n\t\tdata_bus_s\t\t<=\t\"1U\";\n"
+                                             "\twait for   0.0 ns;\n\t\tdata_bus_s\t\t<=\t\"0U\";\n"
+                                             "\twait for 100.0 ns;\n\t\tdata_bus_s\t\t<=\t\"01\";\n")
+
     def test_write_stimuli_file_sync(self):
         print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
         import difflib
@@ -253,6 +819,148 @@ class Test_CSV_TO_VHDL(unittest.TestCase):
         if found_diff is True:
             self.assertTrue(False)
 
+    def test_align_runs(self):
+        print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
+        burst1 = [1e-06 + edge_num * 50e-09 for edge_num in range(6)]
+        burst2 = [5e-06 + edge_num * 50e-09 for edge_num in range(6)]
+
+        def get_level_matrix(edge_list):
+            return [[0.0, 0]] + [[timestamp, (edge_num + 1) % 2] for edge_num, timestamp in enumerate(edge_list)]
+
+        # run 2 starts 3.7 us later and has a 300 ns longer pause before the second burst
+        all_ch_level_matrix = [get_level_matrix(burst1 + burst2), get_level_matrix([timestamp + 3.7e-06 for timestamp in burst1] + [timestamp + 4e-06 for timestamp in burst2])]
+        param_dict = dict(PARAM_DICT, DO_SYNC=True, SYNC_MODE="bursts")
+        offset_table = csv_to_vhdl.get_run_offset_table([csv_to_vhdl.EdgeArray(level_matrix) for level_matrix in all_ch_level_matrix], [1, 2], ['CLK', 'CLK'], 20, param_dict)
+        self.assertEqual([neg_offset for timestamp_from, neg_offset in offset_table[1]], [0.0, 0.0])
+        self.assertEqual([timestamp_from for timestamp_from, neg_offset in offset_table[2]], [float('-inf'), burst1[-1] + 3.7e-06])
+        for neg_offset, expected_offset in zip([neg_offset for timestamp_from, neg_offset in offset_table[2]], [3.7e-06, 4e-06]):
+            self.assertAlmostEqual(neg_offset, expected_offset, delta=1e-12)
+        aligned_level_matrix = csv_to_vhdl.align_runs(all_ch_level_matrix, [1, 2], ['CLK', 'CLK'], 20, param_dict)
+        self.assertEqual(aligned_level_matrix[0], all_ch_level_matrix[0])
+        for (timestamp, level), (expected_timestamp, expected_level) in zip(aligned_level_matrix[1], all_ch_level_matrix[0]):
+            self.assertAlmostEqual(timestamp, expected_timestamp, delta=1e-12)
+            self.assertEqual(level, expected_level)
+
+        # one offset per run from the cross-correlation
+        all_ch_level_matrix = [get_level_matrix(burst1 + burst2), get_level_matrix([timestamp + 3.7e-06 for timestamp in burst1 + burst2])]
+        if csv_to_vhdl.np is not None:
+            offset_table = csv_to_vhdl.get_run_offset_table([csv_to_vhdl.EdgeArray(level_matrix) for level_matrix in all_ch_level_matrix], [1, 2], ['CLK', 'CLK'], 20, dict(param_dict, SYNC_MODE="xcorr"))
+            self.assertEqual(offset_table[1], [(float('-inf'), 0.0)])
+            self.assertAlmostEqual(offset_table[2][0][1], 3.7e-06, delta=2e-09)
+        with self.assertRaises(ValueError):
+            csv_to_vhdl.get_run_offset_table([csv_to_vhdl.EdgeArray(level_matrix) for level_matrix in all_ch_level_matrix], [1, 2], ['CLK', 'CLK'], 20, dict(param_dict, SYNC_SIGNAL='MOSI'))
+
+    def test_tracing(self):
+        print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
+        import io
+
+        class CountingRepr:
+            num_formats = 0
+
+            def __str__(self):
+                CountingRepr.num_formats += 1
+                return "counted"
+
+        tracer = csv_to_vhdl.tracer
+        stream = io.StringIO()
+        tracer.stream = stream
+        try:
+            with csv_to_vhdl.tracing('off'):
+                tracer.trace('debug', "not formatted: %s", CountingRepr())
+                self.assertEqual(tracer.sample_every(), 0)
+            self.assertEqual(CountingRepr.num_formats, 0)
+            with csv_to_vhdl.tracing('debug'):
+                tracer.trace('debug', "formatted: %s", CountingRepr())
+                tracer.trace('event', "not formatted: %s", CountingRepr())
+                self.assertEqual(tracer.sample_every(), 0)
+            self.assertEqual(CountingRepr.num_formats, 1)
+            self.assertEqual(stream.getvalue(), "formatted: counted\n")
+
+            # every 2nd of the 5 transitions of each of the 2 signals
+            all_ch_level_matrix = csv_to_vhdl.get_and_prepare_csv_data(INPUT_DICT_LIST, PARAM_DICT)
+            num_events = sum(len(level_matrix) for level_matrix in all_ch_level_matrix)
+            with csv_to_vhdl.tracing('event:2'):
+                stream.seek(0)
+                stream.truncate()
+                csv_to_vhdl.write_stimuli_file("", all_ch_level_matrix, ['clk', 'mosi'], [1, 2], ['CLK', 'CLK'], [20, 20], PARAM_DICT)
+                self.assertIn("min_freq_mhz: 20\n", stream.getvalue())  # 'event' includes 'debug'
+                self.assertEqual(sum(1 for line in stream.getvalue().splitlines() if line.startswith('event ')), (num_events + 1) // 2)
+            self.assertEqual(tracer.spec, 'off')
+        finally:
+            tracer.stream = None
+        with self.assertRaises(ValueError):
+            tracer.configure('event:0')
+        with self.assertRaises(ValueError):
+            tracer.configure('verbose')
+
+        # tracing() is per thread: overlapping jobs with other specs do not change each other or the process wide spec
+        import concurrent.futures
+        import threading
+        barrier = threading.Barrier(2)
+
+        def run_job(spec):
+            with csv_to_vhdl.tracing(spec):
+                barrier.wait()
+                spec_in_job = tracer.spec
+                with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+                    spec_in_worker = csv_to_vhdl.submit_with_metrics(executor, lambda: tracer.spec).result()
+                barrier.wait()
+            return spec_in_job, spec_in_worker
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            future_list = [executor.submit(run_job, spec) for spec in ['debug', 'event:10']]
+            self.assertEqual([future.result() for future in future_list], [('debug', 'debug'), ('event:10', 'event:10')])
+        self.assertEqual(tracer.spec, 'off')
+
+    def test_write_stimuli_shards(self):
+        print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
+        import tempfile
+
+        def get_event_lines(vhd_text):
+            ''' stimuli lines of a shard without header and initial levels '''
+            line_list = vhd_text.splitlines(keepends=True)
+            num_initial_levels = sum(line.count(" = '") for line in line_list if line.startswith('\t-- initial levels: '))
+            return [line for line in line_list if line.startswith('\twait for')][num_initial_levels:]
+
+        all_ch_level_matrix = csv_to_vhdl.get_and_prepare_csv_data(INPUT_DICT_LIST, PARAM_DICT)
+        run_num_list = [dict_elem['RUN_NUM'] for dict_elem in INPUT_DICT_LIST]
+        signals_list = [dict_elem['signal'] for dict_elem in INPUT_DICT_LIST]
+        vhdl_signal_names = [dict_elem['vhdl_signal_name'] for dict_elem in INPUT_DICT_LIST]
+        min_freq_list = [dict_elem['MIN_FREQ_MHZ'] for dict_elem in INPUT_DICT_LIST]
+        with open("test_write_stimuli_file_gm.vhd") as f1:
+            golden_event_lines = get_event_lines(f1.read())
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # the shards one after another give the stimuli of one file
+            for param_update, num_shards in [({'SHARDS': 3}, 3), ({'SHARDS': 3, 'POOL_MODE': 'process'}, 3), ({'SHARD_DURATION_NS': 500}, 4)]:
+                shard_filename_list = csv_to_vhdl.write_stimuli_shards(tmp_dir, all_ch_level_matrix, vhdl_signal_names, run_num_list, signals_list, min_freq_list, dict(PARAM_DICT, **param_update))
+                self.assertEqual(shard_filename_list, [f"my_decoded_file_shard{shard_num:03d}.vhd" for shard_num in range(num_shards)])
+                event_lines = []
+                for shard_filename in shard_filename_list:
+                    with open(os.path.join(tmp_dir, shard_filename)) as vhdfile:
+                        event_lines += get_event_lines(vhdfile.read())
+                self.assertEqual(event_lines, golden_event_lines)
+            with open(os.path.join(tmp_dir, "my_decoded_file_shard002.vhd")) as vhdfile:
+                self.assertIn("\t-- shard 3 of 4 of my_decoded_file.vhd, starts at simulation time 1430 ns\n", vhdfile.read())
+
+            # sync offsets are carried from shard to shard
+            all_ch_level_matrix = [[[0.0, 1], [9e-06, 0], [10e-06, 1], [14e-06, 0], [22.1e-06, 1]],
+                                   [[0.0, 1], [9e-06, 0], [10.001e-06, 1], [14e-06, 0], [22.11e-06, 1]],
+                                   [[0.0, 1], [9.5e-06, 0], [10.60e-06, 1], [14.5e-06, 0], [22e-06, 1]],
+                                   [[0.0, 1], [9.5e-06, 0], [10.61e-06, 1], [14.5e-06, 0], [22e-06, 1]]]
+            param_dict_sync = dict(PARAM_DICT, DO_SYNC=True)
+            csv_to_vhdl.write_stimuli_file(tmp_dir, all_ch_level_matrix, ['clk1', 'mosi1', 'clk2', 'mosi2'], [1, 1, 2, 2], ['CLK', 'MOSI', 'CLK', 'MOSI'], [20, 20, 20, 20], param_dict_sync)
+            with open(os.path.join(tmp_dir, PARAM_DICT['VHD_DO_FILENAME'])) as vhdfile:
+                sync_event_lines = get_event_lines(vhdfile.read())
+            shard_filename_list = csv_to_vhdl.write_stimuli_shards(tmp_dir, all_ch_level_matrix, ['clk1', 'mosi1', 'clk2', 'mosi2'], [1, 1, 2, 2], ['CLK', 'MOSI', 'CLK', 'MOSI'], [20, 20, 20, 20], dict(param_dict_sync, SHARDS=4))
+            event_lines = []
+            for shard_filename in shard_filename_list:
+                with open(os.path.join(tmp_dir, shard_filename)) as vhdfile:
+                    event_lines += get_event_lines(vhdfile.read())
+            self.assertEqual(event_lines, sync_event_lines)
+            with open(os.path.join(tmp_dir, shard_filename_list[-1])) as vhdfile:
+                self.assertIn("\t-- sync offsets per run: 1: ", vhdfile.read())
+
     def test_csv_to_vhdl_all(self):
         print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
         this_path = os.path.dirname(os.path.abspath(__file__))
@@ -274,6 +982,210 @@ class Test_CSV_TO_VHDL(unittest.TestCase):
         if found_diff is True:
             self.assertTrue(False)
 
+    def test_csv_to_vhdl_all_streaming(self):
+        print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
+        import difflib
+        for param_update in [{'STREAMING': True}, {'STREAMING': True, 'STREAM_BUFFER_EDGES': 2, 'CSV_READER': 'block'}]:
+            param_dict_local = dict(PARAM_DICT, **param_update)
+            csv_to_vhdl.run_csv_to_do_main(INPUT_DICT_LIST, param_dict_local)
+
+            with open("test_csv_to_vhdl_output_gm.vhd") as f1:
+                f1_text = f1.readlines()
+            with open(param_dict_local['VHD_DO_FILENAME']) as f2:
+                f2_text = f2.readlines()
+            # Find and print the diff:
+            found_diff = False
+            for line in difflib.unified_diff(f1_text, f2_text, fromfile='golden_model', tofile='generated_output', lineterm=''):
+                print(line)
+                found_diff = True
+            if found_diff is True:
+                self.assertTrue(False)
+
+        # stream stopped before the end of the data
+        edge_stream = csv_to_vhdl.BufferedEdgeStream(iter([[float(i), i % 2] for i in range(1000)]), 10)
+        self.assertEqual(next(iter(edge_stream)), [0.0, 0])
+        edge_stream.close()
+        self.assertFalse(edge_stream.thread.is_alive())
+
+    def test_csv_to_vhdl_all_append(self):
+        print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_data_list = []
+            for input_dict in INPUT_DICT_LIST:
+                with open(input_dict['filepath'], 'rb') as csvfile:
+                    csv_data_list.append(csvfile.read())
+            input_dict_list = [dict(input_dict, filepath=os.path.join(tmp_dir, input_dict['filepath'])) for input_dict in INPUT_DICT_LIST]
+            param_dict_local = dict(PARAM_DICT, APPEND_CHECKPOINT=os.path.join(tmp_dir, 'checkpoint.json'), CSV_BLOCK_BYTES=1000)
+
+            # the csv files grow between the runs (the cuts are within lines), every row is read once
+            rows_parsed = 0
+            for data_stop in [30, 20000, 20000, 45001, 69627]:
+                for input_dict, csv_data in zip(input_dict_list, csv_data_list):
+                    with open(input_dict['filepath'], 'wb') as csvfile:
+                        csvfile.write(csv_data[:data_stop])
+                metrics = csv_to_vhdl.run_csv_to_do_main(input_dict_list, param_dict_local)
+                rows_parsed += metrics.to_dict()['counters']['rows_parsed']
+            self.assertEqual(rows_parsed, 2 * 3000)
+            with open("test_csv_to_vhdl_output_gm.vhd") as f1, open(os.path.join(tmp_dir, PARAM_DICT['VHD_DO_FILENAME'])) as f2:
+                self.assertEqual(f2.read(), f1.read())
+
+            # DO_SYNC: the last run with APPEND_FINALIZE writes the events kept for the next run -> same stimuli as one conversion
+            for input_dict_num, (input_dict, skew_rows, num_rows) in enumerate(zip(input_dict_list, [0, 3], [1000, 1200])):
+                with open(input_dict['filepath'], 'w') as csvfile:
+                    csvfile.write("in s,C1 in V\n")
+                    csvfile.writelines(f"{row_num * 1e-08:.8E},{3.3 if (row_num - skew_rows) % 300 < 150 and (row_num - skew_rows) // 5 % 2 else 0.0}\n" for row_num in range(num_rows))
+            sync_csv_data_list = []
+            for input_dict in input_dict_list:
+                with open(input_dict['filepath'], 'rb') as csvfile:
+                    sync_csv_data_list.append(csvfile.read())
+            for file_extension in ['.vhd', '.do']:
+                param_dict_sync = dict(PARAM_DICT, DO_SYNC=True, VHD_DO_FILENAME=f"sync{file_extension}")
+                csv_to_vhdl.run_csv_to_do_main(input_dict_list, param_dict_sync)
+                with open(os.path.join(tmp_dir, param_dict_sync['VHD_DO_FILENAME'])) as f1:
+                    expected_text = f1.read()
+                for data_stop_list in [[None], [10000, 25000, None]]:
+                    param_dict_append = dict(param_dict_sync, APPEND_CHECKPOINT=os.path.join(tmp_dir, f"checkpoint_sync{len(data_stop_list)}.json"), CSV_BLOCK_BYTES=1000)
+                    for run_num, data_stop in enumerate(data_stop_list):
+                        for input_dict, csv_data in zip(input_dict_list, sync_csv_data_list):
+                            with open(input_dict['filepath'], 'wb') as csvfile:
+                                csvfile.write(csv_data[:data_stop])
+                        csv_to_vhdl.run_csv_to_do_main(input_dict_list, dict(param_dict_append, APPEND_FINALIZE=run_num == len(data_stop_list) - 1))
+                    with open(os.path.join(tmp_dir, param_dict_sync['VHD_DO_FILENAME'])) as f2:
+                        self.assertEqual(f2.read(), expected_text)
+                    # finalized: later runs do not change the stimuli
+                    csv_to_vhdl.run_csv_to_do_main(input_dict_list, param_dict_append)
+                    with open(os.path.join(tmp_dir, param_dict_sync['VHD_DO_FILENAME'])) as f2:
+                        self.assertEqual(f2.read(), expected_text)
+            for input_dict, csv_data in zip(input_dict_list, csv_data_list):
+                with open(input_dict['filepath'], 'wb') as csvfile:
+                    csvfile.write(csv_data)
+
+            # other settings: the checkpoint is not resumed
+            csv_to_vhdl.run_csv_to_do_main(input_dict_list, dict(param_dict_local, MAX_WAIT_TIME_NS=100))
+            with open("test_csv_to_vhdl_output_gm.vhd") as f1, open(os.path.join(tmp_dir, PARAM_DICT['VHD_DO_FILENAME'])) as f2:
+                self.assertNotEqual(f2.read(), f1.read())
+            csv_to_vhdl.run_csv_to_do_main(input_dict_list, param_dict_local)
+            with open("test_csv_to_vhdl_output_gm.vhd") as f1, open(os.path.join(tmp_dir, PARAM_DICT['VHD_DO_FILENAME'])) as f2:
+                self.assertEqual(f2.read(), f1.read())
+
+    def test_run_batch_jobs(self):
+        print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
+        import json
+        import shutil
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for job_dir in ['small', 'large']:
+                os.makedirs(os.path.join(tmp_dir, job_dir))
+                for input_dict in INPUT_DICT_LIST[:1 if job_dir == 'small' else 2]:
+                    shutil.copy(input_dict['filepath'], os.path.join(tmp_dir, job_dir))
+            input_dict_list = [{key: value for key, value in input_dict.items() if key != 'logic_family'} for input_dict in INPUT_DICT_LIST]
+            batch = {'max_workers': 2, 'pool_mode': 'thread', 'summary_file': os.path.join(tmp_dir, 'summary.json'),
+                     'defaults': {'param_dict': PARAM_DICT, 'input_dict': {'logic_family': 3.3}},
+                     'jobs': [{'name': 'small', 'input_dict_list': [dict(input_dict_list[0], filepath=os.path.join('small', INPUT_DICT1['filepath']))]},
+                              {'name': 'missing_file', 'input_dict_list': [dict(input_dict_list[0], filepath='missing.CSV')]},
+                              {'name': 'large', 'param_dict': {'VHD_DO_FILENAME': "my_decoded_file.vhd"},
+                               'input_dict_list': [dict(input_dict, filepath=os.path.join('large', input_dict['filepath'])) for input_dict in input_dict_list]}]}
+            job_filepath = os.path.join(tmp_dir, 'jobs.json')
+            with open(job_filepath, 'w') as jobfile:
+                json.dump(batch, jobfile)
+
+            summary = csv_to_vhdl.run_batch_jobs(job_filepath)
+            self.assertEqual([job_result['name'] for job_result in summary['jobs']], ['small', 'missing_file', 'large'])
+            self.assertEqual([job_result['status'] for job_result in summary['jobs']], ['ok', 'failed', 'ok'])
+            self.assertEqual(summary['num_failed'], 1)
+            self.assertIn('FileNotFoundError', summary['jobs'][1]['error'])
+            self.assertEqual([job_result['schedule_num'] for job_result in summary['jobs']], [1, 2, 0])  # largest job first
+            self.assertEqual(summary['jobs'][2]['metrics']['counters']['edges_found'], 16)
+            with open(batch['summary_file']) as summaryfile:
+                self.assertEqual(json.load(summaryfile)['num_failed'], 1)
+            with open("test_csv_to_vhdl_output_gm.vhd") as f1, open(os.path.join(tmp_dir, 'large', PARAM_DICT['VHD_DO_FILENAME'])) as f2:
+                self.assertEqual(f2.read(), f1.read())
+
+            # process pool: jobs with POOL_MODE "process" run their shards on threads
+            batch['defaults']['param_dict'] = dict(PARAM_DICT, SHARDS=2, POOL_MODE='process')
+            with open(job_filepath, 'w') as jobfile:
+                json.dump(batch, jobfile)
+            summary = csv_to_vhdl.run_batch_jobs(job_filepath, pool_mode='process')
+            self.assertEqual([job_result['status'] for job_result in summary['jobs']], ['ok', 'failed', 'ok'])
+
+    def test_run_watch_folders(self):
+        print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
+        import json
+        import shutil
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name in ['capture_a', 'capture_b']:
+                shutil.copy(INPUT_DICT1['filepath'], os.path.join(tmp_dir, f"{name}_CH1.CSV"))
+                shutil.copy(INPUT_DICT2['filepath'], os.path.join(tmp_dir, f"{name}_CH3.CSV"))
+            shutil.copy(INPUT_DICT1['filepath'], os.path.join(tmp_dir, "capture_c_CH1.CSV"))  # incomplete capture set
+            input_dict_list = [dict(input_dict, filepath=f"{{name}}_CH{channel}.CSV") for input_dict, channel in zip(INPUT_DICT_LIST, [1, 3])]
+            watch = {'watch_dirs': [tmp_dir], 'poll_s': 0.05, 'settle_s': 0.2, 'idle_exit_s': 0.5, 'max_workers': 2,
+                     'status_file': os.path.join(tmp_dir, 'status.json'),
+                     'defaults': {'param_dict': PARAM_DICT},
+                     'capture_sets': [{'name': 'spi', 'param_dict': {'VHD_DO_FILENAME': "{name}.vhd"}, 'input_dict_list': input_dict_list}]}
+
+            status = csv_to_vhdl.run_watch_folders(watch)
+            self.assertEqual((status['num_done'], status['num_failed'], status['queue_depth'], status['running']), (2, 0, 0, 0))
+            self.assertEqual(sorted(job_result['name'] for job_result in status['jobs']), ['spi/capture_a', 'spi/capture_b'])
+            self.assertGreaterEqual(status['latency_s']['max'], 0.2)  # debounce
+            with open(watch['status_file']) as statusfile:
+                self.assertEqual(json.load(statusfile)['num_done'], 2)
+            with open("test_csv_to_vhdl_output_gm.vhd") as f1:
+                golden_text = f1.read().replace(PARAM_DICT['VHD_DO_FILENAME'], "capture_a.vhd")
+            with open(os.path.join(tmp_dir, "capture_a.vhd")) as f2:
+                self.assertEqual(f2.read(), golden_text)
+
+            # converted capture sets are not converted again
+            self.assertEqual(csv_to_vhdl.run_watch_folders(watch)['num_done'], 0)
+
+            # failed conversions are retried with the same files: output directory created after the first failure
+            import threading
+            import time
+            shutil.copy(INPUT_DICT1['filepath'], os.path.join(tmp_dir, "capture_d_CH1.CSV"))
+            shutil.copy(INPUT_DICT2['filepath'], os.path.join(tmp_dir, "capture_d_CH3.CSV"))
+            watch_retry = dict(watch, idle_exit_s=1.0, capture_sets=[{'name': 'spi', 'param_dict': {'VHD_DO_FILENAME': "out/{name}.vhd"}, 'input_dict_list': input_dict_list}])
+            status_list = []
+            watch_thread = threading.Thread(target=lambda: status_list.append(csv_to_vhdl.run_watch_folders(watch_retry)))
+            watch_thread.start()
+            for poll_num in range(200):
+                time.sleep(0.05)
+                with open(watch['status_file']) as statusfile:
+                    if json.load(statusfile)['num_failed'] > 0:
+                        break
+            os.mkdir(os.path.join(tmp_dir, "out"))
+            watch_thread.join(30)
+            self.assertGreaterEqual(status_list[0]['num_failed'], 1)
+            self.assertEqual(status_list[0]['jobs'][-1]['status'], 'ok')
+            self.assertTrue(os.path.isfile(os.path.join(tmp_dir, "out", "capture_d.vhd")))
+
+    def test_run_csv_to_do_main_metrics(self):
+        print(f"\n +++ {sys._getframe().f_code.co_name}() +++")
+        import json
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            metrics_dict_list = []
+            for param_update in [{'POOL_MODE': 'thread', 'NUM_WORKERS': 2}, {'STREAMING': True}]:
+                metrics_filename = os.path.join(tmp_dir, 'metrics.json')
+                metrics = csv_to_vhdl.run_csv_to_do_main(INPUT_DICT_LIST, dict(PARAM_DICT, METRICS_FILE=metrics_filename, **param_update))
+                with open(metrics_filename) as metricsfile:
+                    metrics_dict = json.load(metricsfile)
+                self.assertEqual(metrics_dict['counters'], metrics.to_dict()['counters'])
+                self.assertEqual(len(metrics_dict['files']), len({dict_elem['filepath'] for dict_elem in INPUT_DICT_LIST}))
+                self.assertIn('write_stimuli_file', metrics_dict['stages'])
+                self.assertGreater(metrics_dict['counters']['rows_parsed'], 0)
+                with open(PARAM_DICT['VHD_DO_FILENAME']) as vhdfile:
+                    self.assertEqual(metrics_dict['counters']['lines_written'], sum(1 for line in vhdfile if 'wait for' in line))
+                metrics_dict_list.append(metrics_dict)
+            self.assertEqual(metrics_dict_list[0]['counters'], metrics_dict_list[1]['counters'])
+
+            metrics_filename = os.path.join(tmp_dir, 'metrics.txt')
+            csv_to_vhdl.run_csv_to_do_main(INPUT_DICT_LIST, dict(PARAM_DICT, METRICS_FILE=metrics_filename))
+            with open(metrics_filename) as metricsfile:
+                line_list = metricsfile.read().splitlines()
+            self.assertTrue(line_list[0].startswith('csv_to_vhdl runtime_s='))
+            self.assertTrue(any(line.startswith('csv_to_vhdl_stage,stage=write_stimuli_file ') for line in line_list))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,28 @@
+	--
+	-- Measurement data of my_decoded_file.vhd starts here
+	--
+	-- uses the tables of package stimuli_my_decoded_file_pkg (use work.stimuli_my_decoded_file_pkg.all;)
+	for i in STIMULI_TABLE_0'range loop
+		wait for STIMULI_TABLE_0(i).delay;
+		case STIMULI_TABLE_0(i).sig is
+			when 0 => spi_clk_stimu01_sl_s <= STIMULI_TABLE_0(i).value;
+			when 1 => spi_mosi_stimu01_sl_s <= STIMULI_TABLE_0(i).value;
+			when others => null;
+		end case;
+	end loop;
+	for i in STIMULI_TABLE_1'range loop
+		wait for STIMULI_TABLE_1(i).delay;
+		case STIMULI_TABLE_1(i).sig is
+			when 0 => spi_clk_stimu01_sl_s <= STIMULI_TABLE_1(i).value;
+			when 1 => spi_mosi_stimu01_sl_s <= STIMULI_TABLE_1(i).value;
+			when others => null;
+		end case;
+	end loop;
+	for i in STIMULI_TABLE_2'range loop
+		wait for STIMULI_TABLE_2(i).delay;
+		case STIMULI_TABLE_2(i).sig is
+			when 0 => spi_clk_stimu01_sl_s <= STIMULI_TABLE_2(i).value;
+			when 1 => spi_mosi_stimu01_sl_s <= STIMULI_TABLE_2(i).value;
+			when others => null;
+		end case;
+	end loop;
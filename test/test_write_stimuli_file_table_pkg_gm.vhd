@@ -0,0 +1,42 @@
+library ieee;
+use ieee.std_logic_1164.all;
+
+package stimuli_my_decoded_file_pkg is
+	type t_stimuli_event is record
+		delay : time;
+		sig   : natural;
+		value : std_logic;
+	end record;
+	type t_stimuli_table is array (natural range <>) of t_stimuli_event;
+
+	-- sig 0: spi_clk_stimu01_sl_s
+	-- sig 1: spi_mosi_stimu01_sl_s
+
+	constant STIMULI_TABLE_0 : t_stimuli_table := (
+		0 => (0 ns, 0, '1'),
+		1 => (0 ns, 1, '0'),
+		2 => (267 ns, 1, '1'),
+		3 => (24 ns, 1, '0'),
+		4 => (16 ns, 1, '1'),
+		5 => (38 ns, 1, '0'),
+		6 => (42 ns, 1, '1'),
+		7 => (38 ns, 1, '0')
+	);
+
+	constant STIMULI_TABLE_1 : t_stimuli_table := (
+		0 => (42 ns, 1, '1'),
+		1 => (24 ns, 1, '0'),
+		2 => (216 ns, 1, '1'),
+		3 => (24 ns, 1, '0'),
+		4 => (96 ns, 1, '1'),
+		5 => (163 ns, 0, '0'),
+		6 => (440 ns, 0, '1'),
+		7 => (20 ns, 0, '0')
+	);
+
+	constant STIMULI_TABLE_2 : t_stimuli_table := (
+		0 => (825 ns, 1, '0'),
+		1 => (15 ns, 0, '1')
+	);
+
+end package;